@@ -0,0 +1,81 @@
+import json
+import logging
+import re
+
+from lead_prompts import build_email_prompt, field_text, website_facts
+
+# Ask Gemini for JSON so the batch reply can be parsed without scraping free text
+JSON_OUTPUT = {'response_mime_type': 'application/json'}
+
+
+def build_batch_prompt(rows):
+    leads = []
+    for i, row in enumerate(rows):
+        leads.append(
+            f"Lead {i}:\n"
+            f"  Name: {field_text(row, 'Name')}\n"
+            f"  Phone: {field_text(row, 'Phone')}\n"
+            f"  Website: {field_text(row, 'Website')}\n"
+            f"  About: {field_text(row, 'About')}\n"
+            + (f"  Website check: {website_facts(row)}\n" if website_facts(row) else '')
+            + f"  Email instructions: {build_email_prompt(row)}"
+        )
+    return (
+        f"You are preparing outreach for {len(rows)} businesses. For each lead below, write a short summary "
+        f"of the business from its details, and an introductory email following that lead's email instructions.\n\n"
+        + "\n\n".join(leads)
+        + "\n\nReturn only a JSON array with one object per lead, in any order, shaped like "
+          '{"id": <lead number>, "name": "<lead name>", "summary": "...", "email": "..."}.'
+    )
+
+
+# Maps each valid item back to its lead; ids that are missing, duplicated or malformed are left out
+def parse_batch_response(text, rows):
+    text = re.sub(r'^```(?:json)?\s*|\s*```$', '', text.strip())
+    try:
+        items = json.loads(text)
+    except json.JSONDecodeError as e:
+        logging.warning(f"Batch response is not valid JSON: {e}")
+        return {}
+    if isinstance(items, dict):
+        items = items.get('leads', [])
+    results = {}
+    seen = set()
+    for item in items if isinstance(items, list) else []:
+        if not isinstance(item, dict):
+            continue
+        lead_id = item.get('id')
+        if isinstance(lead_id, str) and lead_id.isdigit():
+            lead_id = int(lead_id)
+        if not isinstance(lead_id, int) or not 0 <= lead_id < len(rows):
+            continue
+        if lead_id in seen:
+            results.pop(lead_id, None)
+            continue
+        seen.add(lead_id)
+        summary, email = item.get('summary'), item.get('email')
+        # The echoed name guards against the model shifting answers onto the wrong lead
+        name_ok = str(item.get('name', '')).strip().lower() == str(rows[lead_id]['Name']).strip().lower()
+        if name_ok and isinstance(summary, str) and summary.strip() and isinstance(email, str) and email.strip():
+            results[lead_id] = (summary.strip(), email.strip())
+    return results
+
+
+# Generates (summary, email) for one batch of rows; leads the batch reply misses go through fallback(row)
+def generate_batch(rows, generate, fallback):
+    try:
+        parsed = parse_batch_response(generate(build_batch_prompt(rows), generation_config=JSON_OUTPUT), rows)
+    except Exception as e:
+        logging.error(f"Batch request failed: {e}")
+        parsed = {}
+    missing = [i for i in range(len(rows)) if i not in parsed]
+    if missing:
+        logging.warning(f"Batch of {len(rows)}: {len(missing)} leads fell back to per-lead requests")
+    return [parsed[i] if i in parsed else fallback(rows[i]) for i in range(len(rows))]
+
+
+# Yields (row, (summary, email)) batch by batch, so callers can persist results as they arrive
+def generate_batched(rows, batch_size, generate, fallback, map_func=map):
+    batches = [rows[i:i + batch_size] for i in range(0, len(rows), batch_size)]
+    for batch, batch_results in zip(batches, map_func(lambda batch: generate_batch(batch, generate, fallback), batches)):
+        yield from zip(batch, batch_results)
@@ -0,0 +1,75 @@
+# Cold-start benchmark for cli.py: wall time of fresh processes running each light subcommand on small
+# inputs (a local Wanderlog stand-in for discover/list, a 200-lead file for dedupe/export), next to the
+# cost of importing main.py, which every command paid before cli.py existed.
+#
+#   python benchmarks/bench_cli.py --runs 7
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, REPO_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+CONFIG = """[Scraper]
+min_delay = 0
+max_delay = 0
+adaptive = false
+
+[Cache]
+enabled = false
+
+[Metrics]
+enabled = false
+"""
+
+
+def timed_run(command, cwd):
+    start = time.perf_counter()
+    subprocess.run(command, cwd=cwd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+
+def write_leads(path, count=200):
+    import pandas as pd
+    leads = [{'Name': f'Place {i}', 'Phone': f'+27 {i:09d}', 'Website': f'place{i}.co.za', 'Google Stars': '4.5',
+              'Google Reviews': '120', 'Link': f'https://wanderlog.com/place/details/{i}/place-{i}'} for i in range(count)]
+    pd.DataFrame(leads).to_parquet(path, index=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Cold-start time of cli.py subcommands')
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+    from stand_in_server import StandInServer
+
+    cli = [sys.executable, os.path.join(REPO_DIR, 'cli.py'), '-q']
+    with tempfile.TemporaryDirectory() as workdir, StandInServer(categories=2, places_per_list=10) as server:
+        with open(os.path.join(workdir, 'config.ini'), 'w') as f:
+            f.write(CONFIG)
+        write_leads(os.path.join(workdir, 'leads.parquet'))
+        commands = {
+            'python (empty)': [sys.executable, '-c', 'pass'],
+            'import main': [sys.executable, '-c', f'import sys; sys.path.insert(0, {REPO_DIR!r}); import main'],
+            'cli --help': cli + ['--help'],
+            'discover': cli + ['discover', server.seed_url],
+            'list': cli + ['list', f'{server.url}/list/0/best-restaurants'],
+            'dedupe': cli + ['dedupe', 'leads.parquet'],
+            'export': cli + ['export', 'leads.parquet'],
+        }
+        results = {}
+        for name, command in commands.items():
+            timed_run(command, workdir)  # warm the OS file cache
+            samples = [timed_run(command, workdir) for _ in range(args.runs)]
+            results[name] = {'median_ms': round(statistics.median(samples) * 1000), 'min_ms': round(min(samples) * 1000)}
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
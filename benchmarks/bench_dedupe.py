@@ -0,0 +1,52 @@
+# Dedup engine throughput on synthetic leads with injected near-duplicates (10k and 100k rows)
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dedupe import dedupe_leads
+
+WORDS = ['ocean', 'basket', 'harbour', 'spur', 'nandos', 'mama', 'luigi', 'sunset', 'deck', 'olive',
+         'tree', 'blue', 'marlin', 'kitchen', 'grill', 'house', 'village', 'green', 'fig', 'salt']
+
+
+def synthetic_leads(n, duplicate_rate=0.2, seed=7):
+    rng = np.random.default_rng(seed)
+    unique = int(n / (1 + duplicate_rate))
+    ids = np.arange(unique)
+    first = np.array(WORDS)[rng.integers(0, len(WORDS), unique)]
+    second = np.array(WORDS)[rng.integers(0, len(WORDS), unique)]
+    names = pd.Series(first) + ' ' + pd.Series(second) + ' ' + pd.Series(ids).astype(str)
+    base = pd.DataFrame({
+        'Name': names,
+        'Phone': ['0' + str(21_000_0000 + i) for i in ids],
+        'Website': [f'https://www.site{i}.co.za/' for i in ids],
+        'Link': [f'https://wanderlog.com/place/details/{100000 + i}/place-{i}' for i in ids],
+    })
+    # Duplicates: the same business listed again as its own Wanderlog place, with a reformatted phone, a
+    # tracking-suffixed URL and a name variant, so only the phone, website and name keys can find them
+    dup = base.iloc[rng.integers(0, unique, n - unique)].copy()
+    dup['Phone'] = '+27 ' + dup['Phone'].str[1:3] + ' ' + dup['Phone'].str[3:]
+    dup['Website'] = dup['Website'].str.replace('https://www.', 'http://', regex=False) + '?utm_source=wanderlog'
+    dup['Link'] = [f'https://wanderlog.com/place/details/{900000 + k}/listing-{k}' for k in range(len(dup))]
+    dup['Name'] = 'The ' + dup['Name'].str.title() + ' Restaurant'
+    leads = pd.concat([base, dup], ignore_index=True)
+    return leads.sample(frac=1, random_state=seed).reset_index(drop=True), unique
+
+
+def main():
+    for n in (10_000, 100_000):
+        leads, expected = synthetic_leads(n)
+        start = time.perf_counter()
+        result = dedupe_leads(leads)
+        elapsed = time.perf_counter() - start
+        print(f"{n:>7} leads: {elapsed:6.2f}s ({n / elapsed:,.0f} leads/s), "
+              f"{len(result)} unique (expected {expected})")
+
+
+if __name__ == '__main__':
+    main()
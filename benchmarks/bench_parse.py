@@ -0,0 +1,56 @@
+# Pages parsed per second: BeautifulSoup multi-pass extractor vs the single-pass lxml extractor vs the
+# embedded JSON state fast path
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from embedded_json import parse_place_state
+from lead import DETAIL_FIELDS, LEAD_FIELDS, Lead
+from main import parse_restaurant_page_soup
+from place_parser import parse_place_page
+
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'place_page.html')
+URL = 'https://wanderlog.com/place/details/123456/the-deck-restaurant'
+
+
+def pages_per_second(parse, html, seconds=3.0):
+    count = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        parse(html, URL)
+        count += 1
+    return count / (time.perf_counter() - start)
+
+
+def main():
+    with open(FIXTURE, encoding='utf-8') as f:
+        html = f.read()
+    before = parse_restaurant_page_soup(html, URL)
+    after = parse_place_page(html, URL)
+    mismatched = {k for k in before if before[k] != after[k]}
+    if mismatched:
+        print(f"Field mismatch: {sorted(mismatched)}")
+        for key in sorted(mismatched):
+            print(f"  {key}: {before[key]!r} != {after[key]!r}")
+        sys.exit(1)
+    # The JSON path has typed ratings and extra fields; it must agree on every field the DOM shows
+    fast, dom = Lead.from_record(parse_place_state(html, URL)), Lead.from_record(after)
+    shown = [name for name in LEAD_FIELDS if name not in DETAIL_FIELDS]
+    if any(getattr(fast, name) != getattr(dom, name) for name in shown):
+        print(f"Embedded JSON mismatch: {fast!r} != {dom!r}")
+        sys.exit(1)
+
+    soup_rate = pages_per_second(parse_restaurant_page_soup, html)
+    lxml_rate = pages_per_second(parse_place_page, html)
+    json_rate = pages_per_second(parse_place_state, html)
+    print(f"BeautifulSoup (html.parser): {soup_rate:8.1f} pages/s")
+    print(f"place_parser (lxml):         {lxml_rate:8.1f} pages/s")
+    print(f"embedded_json:               {json_rate:8.1f} pages/s")
+    print(f"Speed-up (lxml vs soup):     {lxml_rate / soup_rate:8.1f}x")
+    print(f"Speed-up (json vs lxml):     {json_rate / lxml_rate:8.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,229 @@
+# Offline pipeline benchmark against the local Wanderlog stand-in and a mock Gemini backend.
+# Scenarios: parse (fixture parsing only), fetch (crawl + parse), e2e (crawl, save, email generation).
+# Each scenario runs in its own process so peak RSS is per scenario; results are printed as JSON.
+#
+#   python benchmarks/bench_pipeline.py --output before.json
+#   python benchmarks/bench_pipeline.py --latency 0.05 --rate-429 0.02 --compare before.json
+#   python benchmarks/bench_pipeline.py --scenarios fetch --adaptive --server-rate-limit 40
+#   python benchmarks/bench_pipeline.py --scenarios e2e --email-mode full   (vs. the default tiered emails)
+import argparse
+import json
+import logging
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+SCENARIOS = ('parse', 'fetch', 'e2e')
+
+CONFIG = """[Scraper]
+concurrency = {concurrency}
+max_per_host = {concurrency}
+min_delay = 0
+max_delay = 0
+timeout = 10
+adaptive = {adaptive}
+start_rate = 2
+max_rate = {max_rate}
+
+[Cache]
+enabled = false
+
+[GoogleGeminiAPI]
+api_key = offline-benchmark-key-0000
+rpm = 1000000
+tpm = 1000000000
+concurrency = {llm_concurrency}
+
+[LLMCache]
+enabled = false
+
+# Synthetic leads have made-up websites; probing them would time real DNS and third-party hosts
+[SiteProbe]
+enabled = false
+
+[Email]
+mode = {email_mode}
+"""
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes on Linux
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def latency_ms(samples):
+    if len(samples) < 2:
+        value = round(samples[0] * 1000, 2) if samples else None
+        return {'p50': value, 'p95': value}
+    cuts = statistics.quantiles(samples, n=100)
+    return {'p50': round(cuts[49] * 1000, 2), 'p95': round(cuts[94] * 1000, 2)}
+
+
+def timed(func, samples):
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            samples.append(time.perf_counter() - start)
+    return wrapper
+
+
+def run_parse(args):
+    from stand_in_server import StandInServer
+    from wanderlog import parse_place
+    server = StandInServer()
+    pages = [server.place_page(i) for i in range(1, 51)]
+    samples = []
+    parse = timed(parse_place, samples)
+    start = time.perf_counter()
+    for i in range(args.pages):
+        parse(pages[i % len(pages)], f'https://wanderlog.com/place/details/{i}')
+    elapsed = time.perf_counter() - start
+    return {'pages': args.pages, 'seconds': round(elapsed, 3),
+            'pages_per_sec': round(args.pages / elapsed, 1), 'latency_ms': latency_ms(samples)}
+
+
+def crawl(args, server, samples):
+    import main
+    engine = main.create_fetch_engine()
+    engine.get = timed(engine.get, samples)
+    records = main.crawl_city('bench', engine, server.seed_url, max_attempts=args.max_attempts)
+    engine.close()
+    return records
+
+
+def run_fetch(args):
+    import main  # noqa: F401 -- imported before the clock starts
+    from stand_in_server import StandInServer
+    samples = []
+    with StandInServer(args.categories, args.places_per_list, args.latency, args.jitter, args.rate_429,
+                       rate_limit=args.server_rate_limit) as server:
+        start = time.perf_counter()
+        records = crawl(args, server, samples)
+        elapsed = time.perf_counter() - start
+    return {'pages': len(records), 'expected_pages': server.total_places, 'requests': server.requests,
+            'throttled': server.throttled, 'seconds': round(elapsed, 3),
+            'pages_per_sec': round(len(records) / elapsed, 1), 'latency_ms': latency_ms(samples)}
+
+
+def run_e2e(args):
+    import main
+    import mock_genai
+    from stand_in_server import StandInServer
+    backend = mock_genai.install(args.llm_latency, args.llm_token_latency)
+    samples = []
+    output_dir = os.path.join('output', 'bench')
+    with StandInServer(args.categories, args.places_per_list, args.latency, args.jitter, args.rate_429,
+                       rate_limit=args.server_rate_limit) as server:
+        start = time.perf_counter()
+        records = crawl(args, server, samples)
+        crawled = time.perf_counter()
+    main.save_results(records, output_dir, 'bench')
+    main.configure_api()
+    llm_samples = []
+    main.llm_client.generate = timed(main.llm_client.generate, llm_samples)
+    main.process_excel(os.path.join(output_dir, 'bench.parquet'), os.path.join(output_dir, 'bench_final.parquet'))
+    elapsed = time.perf_counter() - start
+    leads = len(main.load_leads(os.path.join(output_dir, 'bench_final.parquet')))
+    return {'pages': len(records), 'expected_pages': server.total_places, 'leads': leads,
+            'requests': server.requests, 'throttled': server.throttled, 'llm_calls': backend.calls,
+            'llm_tokens': backend.tokens, 'crawl_seconds': round(crawled - start, 3),
+            'seconds': round(elapsed, 3), 'pages_per_sec': round(len(records) / (crawled - start), 1),
+            'leads_per_min': round(leads / elapsed * 60, 1), 'latency_ms': latency_ms(samples),
+            'llm_latency_ms': latency_ms(llm_samples), 'llm_tokens_per_lead': round(backend.tokens / max(leads, 1)),
+            'llm_ms_per_lead': round(sum(llm_samples) * 1000 / max(leads, 1), 1)}
+
+
+# Runs one scenario in a scratch directory of its own (lead store, frontier and outputs are relative paths)
+def run_scenario(name, args):
+    logging.basicConfig(level=logging.WARNING)
+    os.chdir(tempfile.mkdtemp(prefix=f'bench_{name}_'))
+    with open('config.ini', 'w') as f:
+        f.write(CONFIG.format(concurrency=args.concurrency, llm_concurrency=args.llm_concurrency,
+                              adaptive=args.adaptive, max_rate=args.max_rate, email_mode=args.email_mode))
+    result = {'parse': run_parse, 'fetch': run_fetch, 'e2e': run_e2e}[name](args)
+    result['peak_rss_mb'] = peak_rss_mb()
+    return result
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BENCH_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline_path):
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    print(f"Compared with {baseline_path} ({baseline.get('commit')}):")
+    for name, result in results['scenarios'].items():
+        before = baseline.get('scenarios', {}).get(name)
+        if not before:
+            continue
+        for metric in ('pages_per_sec', 'leads_per_min', 'peak_rss_mb'):
+            if result.get(metric) and before.get(metric):
+                change = (result[metric] / before[metric] - 1) * 100
+                print(f"  {name:6} {metric:14} {before[metric]:>10} -> {result[metric]:>10} ({change:+.1f}%)")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Offline benchmark of the scrape and email pipeline')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS), help='comma-separated: parse,fetch,e2e')
+    parser.add_argument('--pages', type=int, default=2000, help='pages parsed by the parse scenario')
+    parser.add_argument('--categories', type=int, default=5)
+    parser.add_argument('--places-per-list', type=int, default=40)
+    parser.add_argument('--latency', type=float, default=0.02, help='server latency per request (s)')
+    parser.add_argument('--jitter', type=float, default=0.01, help='extra random server latency (s)')
+    parser.add_argument('--rate-429', type=float, default=0.0, help='share of requests answered with 429')
+    parser.add_argument('--server-rate-limit', type=float, help='requests/s above which the stand-in answers 429')
+    parser.add_argument('--max-attempts', type=int, default=3)
+    parser.add_argument('--adaptive', action='store_true', help='crawl with the AIMD per-host rate instead of no delay')
+    parser.add_argument('--max-rate', type=float, default=100, help='per-host requests/s cap in --adaptive mode')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--llm-latency', type=float, default=0.05, help='mock Gemini latency per call (s)')
+    parser.add_argument('--llm-token-latency', type=float, default=0.002, help='mock Gemini latency per output token (s)')
+    parser.add_argument('--llm-concurrency', type=int, default=8)
+    parser.add_argument('--email-mode', choices=('tiered', 'full'), default='tiered', help='[Email] mode of the e2e run')
+    parser.add_argument('--output', help='write the JSON results to this file')
+    parser.add_argument('--compare', help='baseline JSON file to compare against')
+    parser.add_argument('--run', choices=SCENARIOS, help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+def main():
+    args = parse_args()
+    if args.run:
+        print(json.dumps(run_scenario(args.run, args)))
+        return
+    results = {'commit': git_commit(), 'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+               'settings': {k: v for k, v in vars(args).items() if k not in ('scenarios', 'output', 'compare', 'run')},
+               'scenarios': {}}
+    for name in args.scenarios.split(','):
+        child = subprocess.run([sys.executable, os.path.abspath(__file__), '--run', name, *sys.argv[1:]],
+                               capture_output=True, text=True)
+        if child.returncode != 0:
+            print(child.stderr, file=sys.stderr)
+            sys.exit(f"Scenario {name} failed")
+        results['scenarios'][name] = json.loads(child.stdout.strip().splitlines()[-1])
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == '__main__':
+    main()
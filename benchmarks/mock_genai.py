@@ -0,0 +1,52 @@
+# Stand-in for the google.generativeai module: same calls the pipeline makes, no network. Replies are about as
+# long as a full outreach email (REPLY_TOKENS) unless max_output_tokens caps them, and take a fixed latency
+# per call plus token_latency per output token, like a real model streaming its answer.
+import json
+import threading
+import time
+from types import SimpleNamespace
+
+REPLY_TOKENS = 300
+
+
+class MockGenAI:
+    def __init__(self, latency=0.0, token_latency=0.0):
+        self.latency = latency
+        self.token_latency = token_latency
+        self.calls = 0
+        self.tokens = 0
+        self._lock = threading.Lock()
+
+    def configure(self, api_key=None, **kwargs):
+        pass
+
+    def GenerativeModel(self, model_name, generation_config=None):
+        return MockModel(self, model_name)
+
+
+class MockModel:
+    def __init__(self, backend, model_name):
+        self.backend = backend
+        self.model_name = model_name
+
+    def generate_content(self, prompt, generation_config=None):
+        config = generation_config or {}
+        reply_tokens = min(REPLY_TOKENS, config.get('max_output_tokens') or REPLY_TOKENS)
+        time.sleep(self.backend.latency + reply_tokens * self.backend.token_latency)
+        text = f"Mock reply from {self.model_name} to a {len(prompt)}-character prompt."
+        text += ' lorem' * max(0, reply_tokens - len(text) // 4 - 10)
+        if config.get('response_mime_type') == 'application/json':
+            text = json.dumps({'summary': text[:80], 'paragraph': text})
+        tokens = len(prompt) // 4 + reply_tokens
+        with self.backend._lock:
+            self.backend.calls += 1
+            self.backend.tokens += tokens
+        return SimpleNamespace(text=text, usage_metadata=SimpleNamespace(total_token_count=tokens))
+
+
+# Points every module that talks to Gemini at the mock
+def install(latency=0.0, token_latency=0.0):
+    import llm_client
+    backend = MockGenAI(latency, token_latency)
+    llm_client.genai = backend
+    return backend
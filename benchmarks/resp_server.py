@@ -0,0 +1,199 @@
+# In-memory stand-in for a Redis server: enough of the protocol and commands for RedisWorkQueue,
+# so the multi-worker mode can be exercised without installing Redis
+import socketserver
+import threading
+
+
+class RespStore:
+    def __init__(self):
+        self.data = {}
+        self.lock = threading.Lock()
+
+    def _get(self, key, kind):
+        value = self.data.get(key)
+        if value is None:
+            value = self.data[key] = kind()
+        return value
+
+    def execute(self, command, *args):
+        handler = getattr(self, 'cmd_' + command.lower(), None)
+        if handler is None:
+            raise ValueError(f"ERR unknown command '{command}'")
+        with self.lock:
+            return handler(*args)
+
+    def cmd_ping(self, *args):
+        return args[0] if args else 'PONG'
+
+    def cmd_select(self, db):
+        return 'OK'
+
+    def cmd_flushdb(self):
+        self.data.clear()
+        return 'OK'
+
+    def cmd_del(self, *keys):
+        return sum(self.data.pop(key, None) is not None for key in keys)
+
+    def cmd_sadd(self, key, *members):
+        members_set = self._get(key, set)
+        added = [m for m in members if m not in members_set]
+        members_set.update(added)
+        return len(added)
+
+    def cmd_scard(self, key):
+        return len(self.data.get(key, ()))
+
+    def cmd_sismember(self, key, member):
+        return int(member in self.data.get(key, ()))
+
+    def cmd_lpush(self, key, *values):
+        items = self._get(key, list)
+        for value in values:
+            items.insert(0, value)
+        return len(items)
+
+    def cmd_rpop(self, key):
+        items = self.data.get(key)
+        return items.pop() if items else None
+
+    def cmd_rpoplpush(self, source, destination):
+        items = self.data.get(source)
+        if not items:
+            return None
+        value = items.pop()
+        self._get(destination, list).insert(0, value)
+        return value
+
+    def cmd_lrem(self, key, count, value):
+        items = self.data.get(key, [])
+        count = int(count)
+        order = range(len(items) - 1, -1, -1) if count < 0 else range(len(items))
+        hits = [i for i in order if items[i] == value][:abs(count) or None]
+        for i in sorted(hits, reverse=True):
+            del items[i]
+        return len(hits)
+
+    def cmd_lrange(self, key, start, stop):
+        items = self.data.get(key, [])
+        stop = int(stop)
+        return items[int(start):None if stop == -1 else stop + 1]
+
+    def cmd_llen(self, key):
+        return len(self.data.get(key, ()))
+
+    def cmd_zadd(self, key, *args):
+        flags = set()
+        args = list(args)
+        while args and args[0].upper() in ('XX', 'NX', 'CH'):
+            flags.add(args.pop(0).upper())
+        scores = self._get(key, dict)
+        changed = 0
+        for score, member in zip(args[::2], args[1::2]):
+            exists = member in scores
+            if ('XX' in flags and not exists) or ('NX' in flags and exists):
+                continue
+            if not exists or ('CH' in flags and scores[member] != float(score)):
+                changed += 1
+            scores[member] = float(score)
+        return changed
+
+    def cmd_zrem(self, key, *members):
+        scores = self.data.get(key, {})
+        return sum(scores.pop(member, None) is not None for member in members)
+
+    def cmd_zscore(self, key, member):
+        score = self.data.get(key, {}).get(member)
+        return None if score is None else repr(score)
+
+    def cmd_zcard(self, key):
+        return len(self.data.get(key, ()))
+
+    def cmd_zrangebyscore(self, key, low, high):
+        low = float('-inf') if low == '-inf' else float(low)
+        high = float('inf') if high == '+inf' else float(high)
+        scores = self.data.get(key, {})
+        return [m for m, s in sorted(scores.items(), key=lambda item: item[1]) if low <= s <= high]
+
+    def cmd_hset(self, key, *pairs):
+        fields = self._get(key, dict)
+        added = sum(field not in fields for field in pairs[::2])
+        fields.update(zip(pairs[::2], pairs[1::2]))
+        return added
+
+    def cmd_hget(self, key, field):
+        return self.data.get(key, {}).get(field)
+
+    def cmd_hdel(self, key, *fields):
+        values = self.data.get(key, {})
+        return sum(values.pop(field, None) is not None for field in fields)
+
+    def cmd_hincrby(self, key, field, amount):
+        fields = self._get(key, dict)
+        fields[field] = str(int(fields.get(field, 0)) + int(amount))
+        return int(fields[field])
+
+    def cmd_hgetall(self, key):
+        return [item for pair in self.data.get(key, {}).items() for item in pair]
+
+
+def encode(value):
+    if value is None:
+        return b'$-1\r\n'
+    if isinstance(value, Exception):
+        return b'-' + str(value).encode() + b'\r\n'
+    if isinstance(value, int):
+        return b':%d\r\n' % value
+    if isinstance(value, list):
+        return b'*%d\r\n' % len(value) + b''.join(encode(item) for item in value)
+    data = str(value).encode('utf-8')
+    return b'$%d\r\n%s\r\n' % (len(data), data)
+
+
+class RespServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address=('127.0.0.1', 0)):
+        self.store = RespStore()
+        super().__init__(address, RespHandler)
+
+    @property
+    def url(self):
+        host, port = self.server_address
+        return f'redis://{host}:{port}/0'
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+class RespHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            count = int(line[1:-2])
+            args = []
+            for _ in range(count):
+                size = int(self.rfile.readline()[1:-2])
+                args.append(self.rfile.read(size + 2)[:-2].decode('utf-8'))
+            try:
+                reply = self.server.store.execute(*args)
+            except Exception as e:
+                reply = e if str(e).startswith('ERR') else ValueError(f'ERR {e}')
+            self.wfile.write(encode(reply))
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description='Serve an in-memory Redis stand-in until interrupted')
+    parser.add_argument('--port', type=int, default=6379)
+    args = parser.parse_args()
+    server = RespServer(('127.0.0.1', args.port))
+    print(f"Listening on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
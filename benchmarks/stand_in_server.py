@@ -0,0 +1,162 @@
+# Local Wanderlog stand-in for offline benchmarks: a city page of categories, list pages of places
+# and place pages built from the recorded fixture, with optional latency and 429 injection.
+# List pages carry the places both as markup and as embedded JSON state, like the real site;
+# embedded_state=False serves markup only, for the DOM fallback.
+# rate_429 throttles a random share of requests; rate_limit throttles whatever exceeds that many
+# requests per second, like a real server's limiter.
+import collections
+import json
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'place_page.html')
+
+CATEGORY_LINK = ('<div class="col-6 col-sm-4 col-md-4 col-lg-4 col-xl-4 mt-2 px-1">'
+                 '<a href="/list/{list_id}/best-restaurants">Best restaurants {list_id}</a></div>')
+PLACE_LINK = ('<div class="d-flex mb-2 align-items-center">'
+              '<a class="color-gray-900" href="/place/details/{place_id}/place-{place_id}">Place {place_id}</a></div>')
+
+
+class StandInServer:
+    def __init__(self, categories=5, places_per_list=20, latency=0.0, jitter=0.0, rate_429=0.0, seed=0,
+                 rate_limit=None, embedded_state=True):
+        self.embedded_state = embedded_state
+        self.categories = categories
+        self.places_per_list = places_per_list
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_429 = rate_429
+        self.rate_limit = rate_limit
+        self._recent = collections.deque()
+        self.random = random.Random(seed)
+        self.requests = 0
+        self.throttled = 0
+        self._lock = threading.Lock()
+        with open(FIXTURE, encoding='utf-8') as f:
+            self.place_template = f.read()
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self._server.server_port}'
+
+    @property
+    def seed_url(self):
+        return f'{self.url}/city/east-london'
+
+    @property
+    def total_places(self):
+        return self.categories * self.places_per_list
+
+    # Each place gets its own name, phone and website so dedup keeps every one of them
+    def place_page(self, place_id):
+        page = self.place_template
+        if not self.embedded_state:
+            page = page[:page.rfind('<script>window.__MOBX_STATE__')] + '</body>\n</html>\n'
+        return (page
+                .replace('The Deck Restaurant', f'Place {place_id}')
+                .replace('+27 43 743 0000', f'+27 {place_id:09d}')
+                .replace('thedeck.co.za', f'place{place_id}.co.za'))
+
+    def over_limit(self):
+        if not self.rate_limit:
+            return False
+        now = time.monotonic()
+        while self._recent and now - self._recent[0] > 1.0:
+            self._recent.popleft()
+        if len(self._recent) >= self.rate_limit:
+            return True
+        self._recent.append(now)
+        return False
+
+    def page(self, path):
+        parts = path.strip('/').split('/')
+        if parts[0] == 'city':
+            links = ''.join(CATEGORY_LINK.format(list_id=i) for i in range(self.categories))
+            return f'<html><body><div class="row mt-n2 mx-n1">{links}</div></body></html>'
+        if parts[0] == 'list' and len(parts) > 1 and parts[1].isdigit():
+            first = int(parts[1]) * self.places_per_list + 1
+            ids = range(first, first + self.places_per_list)
+            links = ''.join(PLACE_LINK.format(place_id=i) for i in ids)
+            state = ''
+            if self.embedded_state:
+                blocks = [{'type': 'place', 'place': {'id': i, 'name': f'Place {i}', 'url': f'/place/details/{i}/place-{i}'}}
+                          for i in ids]
+                state = (f'<script>window.__MOBX_STATE__ = '
+                         f'{json.dumps({"placesListPage": {"data": {"boardSections": [{"blocks": blocks}]}}})};</script>')
+            return f'<html><body>{links}{state}</body></html>'
+        if parts[:2] == ['place', 'details'] and len(parts) > 2 and parts[2].isdigit():
+            return self.place_page(int(parts[2]))
+        return None
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                with server._lock:
+                    server.requests += 1
+                    throttle = server.random.random() < server.rate_429 or server.over_limit()
+                    delay = server.latency + server.random.uniform(0, server.jitter)
+                    if throttle:
+                        server.throttled += 1
+                time.sleep(delay)
+                if throttle:
+                    self.send_response(429)
+                    self.send_header('Retry-After', '1')
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                body = server.page(self.path.split('?')[0])
+                if body is None:
+                    self.send_error(404)
+                    return
+                body = body.encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description='Serve the Wanderlog stand-in until interrupted')
+    parser.add_argument('--categories', type=int, default=5)
+    parser.add_argument('--places-per-list', type=int, default=20)
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--rate-429', type=float, default=0.0)
+    parser.add_argument('--rate-limit', type=float, help='requests/s above which the server answers 429')
+    args = parser.parse_args()
+    with StandInServer(args.categories, args.places_per_list, args.latency, rate_429=args.rate_429,
+                       rate_limit=args.rate_limit) as server:
+        print(f"Seed URL: {server.seed_url}")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
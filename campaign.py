@@ -0,0 +1,107 @@
+import configparser
+import csv
+import logging
+import threading
+from collections import deque
+
+# Task kinds, deepest first: a city's place pages are drained before its next list, so records
+# start flowing early and the per-city backlog stays small
+TASK_ORDER = ('place', 'listing', 'seed')
+
+
+class CityJob:
+    def __init__(self, name, priority=1.0, seeds=(), lists=()):
+        self.name = name
+        self.priority = max(float(priority), 0.01)
+        self.tasks = {kind: deque() for kind in TASK_ORDER}
+        self.tasks['seed'].extend(seeds)
+        self.tasks['listing'].extend(lists)
+        # Stride scheduling: each dispatched task advances the job's pass by 1/priority
+        self.pass_value = 0.0
+        self.in_flight = 0
+        self.completed = 0
+
+    def has_tasks(self):
+        return any(self.tasks[kind] for kind in TASK_ORDER)
+
+    def pop_task(self):
+        for kind in TASK_ORDER:
+            if self.tasks[kind]:
+                return kind, self.tasks[kind].popleft()
+
+
+# Reads a campaign .ini: a [campaign] section with crawl limits and one [city:<name>] section per city
+def load_campaign(path):
+    config = configparser.ConfigParser(inline_comment_prefixes=(';', '#'))
+    if not config.read(path):
+        raise FileNotFoundError(f"Campaign config not found: {path}")
+    settings = dict(config['campaign']) if config.has_section('campaign') else {}
+    jobs = []
+    for section in config.sections():
+        if not section.startswith('city:'):
+            continue
+        city = config[section]
+        seeds = city.get('seeds', '').split()
+        lists = city.get('lists', '').split()
+        # lists_csv points at a category CSV such as output/test_links.csv (text,href columns)
+        if city.get('lists_csv'):
+            with open(city['lists_csv'], newline='', encoding='utf-8') as f:
+                lists += [row['href'] for row in csv.DictReader(f) if row.get('href')]
+        jobs.append(CityJob(section[len('city:'):], city.getfloat('priority', 1.0), seeds, lists))
+    if not jobs:
+        raise ValueError(f"No [city:<name>] sections in {path}")
+    return settings, jobs
+
+
+# Runs every city's tasks on one shared worker pool. Free workers always go to the city with the
+# lowest pass value, so cities get worker time in proportion to their priority.
+class CampaignScheduler:
+    def __init__(self, jobs, handle, workers=8):
+        self.jobs = jobs
+        self.handle = handle
+        self.workers = workers
+        self._cond = threading.Condition()
+
+    def _next_task(self):
+        with self._cond:
+            while True:
+                ready = [job for job in self.jobs if job.has_tasks()]
+                if ready:
+                    job = min(ready, key=lambda j: j.pass_value)
+                    job.pass_value += 1.0 / job.priority
+                    job.in_flight += 1
+                    return (job, *job.pop_task())
+                if not any(job.in_flight for job in self.jobs):
+                    return None
+                self._cond.wait()
+
+    def _complete(self, job, children):
+        with self._cond:
+            for kind, url in children:
+                job.tasks[kind].append(url)
+            job.in_flight -= 1
+            job.completed += 1
+            self._cond.notify_all()
+
+    def _worker(self):
+        while True:
+            task = self._next_task()
+            if task is None:
+                return
+            job, kind, url = task
+            children = []
+            try:
+                children = self.handle(job, kind, url) or []
+            except Exception as e:
+                logging.error(f"[{job.name}] {kind} {url} failed: {e}")
+            finally:
+                self._complete(job, children)
+
+    def run(self):
+        threads = [threading.Thread(target=self._worker, daemon=True) for _ in range(self.workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for job in self.jobs:
+            logging.info(f"[{job.name}] {job.completed} pages processed")
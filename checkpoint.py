@@ -0,0 +1,56 @@
+import json
+import logging
+import os
+import threading
+
+
+def checkpoint_path(output_path):
+    return os.path.splitext(output_path)[0] + '.checkpoint.jsonl'
+
+
+# Append-only JSONL log of finished leads keyed by Link; one line per lead, later lines win
+class CheckpointLog:
+    def __init__(self, path):
+        self.path = path
+        self.records = {}
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            self._load()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._file = open(path, 'a', encoding='utf-8')
+
+    def _load(self):
+        # A crash mid-write leaves a partial last line; cut it off so new appends start clean
+        with open(self.path, 'rb+') as f:
+            content = f.read()
+            if content and not content.endswith(b'\n'):
+                f.truncate(content.rfind(b'\n') + 1)
+                logging.warning(f"Dropped a partially written line at the end of {self.path}")
+        with open(self.path, encoding='utf-8') as f:
+            for line_no, line in enumerate(f, 1):
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    logging.warning(f"Skipping unreadable checkpoint line {line_no} in {self.path}")
+                    continue
+                self.records[entry['key']] = entry['data']
+        logging.info(f"Loaded {len(self.records)} checkpointed leads from {self.path}")
+
+    def __contains__(self, key):
+        return key in self.records
+
+    def append(self, key, data):
+        line = json.dumps({'key': key, 'data': data}, ensure_ascii=False)
+        with self._lock:
+            self._file.write(line + '\n')
+            self._file.flush()
+            self.records[key] = data
+
+    def reset(self):
+        with self._lock:
+            self._file.close()
+            self._file = open(self.path, 'w', encoding='utf-8')
+            self.records = {}
+
+    def close(self):
+        self._file.close()
@@ -0,0 +1,181 @@
+# Non-interactive entry point, one subcommand per stage:
+#   discover  city pages -> category list URLs        list    list pages -> place URLs
+#   scrape    place URLs -> leads (.parquet + .csv)    enrich  leads -> summaries and emails
+#   dedupe    merge duplicate leads                    export  leads -> .xlsx
+# Inputs are URLs, CSV files (href / Link column) or, for discover/list/scrape, stdin. Settings come from
+# --config (config.ini by default); flags override it. Heavy modules (pandas, the Gemini SDK, BeautifulSoup)
+# are imported inside the subcommand that needs them, so the light ones start quickly.
+import argparse
+import csv
+import logging
+import os
+import sys
+
+
+# URLs from the arguments (or stdin when there are none); CSV files contribute their `column`
+def read_urls(sources, column):
+    urls = []
+    for source in sources or [line.strip() for line in sys.stdin if line.strip()]:
+        if column and source.endswith('.csv'):
+            with open(source, newline='', encoding='utf-8') as f:
+                urls += [row[column] for row in csv.DictReader(f) if row.get(column)]
+        else:
+            urls.append(source)
+    return list(dict.fromkeys(urls))
+
+
+# Writes rows to a CSV file, or just the URLs to stdout so commands can be piped into each other
+def write_rows(rows, header, output, url_column):
+    if not output:
+        for row in rows:
+            print(row[url_column])
+        return
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=header, extrasaction='ignore')
+        writer.writeheader()
+        writer.writerows(rows)
+    logging.info(f"Wrote {len(rows)} rows to {output}")
+
+
+def engine_overrides(args):
+    overrides = {}
+    if args.concurrency:
+        overrides['concurrency'] = args.concurrency
+    if args.max_rate:
+        overrides['max_rate'] = args.max_rate
+    return overrides
+
+
+def default_output(source, suffix, extension):
+    return os.path.splitext(source)[0] + suffix + extension
+
+
+def run_discover(args):
+    from fetch_engine import create_fetch_engine
+    from lead_store import get_lead_store
+    from wanderlog import CATEGORY_SELECTOR, extract_links, fetch_page
+    engine = create_fetch_engine(args.config, engine_overrides(args))
+    categories = []
+    for url, html in engine.map(lambda url: fetch_page(url, engine), read_urls(args.sources, None)):
+        if html:
+            links = extract_links(html, url, CATEGORY_SELECTOR)
+            get_lead_store().upsert_categories(links, url)
+            categories += links
+    engine.close()
+    logging.info(f"Found {len(categories)} category lists")
+    write_rows(categories, ['text', 'href'], args.output, 'href')
+
+
+def run_list(args):
+    from fetch_engine import create_fetch_engine
+    from wanderlog import fetch_restaurant_list
+    engine = create_fetch_engine(args.config, engine_overrides(args))
+    places = {}
+
+    def fetch(url):
+        try:
+            return fetch_restaurant_list(url, engine)
+        except Exception as e:
+            logging.error(f"Failed to fetch {url}: {e}")
+            return []
+
+    for url, restaurants in engine.map(fetch, read_urls(args.sources, 'href')):
+        places.update((restaurant['Link'], restaurant) for restaurant in restaurants)
+    engine.close()
+    logging.info(f"Found {len(places)} places")
+    write_rows(list(places.values()), ['Name', 'Link'], args.output, 'Link')
+
+
+def run_scrape(args):
+    import main
+    engine = main.create_fetch_engine(args.config, engine_overrides(args))
+    records = main.crawl_place_pages(read_urls(args.sources, 'Link'), engine, config_path=args.config)
+    engine.close()
+    output_dir, filename = os.path.split(args.output)
+    os.makedirs(output_dir or '.', exist_ok=True)
+    main.save_results(records, output_dir or '.', os.path.splitext(filename)[0])
+
+
+def run_enrich(args):
+    import main
+    output = args.output or default_output(args.source, '_final', '.parquet')
+    main.configure_api(args.config)
+    main.process_excel(args.source, output, args.batch_size, resume=not args.restart, config_path=args.config)
+    if args.xlsx:
+        main.export_xlsx(output, default_output(output, '', '.xlsx'))
+
+
+def run_dedupe(args):
+    from dedupe import dedupe_leads
+    from lead_io import load_leads, save_leads
+    output = args.output or default_output(args.source, '_deduped', '.parquet')
+    save_leads(dedupe_leads(load_leads(args.source), args.threshold, args.window), output)
+    logging.info(f"Deduplicated leads saved to {output}")
+
+
+def run_export(args):
+    from lead_io import export_xlsx
+    export_xlsx(args.source, args.output or default_output(args.source, '', '.xlsx'))
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='cli.py', description='Lead generation pipeline, one stage at a time')
+    parser.add_argument('--config', default='config.ini', help='settings file (default: config.ini)')
+    parser.add_argument('-q', '--quiet', action='store_true', help='only log warnings and errors')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    crawl = argparse.ArgumentParser(add_help=False)
+    crawl.add_argument('--concurrency', type=int, help='fetch threads (overrides [Scraper] concurrency)')
+    crawl.add_argument('--max-rate', type=float, help='requests/s per host (overrides [Scraper] max_rate)')
+
+    command = commands.add_parser('discover', parents=[crawl], help='find the category lists on city pages')
+    command.add_argument('sources', nargs='*', help='city page URLs (default: read from stdin)')
+    command.add_argument('-o', '--output', help='CSV of text,href (default: print the URLs)')
+    command.set_defaults(handler=run_discover)
+
+    command = commands.add_parser('list', parents=[crawl], help='find the places on list pages')
+    command.add_argument('sources', nargs='*', help='list page URLs or CSVs with an href column (default: stdin)')
+    command.add_argument('-o', '--output', help='CSV of Name,Link (default: print the URLs)')
+    command.set_defaults(handler=run_list)
+
+    command = commands.add_parser('scrape', parents=[crawl], help='scrape place pages into a lead file')
+    command.add_argument('sources', nargs='*', help='place URLs or CSVs with a Link column (default: stdin)')
+    command.add_argument('-o', '--output', default=os.path.join('output', 'leads.parquet'),
+                         help='lead file; a CSV copy is written next to it (default: output/leads.parquet)')
+    command.set_defaults(handler=run_scrape)
+
+    command = commands.add_parser('enrich', help='generate summaries and outreach emails')
+    command.add_argument('source', help='lead file (.parquet, .csv or .xlsx)')
+    command.add_argument('-o', '--output', help='default: <source>_final.parquet')
+    command.add_argument('--batch-size', type=int, help='leads per request (overrides [GoogleGeminiAPI] batch_size)')
+    command.add_argument('--restart', action='store_true', help='ignore the checkpoint of an earlier run')
+    command.add_argument('--xlsx', action='store_true', help='also export the result as .xlsx')
+    command.set_defaults(handler=run_enrich)
+
+    command = commands.add_parser('dedupe', help='merge duplicate leads')
+    command.add_argument('source', help='lead file (.parquet, .csv or .xlsx)')
+    command.add_argument('-o', '--output', help='default: <source>_deduped.parquet')
+    command.add_argument('--threshold', type=float, default=0.85, help='name similarity for fuzzy matches')
+    command.add_argument('--window', type=int, default=8, help='neighbours compared per lead')
+    command.set_defaults(handler=run_dedupe)
+
+    command = commands.add_parser('export', help='write a spreadsheet copy of a lead file')
+    command.add_argument('source', help='lead file (.parquet or .csv)')
+    command.add_argument('-o', '--output', help='default: <source>.xlsx')
+    command.set_defaults(handler=run_export)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(level=logging.WARNING if args.quiet else logging.INFO,
+                        format='%(asctime)s - %(levelname)s - %(message)s')
+    if args.command in ('discover', 'list', 'scrape', 'enrich'):
+        from metrics import configure_metrics
+        configure_metrics(args.config)
+    args.handler(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+import os
+import sqlite3
+import threading
+import time
+
+from http_cache import canonical_url
+
+PENDING = 'pending'
+IN_FLIGHT = 'in_flight'
+DONE = 'done'
+FAILED = 'failed'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS frontier (
+    url TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    parent TEXT,
+    state TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_frontier_kind_state ON frontier (kind, state);
+"""
+
+
+def frontier_path(output_dir):
+    return os.path.join(output_dir, 'frontier.sqlite')
+
+
+# Persistent crawl frontier: every URL of every stage with its state, so a crawl can stop and resume anywhere
+class CrawlFrontier:
+    def __init__(self, path, max_attempts=3):
+        self.path = path
+        self.max_attempts = max_attempts
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(SCHEMA)
+
+    def _execute(self, sql, params=()):
+        with self._lock:
+            cursor = self._db.execute(sql, params)
+            self._db.commit()
+            return cursor
+
+    def add(self, urls, kind, parent=None):
+        now = time.time()
+        with self._lock:
+            before = self._db.total_changes
+            self._db.executemany(
+                "INSERT OR IGNORE INTO frontier (url, kind, parent, state, updated_at) VALUES (?, ?, ?, ?, ?)",
+                [(canonical_url(url), kind, parent, PENDING, now) for url in urls])
+            self._db.commit()
+            return self._db.total_changes - before
+
+    # URLs left in flight by a crashed or interrupted run go back to pending
+    def recover(self):
+        return self._execute("UPDATE frontier SET state = ?, updated_at = ? WHERE state = ?",
+                             (PENDING, time.time(), IN_FLIGHT)).rowcount
+
+    # Marks and returns the URLs of a stage that still need work: pending, or failed under the attempt cap
+    def claim(self, kind):
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT url FROM frontier WHERE kind = ? AND (state = ? OR (state = ? AND attempts < ?)) ORDER BY rowid",
+                (kind, PENDING, FAILED, self.max_attempts)).fetchall()
+            urls = [row[0] for row in rows]
+            self._db.executemany("UPDATE frontier SET state = ?, updated_at = ? WHERE url = ?",
+                                 [(IN_FLIGHT, time.time(), url) for url in urls])
+            self._db.commit()
+        return urls
+
+    def mark_done(self, url):
+        self._execute("UPDATE frontier SET state = ?, last_error = NULL, updated_at = ? WHERE url = ?",
+                      (DONE, time.time(), canonical_url(url)))
+
+    def mark_failed(self, url, error):
+        self._execute("UPDATE frontier SET state = ?, attempts = attempts + 1, last_error = ?, updated_at = ? "
+                      "WHERE url = ?", (FAILED, str(error)[:500], time.time(), canonical_url(url)))
+
+    def urls(self, kind, state=None):
+        sql, params = "SELECT url FROM frontier WHERE kind = ?", (kind,)
+        if state:
+            sql, params = sql + " AND state = ?", (kind, state)
+        with self._lock:
+            return [row[0] for row in self._db.execute(sql + " ORDER BY rowid", params)]
+
+    def counts(self):
+        with self._lock:
+            rows = self._db.execute("SELECT kind, state, COUNT(*) FROM frontier GROUP BY kind, state").fetchall()
+        counts = {}
+        for kind, state, count in rows:
+            counts.setdefault(kind, {})[state] = count
+        return counts
+
+    def close(self):
+        self._db.close()
@@ -0,0 +1,239 @@
+import logging
+
+import numpy as np
+import pandas as pd
+
+MISSING = {'', 'n/a', 'nan', 'none', 'null'}
+
+# Hosts shared by many businesses: only a profile path or id on them identifies a lead
+SHARED_HOSTS = ('facebook.com', 'instagram.com', 'google.com', 'goo.gl', 'wanderlog.com', 'tripadvisor.com')
+# Paths on shared hosts that are the same for every business; the query carries the identity
+GENERIC_PATHS = ('profile.php', 'maps', 'maps/place', 'maps/search', 'pages', 'search', 'url')
+# Query parameters that identify the page (facebook.com/profile.php?id=, Google Maps ?cid= / ?place_id=)
+IDENTITY_PARAMS = ('id', 'cid', 'place_id')
+_SHARED_RE = (r'^(?:[\w-]+\.)*(?:' + '|'.join(host.replace('.', r'\.') for host in SHARED_HOSTS) + r')'
+              r'(?:/(?:' + '|'.join(path.replace('.', r'\.') for path in GENERIC_PATHS) + r'))?$')
+
+# Words that say nothing about which business it is; dropped before blocking and name comparison
+NAME_STOPWORDS = (
+    'the', 'restaurant', 'restaurants', 'cafe', 'café', 'bar', 'grill', 'bistro', 'and',
+    'eatery', 'kitchen', 'coffee', 'shop', 'pizzeria', 'co', 'pty', 'ltd',
+)
+_STOPWORDS_RE = r'\b(?:' + '|'.join(NAME_STOPWORDS) + r')\b'
+
+
+def _blank_to_na(series):
+    series = series.astype('string').str.strip()
+    return series.mask(series.str.lower().isin(MISSING))
+
+
+# Phone numbers to E.164, assuming national numbers belong to default_country (South Africa)
+def normalize_phones(phones, default_country='27'):
+    raw = _blank_to_na(phones)
+    plus = raw.str.startswith('+')
+    digits = raw.str.replace(r'\D', '', regex=True)
+    digits = digits.mask(~plus & digits.str.startswith('00'), digits.str[2:])
+    international = plus | raw.str.startswith('00')
+    national = ~international & digits.str.startswith('0')
+    digits = digits.mask(national, default_country + digits.str[1:])
+    digits = digits.mask(~international & ~national & (digits.str.len() <= 9), default_country + digits)
+    valid = digits.str.len().between(8, 15)
+    return ('+' + digits).where(valid)
+
+
+# Websites to host+path: no scheme, www, fragment or trailing slash. The query is dropped (tracking
+# included) except for an identifying parameter, kept as ?<name>=<value>
+def canonicalize_websites(websites):
+    url = _blank_to_na(websites).str.lower()
+    url = url.str.replace(r'^[a-z][a-z0-9+.-]*://', '', regex=True)
+    url = url.str.replace(r'^(www\d?|m)\.', '', regex=True)
+    param = url.str.extract(r'[?&]((?:' + '|'.join(IDENTITY_PARAMS) + r')=[^&#]+)', expand=False)
+    url = url.str.replace(r'[?#].*$', '', regex=True)
+    url = url.str.replace(r'/+$', '', regex=True)
+    url = url.where(param.isna(), url + '?' + param)
+    return url.where(url.str.contains('.', regex=False))
+
+
+def website_identity(canonical):
+    # A shared host with no page of its own (facebook.com, facebook.com/profile.php without an id,
+    # google.com/maps) says nothing about the business
+    return canonical.mask(canonical.str.contains(_SHARED_RE, regex=True).fillna(False).astype(bool))
+
+
+def extract_place_ids(links):
+    return _blank_to_na(links).str.extract(r'/place/details/(\d+)', expand=False)
+
+
+def normalize_names(names):
+    name = _blank_to_na(names).str.lower()
+    name = name.str.replace(r'[^\w\s]', ' ', regex=True)
+    name = name.str.replace(_STOPWORDS_RE, ' ', regex=True)
+    return name.str.split().str.join(' ')
+
+
+# Min-label propagation with pointer jumping: connected components over an edge list, fully vectorized
+def connected_components(n, left, right):
+    labels = np.arange(n)
+    if len(left) == 0:
+        return labels
+    while True:
+        smallest = np.minimum(labels[left], labels[right])
+        updated = labels.copy()
+        np.minimum.at(updated, left, smallest)
+        np.minimum.at(updated, right, smallest)
+        updated = updated[updated]
+        if np.array_equal(updated, labels):
+            return labels
+        labels = updated
+
+
+def exact_key_pairs(keys):
+    # Link every row to the first row sharing its key
+    keys = keys.reset_index(drop=True).dropna()
+    first = keys.index.to_series().groupby(keys.values).transform('first')
+    mask = first.index != first.values
+    return first.index.values[mask], first.values[mask]
+
+
+def _trigrams(name):
+    padded = f'  {name} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def name_similarity(a, b):
+    grams_a, grams_b = _trigrams(a), _trigrams(b)
+    return len(grams_a & grams_b) / len(grams_a | grams_b)
+
+
+# Each name's trigram set as integer codes, flattened: codes[starts[i]:starts[i] + lengths[i]] are name i's
+def trigram_codes(names):
+    vocabulary = {}
+    sets = [[vocabulary.setdefault(gram, len(vocabulary)) for gram in _trigrams(name)] for name in names]
+    lengths = np.array([len(codes) for codes in sets], dtype=np.int64)
+    starts = np.concatenate([[0], np.cumsum(lengths)[:-1]]).astype(np.int64)
+    codes = np.fromiter((code for codes in sets for code in codes), dtype=np.int64, count=int(lengths.sum()))
+    return codes, starts, lengths
+
+
+# Trigram Jaccard similarity of the name pairs (left[k], right[k]), all pairs at once: the two code lists
+# of each pair are tagged with the pair number, and the union is the number of distinct tagged codes
+def pair_similarity(codes, starts, lengths, left, right):
+    if len(left) == 0:
+        return np.empty(0)
+    pair_ids, positions = [], []
+    for side in (left, right):
+        counts = lengths[side]
+        pair_ids.append(np.repeat(np.arange(len(side)), counts))
+        segment_starts = np.repeat(np.cumsum(counts) - counts, counts)
+        positions.append(np.repeat(starts[side], counts) + np.arange(counts.sum()) - segment_starts)
+    tagged = np.unique((np.concatenate(pair_ids) << 32) | codes[np.concatenate(positions)])
+    union = np.bincount(tagged >> 32, minlength=len(left))
+    intersection = lengths[left] + lengths[right] - union
+    return intersection / np.maximum(union, 1)
+
+
+# Fuzzy name pairs: rows are blocked on the first four letters of the name, sorted, and each one is
+# compared only with its next `window` neighbours, so work grows linearly with the number of leads.
+# Each neighbour offset is one vectorized comparison over all rows.
+def fuzzy_name_pairs(names, phones, threshold=0.85, window=8):
+    frame = pd.DataFrame({'name': names.values, 'phone': phones.values})
+    frame = frame[frame['name'].notna() & (frame['name'].str.len() > 0)]
+    frame['block'] = frame['name'].str.replace(' ', '', regex=False).str[:4]
+    frame = frame.sort_values(['block', 'name'])
+    positions = frame.index.values
+    name_values = frame['name'].to_numpy(dtype=object)
+    phone_values = frame['phone'].to_numpy(dtype=object, na_value=None)
+    blocks = frame['block'].to_numpy(dtype=object)
+    codes, starts, lengths = trigram_codes(name_values)
+    has_phone = pd.notna(phone_values)
+    left, right = [np.empty(0, dtype=int)], [np.empty(0, dtype=int)]
+    for offset in range(1, window + 1):
+        i = np.arange(len(frame) - offset)
+        j = i + offset
+        candidate = blocks[i] == blocks[j]
+        # Same name but different phones is a chain's other branch, not a duplicate
+        candidate &= ~(has_phone[i] & has_phone[j] & (phone_values[i] != phone_values[j]))
+        i, j = i[candidate], j[candidate]
+        match = (name_values[i] == name_values[j]) | (pair_similarity(codes, starts, lengths, i, j) >= threshold)
+        left.append(positions[i[match]])
+        right.append(positions[j[match]])
+    return np.concatenate(left).astype(int), np.concatenate(right).astype(int)
+
+
+# Adds fuzzy name edges to the clusters built from exact keys. An exact place id, phone or website match
+# merges across Wanderlog places (one business listed twice); a similar name alone must not, so a name
+# edge between two clusters that both hold a place id is dropped. Clusters where name edges would still
+# chain two such clusters together (through rows without a place id) are rebuilt edge by edge.
+def merge_name_matches(labels, place_ids, left, right):
+    placed = np.zeros(len(labels), dtype=bool)
+    placed[labels[pd.notna(place_ids)]] = True
+    a, b = labels[left], labels[right]
+    keep = (a != b) & ~(placed[a] & placed[b])
+    blocked = int(((a != b) & ~keep).sum())
+    if blocked:
+        logging.info(f"Dedup: kept {blocked} name matches from merging different Wanderlog places")
+    a, b = a[keep], b[keep]
+    merged = connected_components(len(labels), a, b)
+    roots = np.flatnonzero(placed)
+    conflicted = np.flatnonzero(np.bincount(merged[roots], minlength=len(labels)) > 1)
+    if len(conflicted) == 0:
+        return merged[labels]
+    inside = np.isin(merged[a], conflicted)
+    parent = {int(node): int(node) for node in np.flatnonzero(np.isin(merged, conflicted))}
+    has_place = {node for node in parent if placed[node]}
+
+    def root(node):
+        while parent[node] != node:
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
+
+    for x, y in zip(a[inside], b[inside]):
+        x, y = root(x), root(y)
+        if x == y or (x in has_place and y in has_place):
+            continue
+        parent[y] = x
+        if y in has_place:
+            has_place.add(x)
+    merged = merged.copy()
+    for node in parent:
+        merged[node] = root(node)
+    return merged[labels]
+
+
+def assign_clusters(leads, threshold=0.85, window=8):
+    leads = leads.reset_index(drop=True)
+    n = len(leads)
+    keys = pd.DataFrame(index=leads.index)
+    keys['place_id'] = extract_place_ids(leads['Link']) if 'Link' in leads else pd.NA
+    keys['phone'] = normalize_phones(leads['Phone']) if 'Phone' in leads else pd.NA
+    keys['website'] = website_identity(canonicalize_websites(leads['Website'])) if 'Website' in leads else pd.NA
+    keys['name'] = normalize_names(leads['Name']) if 'Name' in leads else pd.NA
+
+    left, right = [np.empty(0, dtype=int)], [np.empty(0, dtype=int)]
+    for column in ('place_id', 'phone', 'website'):
+        i, j = exact_key_pairs(keys[column])
+        left.append(i)
+        right.append(j)
+    labels = connected_components(n, np.concatenate(left), np.concatenate(right))
+    if 'Name' in leads:
+        i, j = fuzzy_name_pairs(keys['name'], keys['phone'], threshold, window)
+        labels = merge_name_matches(labels, keys['place_id'].to_numpy(dtype=object, na_value=None), i, j)
+    return pd.Series(labels, index=leads.index, name='cluster_id'), keys
+
+
+# Keeps the most complete record of each cluster; add_keys adds the normalized phone/website columns
+def dedupe_leads(leads, threshold=0.85, window=8, add_keys=False):
+    leads = leads.reset_index(drop=True)
+    clusters, keys = assign_clusters(leads, threshold, window)
+    filled = leads.astype('string').apply(lambda col: col.notna() & ~col.str.strip().str.lower().isin(MISSING))
+    completeness = filled.sum(axis=1)
+    order = pd.DataFrame({'cluster': clusters, 'completeness': completeness}).sort_values(
+        ['cluster', 'completeness'], ascending=[True, False], kind='stable')
+    keep = order.drop_duplicates('cluster').index.sort_values()
+    result = leads.loc[keep].copy()
+    if add_keys:
+        result['Phone E164'] = keys.loc[keep, 'phone']
+        result['Website Canonical'] = canonicalize_websites(leads.loc[keep, 'Website']) if 'Website' in leads else pd.NA
+    logging.info(f"Dedup: {len(leads)} leads -> {len(result)} unique ({len(leads) - len(result)} duplicates dropped)")
+    return result.reset_index(drop=True)
@@ -0,0 +1,209 @@
+# Tiered email generation: the fixed parts of every outreach email (intro, pitch, call to action,
+# sign-off) are rendered from local templates chosen by the lead's website class; the LLM is asked only
+# for a one-sentence summary and a short personalized paragraph. Without the LLM (quota exhausted, or an
+# unusable reply) both come from the lead's own fields, so every lead still gets a complete email.
+import configparser
+import json
+import logging
+import re
+import threading
+
+import pandas as pd
+
+from dedupe import canonicalize_websites
+from lead import is_missing, parse_count, parse_rank, parse_stars
+from lead_prompts import field_text, website_facts
+from metrics import metrics
+from scoring import website_classes
+
+EMAIL = """Subject: {subject}
+
+Hi {name} team,
+
+I'm Leo from Liistudios, a software agency based in East London.
+
+{personal}
+
+{pitch}
+
+{ask}
+
+Kind regards,
+Leo
+Liistudios"""
+
+# Per website class (see scoring.website_classes): subject, pitch and call to action
+TEMPLATES = {
+    'none': {
+        'subject': "A website for {name}",
+        'pitch': "I couldn't find a website for {name}. Many guests look a place up online before they visit, "
+                 "and a simple, fast site with your menu, hours and booking details turns those searches into visits.",
+        'ask': "Would you be open to a short call this week to see what that could look like for you?",
+    },
+    'social': {
+        'subject': "Growing {name} beyond social media",
+        'pitch': "Right now your online presence lives on a social media page ({website}). A site of your own puts "
+                 "your menu, hours and bookings in one place that you control, and helps new guests find you on Google.",
+        'ask': "Would you be open to a short call to talk through what a site of your own could do for {name}?",
+    },
+    'broken': {
+        'subject': "Your website seems to be down",
+        'pitch': "When I tried to visit {website}, it didn't load. I thought you'd want to know, since guests "
+                 "who can't reach the site often go elsewhere. We can get it back online quickly and make it "
+                 "sturdier while we're at it.",
+        'ask': "Would it help if I took a closer look and sent you what I find?",
+    },
+    'outdated': {
+        'subject': "A few quick wins for {website}",
+        'pitch': "I had a look at {website} and noticed a few things holding it back: {facts} Fixing these makes "
+                 "the site faster and easier to use on a phone, which is where most guests find you.",
+        'ask': "Would you be open to a short call so I can walk you through them?",
+    },
+    'co.za': {
+        'subject': "Your website, {website}",
+        'pitch': "We help local businesses like yours get more out of their website, from faster pages and "
+                 "easier bookings to showing up higher when people search for places to eat nearby.",
+        'ask': "Could you point me to whoever looks after {website}? I'd love to share a few ideas with them.",
+    },
+    'other': {
+        'subject': "Improving {name}'s online presence",
+        'pitch': "We help businesses like yours improve and optimize their websites ({website}), so more of the "
+                 "people who find you online end up walking through the door.",
+        'ask': "Would you be interested in a short call to see how we could help {name} grow?",
+    },
+    'modern': {
+        'subject': "An idea for {name}",
+        'pitch': "Your website already looks good. Where we usually help next is bringing in more visitors, "
+                 "with online bookings, local search and regular updates that keep guests coming back.",
+        'ask': "Would you be open to a short call to see if any of that would be useful for {name}?",
+    },
+}
+
+PERSONAL_OUTPUT = {'response_mime_type': 'application/json', 'max_output_tokens': 160}
+
+
+# Template sections from an .ini file (one section per website class, keys subject/pitch/ask) over the built-ins
+def load_templates(path=None):
+    templates = {tier: dict(parts) for tier, parts in TEMPLATES.items()}
+    if path:
+        config = configparser.ConfigParser(interpolation=None)
+        if not config.read(path, encoding='utf-8'):
+            raise FileNotFoundError(f"Email template file not found: {path}")
+        for tier in config.sections():
+            templates.setdefault(tier, dict(TEMPLATES['other'])).update(config[tier])
+    return templates
+
+
+def build_personal_prompt(row):
+    summary = f" Summary: {field_text(row, 'Summary')}." if not is_missing(row.get('Summary')) else ''
+    facts = website_facts(row)
+    return (f"Business: {field_text(row, 'Name')}. About: {field_text(row, 'About')}.{summary}"
+            + (f" {facts}" if facts else '') +
+            "\nReturn a JSON object with two fields. \"summary\": one sentence describing the business. "
+            "\"paragraph\": two sentences for an outreach email to them, showing we know what makes them special "
+            "(their food, setting or what guests say). No greeting, no sign-off, no sales pitch.")
+
+
+def _first_sentence(text):
+    match = re.match(r'(.+?[.!?])(\s|$)', text.strip())
+    return match.group(1) if match else text.strip()
+
+
+def _reputation(row):
+    stars, reviews = parse_stars(row.get('Google Stars')), parse_count(row.get('Google Reviews'))
+    if stars is None or not reviews:
+        return ''
+    return f"a {stars:.1f}-star rating from {reviews:,} Google reviews"
+
+
+# Summary and paragraph from the lead's own fields, for when the LLM can't be used
+def offline_summary(row):
+    name = field_text(row, 'Name')
+    about = row.get('About')
+    reputation = _reputation(row)
+    parts = [_first_sentence(str(about)) if not is_missing(about) else f"{name} is a local business."]
+    if reputation:
+        parts.append(f"It has {reputation}.")
+    return ' '.join(parts)
+
+
+def offline_paragraph(row):
+    name = field_text(row, 'Name')
+    rank = parse_rank(row.get('Wanderlog Ranking'))
+    reputation = _reputation(row)
+    found = f"I came across {name} on Wanderlog" + (f", where it ranks #{rank} on a list of local favourites" if rank else '')
+    if reputation:
+        return f"{found}. With {reputation}, it's clear your guests love what you do."
+    return f"{found}, and it looks like a place guests enjoy coming back to."
+
+
+# Website Class as scored, or classified on the spot for rows that weren't (streamed leads, scoring disabled)
+def website_class(row):
+    tier = row.get('Website Class')
+    if isinstance(tier, str) and tier:
+        return tier
+    return website_classes(pd.DataFrame([{column: row.get(column) for column in ('Website', 'Website Category')}]))[0]
+
+
+# The lead's website as written in an email: host and path without scheme, www or tracking parameters
+# (https://www.x.co.za/?utm_source=wanderlog reads x.co.za), keeping only an id that names the page
+def display_website(row):
+    canonical = canonicalize_websites(pd.Series([row.get('Website')], dtype=object))[0]
+    return canonical if isinstance(canonical, str) else field_text(row, 'Website')
+
+
+def render_email(row, personal, templates=TEMPLATES):
+    parts = templates.get(website_class(row), templates['other'])
+    values = {'name': field_text(row, 'Name'), 'website': display_website(row),
+              'facts': website_facts(row) or 'it is slow to load and hard to use on a phone.'}
+    return EMAIL.format(subject=parts['subject'].format(**values), name=values['name'], personal=personal,
+                        pitch=parts['pitch'].format(**values), ask=parts['ask'].format(**values))
+
+
+# Callable row -> (summary, email, source), source 'llm' or 'offline'. generate(prompt, generation_config=...)
+# is the LLM call; the first quota error (any of quota_errors) switches the rest of the run to the offline texts.
+class TieredEmailGenerator:
+    def __init__(self, generate, templates=None, quota_errors=(), offline=False):
+        self.generate = generate
+        self.templates = templates or TEMPLATES
+        self.quota_errors = tuple(quota_errors)
+        self.offline = offline
+        self._lock = threading.Lock()
+
+    def personal(self, row):
+        if not self.offline:
+            try:
+                reply = self.generate(build_personal_prompt(row), generation_config=PERSONAL_OUTPUT)
+                summary, paragraph = parse_personal(reply)
+                if paragraph:
+                    metrics.inc('emails_total', source='llm')
+                    return summary or offline_summary(row), paragraph, 'llm'
+                logging.warning(f"Unusable personal paragraph for {field_text(row, 'Name')}; using the offline text")
+            except self.quota_errors as e:
+                with self._lock:
+                    if not self.offline:
+                        logging.warning(f"Gemini quota exhausted ({type(e).__name__}); "
+                                        f"the remaining leads get offline template emails")
+                    self.offline = True
+            except Exception as e:
+                logging.error(f"Personal paragraph failed for {field_text(row, 'Name')}: {e}")
+        metrics.inc('emails_total', source='offline')
+        return offline_summary(row), offline_paragraph(row), 'offline'
+
+    def __call__(self, row):
+        summary, paragraph, source = self.personal(row)
+        return summary, render_email(row, paragraph, self.templates), source
+
+
+# Reply -> (summary, paragraph); a reply that isn't the requested JSON is taken as the paragraph itself
+def parse_personal(reply):
+    text = re.sub(r'^```(?:json)?\s*|\s*```$', '', (reply or '').strip())
+    try:
+        item = json.loads(text)
+    except json.JSONDecodeError:
+        return None, text or None
+    if not isinstance(item, dict):
+        return None, None
+    summary, paragraph = item.get('summary'), item.get('paragraph')
+    return (summary.strip() if isinstance(summary, str) and summary.strip() else None,
+            paragraph.strip() if isinstance(paragraph, str) and paragraph.strip() else None)
@@ -0,0 +1,134 @@
+# Fast path for Wanderlog pages: they ship their data as a JSON state blob
+# (window.__MOBX_STATE__ = {...}). The blob is found with a plain string search and decoded in place,
+# without building a DOM tree. It also carries fields the markup doesn't show: coordinates, opening
+# hours and categories. Every parser returns None when the page has no usable blob, so callers can
+# fall back to the DOM extractors.
+import json
+import re
+from urllib.parse import urljoin
+
+STATE_MARKER = 'window.__MOBX_STATE__'
+
+_decoder = json.JSONDecoder()
+_PLACE_PATH = re.compile(r'^(?:https?://[^/]+)?/place/details/\d+')
+
+
+# The decoded state object, or None when the page has none or it doesn't parse
+def find_state(html):
+    # The blob sits at the end of the body, after the markup it hydrates
+    marker = html.rfind(STATE_MARKER)
+    if marker < 0:
+        return None
+    start = html.find('{', marker + len(STATE_MARKER))
+    if start < 0:
+        return None
+    try:
+        state, _ = _decoder.raw_decode(html, start)
+    except ValueError:
+        return None
+    return state if isinstance(state, dict) else None
+
+
+def _path(data, *keys):
+    for key in keys:
+        if not isinstance(data, dict):
+            return None
+        data = data.get(key)
+    return data
+
+
+def _first(data, *keys):
+    for key in keys:
+        value = data.get(key)
+        if value not in (None, '', []):
+            return value
+    return None
+
+
+def _or_na(value):
+    return 'N/A' if value is None else value
+
+
+def _coordinates(place):
+    lat, lng = place.get('latitude'), place.get('longitude')
+    if lat is None or lng is None:
+        location = _path(place, 'geometry', 'location') or place.get('location') or {}
+        lat, lng = location.get('lat'), location.get('lng')
+    return lat, lng
+
+
+# "Monday: 11:00 AM – 10:00 PM; Tuesday: ..." from weekdayText, or the hours as given
+def _hours(place):
+    hours = place.get('openingHours') or place.get('hours')
+    if isinstance(hours, dict):
+        hours = hours.get('weekdayText')
+    if isinstance(hours, list):
+        hours = '; '.join(str(day) for day in hours if day)
+    return hours or None
+
+
+def _categories(place):
+    categories = place.get('categories') or place.get('types')
+    if isinstance(categories, list):
+        categories = ', '.join(str(category) for category in categories if category)
+    return categories or None
+
+
+# The place's top list mention, as (rank, text). The text reads like the DOM extractor's ("Mentioned on#3of
+# 50 best restaurants in East London"), so a place's content hash doesn't depend on which extractor ran.
+def _mention(data):
+    mentions = data.get('listMentions') or []
+    mention = mentions[0] if mentions and isinstance(mentions[0], dict) else {}
+    rank, title = mention.get('rank'), mention.get('listName') or mention.get('title')
+    if rank is None:
+        return None, None
+    return f"#{rank}", f"Mentioned on#{rank}of {title}" if title else None
+
+
+# A place page record with the fields of place_parser.parse_place_page plus Latitude, Longitude, Hours and
+# Categories. Ratings come typed (4.5, 1234) rather than as page text.
+def parse_place_state(html, url):
+    data = _path(find_state(html), 'placePage', 'data')
+    place = _path(data, 'placeMetadata')
+    if not isinstance(place, dict) or not place.get('name'):
+        return None
+    rank, mention = _mention(data)
+    lat, lng = _coordinates(place)
+    return {
+        'Name': place['name'],
+        'Phone': _or_na(_first(place, 'internationalPhoneNumber', 'phoneNumber', 'phone')),
+        'Website': _or_na(_first(place, 'website')),
+        'Google Stars': _or_na(_first(place, 'rating')),
+        'Google Reviews': _or_na(_first(place, 'numRatings', 'userRatingsTotal')),
+        'TripAdvisor Stars': _or_na(_first(place, 'tripadvisorRating')),
+        'TripAdvisor Reviews': _or_na(_first(place, 'tripadvisorNumRatings')),
+        'Wanderlog Ranking': _or_na(rank),
+        'Wanderlog List': _or_na(mention),
+        'About': _or_na(_first(place, 'description', 'generatedDescription')),
+        'Latitude': _or_na(lat),
+        'Longitude': _or_na(lng),
+        'Hours': _or_na(_hours(place)),
+        'Categories': _or_na(_categories(place)),
+        'Link': url,
+    }
+
+
+# Name/Link of every place on a list page, in page order: any object in the state with a name and a
+# /place/details/ URL. Links resolve against the list page like the DOM extractor's.
+def parse_list_state(html, base_url='https://wanderlog.com'):
+    state = find_state(html)
+    if state is None:
+        return None
+    places = {}
+    stack = [state]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, dict):
+            name = item.get('name')
+            link = _first(item, 'url', 'path', 'link', 'href')
+            if isinstance(name, str) and isinstance(link, str) and _PLACE_PATH.match(link):
+                places.setdefault(urljoin(base_url, link), name.strip())
+            stack.extend(reversed(list(item.values())))
+        elif isinstance(item, list):
+            stack.extend(reversed(item))
+    return [{'Name': name, 'Link': link} for link, name in places.items()] or None
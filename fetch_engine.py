@@ -0,0 +1,243 @@
+import configparser
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from http_cache import HttpCache
+from metrics import metrics
+from rate_limit import AimdRate, TokenBucket
+from streaming import bounded_imap
+
+DEFAULT_HEADERS = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'}
+
+# Statuses worth another attempt; the throttling ones also slow the host down
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+THROTTLE_STATUSES = {429, 503}
+
+
+# Retry-After is either a number of seconds or an HTTP date
+def parse_retry_after(value):
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+# Per-host politeness: caps in-flight requests to a host and spaces out request starts.
+# With adaptive settings (AimdRate keyword arguments) the spacing follows each host's AIMD rate
+# instead of a fixed min_delay..max_delay; Retry-After pauses a host either way.
+class HostLimiter:
+    def __init__(self, max_per_host=2, min_delay=1.0, max_delay=3.0, adaptive=None):
+        self.max_per_host = max_per_host
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.adaptive = adaptive
+        self._lock = threading.Lock()
+        self._slots = {}
+        self._next_start = {}
+        self._blocked_until = {}
+        self.rates = {}
+
+    def _slot(self, host):
+        with self._lock:
+            if host not in self._slots:
+                self._slots[host] = threading.Semaphore(self.max_per_host)
+                self._next_start[host] = 0.0
+                self._blocked_until[host] = 0.0
+                if self.adaptive is not None:
+                    self.rates[host] = AimdRate(**self.adaptive)
+            return self._slots[host]
+
+    def acquire(self, host):
+        self._slot(host).acquire()
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_start[host], self._blocked_until[host])
+            rate = self.rates.get(host)
+            gap = rate.interval() * random.uniform(0.8, 1.2) if rate else random.uniform(self.min_delay, self.max_delay)
+            self._next_start[host] = start + gap
+        if start > now:
+            time.sleep(start - now)
+
+    def release(self, host):
+        self._slot(host).release()
+
+    def on_success(self, host, latency):
+        rate = self.rates.get(host)
+        if rate:
+            rate.on_success(latency)
+
+    # 429/503 and timeouts; retry_after (seconds) holds every request to the host until it has passed
+    def on_throttle(self, host, retry_after=None):
+        rate = self.rates.get(host)
+        if rate:
+            rate.on_throttle()
+        if retry_after:
+            with self._lock:
+                self._blocked_until[host] = max(self._blocked_until[host], time.monotonic() + retry_after)
+
+
+# Shared session + thread pool used by every crawl stage
+class FetchEngine:
+    def __init__(self, concurrency=8, max_per_host=2, min_delay=1.0, max_delay=3.0, timeout=10, cache=None,
+                 global_rpm=None, adaptive=None, max_retries=3, backoff=1.0, max_backoff=60.0):
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.cache = cache
+        self.limiter = HostLimiter(max_per_host, min_delay, max_delay, adaptive)
+        # Bounded retries with full-jitter exponential backoff; Retry-After above max_backoff is not waited out
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        # Optional budget shared by every request of every job, on top of the per-host limits
+        self.global_budget = TokenBucket(global_rpm, burst=concurrency) if global_rpm else None
+        self.session = requests.Session()
+        self.session.headers.update(DEFAULT_HEADERS)
+        # One pool per host, sized so every worker can hold a keep-alive connection
+        adapter = HTTPAdapter(pool_connections=max(4, concurrency), pool_maxsize=concurrency)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def get(self, url, timeout=None):
+        entry = self.cache.lookup(url) if self.cache else None
+        if entry and self.cache.is_fresh(entry):
+            self.cache.record('hits')
+            metrics.inc('http_requests_total', cache='hit')
+            return self.cache.read(url, entry)
+        headers = self.cache.conditional_headers(entry) if self.cache else None
+        response = self._request(url, headers, timeout or self.timeout)
+        if entry and response.status_code == 304:
+            self.cache.record('revalidated')
+            return self.cache.refresh(url, entry)
+        response.raise_for_status()
+        if self.cache:
+            self.cache.record('misses')
+            self.cache.store(url, response)
+        return response
+
+    def _retry_delay(self, attempt):
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    # One logical GET: retries timeouts, connection errors and RETRY_STATUSES up to max_retries times,
+    # feeding every outcome to the host's rate controller. The last response is returned as is.
+    def _request(self, url, headers, timeout):
+        host = urlparse(url).netloc
+        attempt = 0
+        while True:
+            if self.global_budget:
+                self.global_budget.take()
+            self.limiter.acquire(host)
+            start = time.monotonic()
+            try:
+                with metrics.timer('http_request_seconds', host=host):
+                    response = self.session.get(url, headers=headers, timeout=timeout)
+            except (requests.Timeout, requests.ConnectionError) as e:
+                metrics.inc('http_errors_total', error=type(e).__name__)
+                self.limiter.on_throttle(host)
+                if attempt >= self.max_retries:
+                    raise
+                reason, retry_after = type(e).__name__, None
+            except requests.RequestException as e:
+                metrics.inc('http_errors_total', error=type(e).__name__)
+                raise
+            else:
+                metrics.inc('http_requests_total', status=response.status_code)
+                metrics.inc('bytes_downloaded_total', len(response.content))
+                if response.status_code not in RETRY_STATUSES:
+                    self.limiter.on_success(host, time.monotonic() - start)
+                    return response
+                retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                if response.status_code in THROTTLE_STATUSES:
+                    self.limiter.on_throttle(host, retry_after)
+                if attempt >= self.max_retries or (retry_after or 0) > self.max_backoff:
+                    return response
+                reason = response.status_code
+            finally:
+                self.limiter.release(host)
+            attempt += 1
+            delay = max(self._retry_delay(attempt), retry_after or 0)
+            metrics.inc('http_retries_total', reason=reason)
+            logging.warning(f"{url}: {reason}, retry {attempt}/{self.max_retries} in {delay:.1f}s")
+            time.sleep(delay)
+
+    def fetch_text(self, url):
+        try:
+            return self.get(url).text
+        except requests.RequestException as e:
+            logging.error(f"Error fetching {url}: {e}")
+            return None
+
+    # Runs func(item) across the worker pool, yielding (item, result) as each one completes
+    def map(self, func, items):
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            futures = {pool.submit(func, item): item for item in items}
+            for future in as_completed(futures):
+                yield futures[future], future.result()
+
+    # Streaming variant of map: pulls items lazily and keeps at most `window` calls in flight
+    def imap(self, func, items, window=None):
+        return bounded_imap(func, items, self.concurrency, window)
+
+    def close(self):
+        for host, rate in self.limiter.rates.items():
+            logging.info(f"{host}: settled at {rate.rate:.2f} requests/s ({rate.cuts} slow-downs)")
+        self.session.close()
+        if self.cache:
+            self.cache.report()
+            self.cache.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# Engine settings from config.ini [Scraper] and [Cache]; overrides win over the file
+def create_fetch_engine(config_path='config.ini', overrides=None):
+    config = configparser.ConfigParser()
+    config.read(config_path)
+    scraper = dict(config['Scraper']) if config.has_section('Scraper') else {}
+    scraper.update(overrides or {})
+    adaptive = None
+    # Adaptive mode (the default): per-host AIMD rates in requests/s replace the fixed min/max delay
+    if str(scraper.get('adaptive', 'true')).lower() in ('1', 'true', 'yes', 'on'):
+        adaptive = {
+            'start_rate': float(scraper.get('start_rate', 0.5)),
+            'min_rate': float(scraper.get('min_rate', 0.1)),
+            'max_rate': float(scraper.get('max_rate', 5)),
+        }
+    cache = None
+    if config.getboolean('Cache', 'enabled', fallback=True):
+        cache = HttpCache(
+            cache_dir=config.get('Cache', 'dir', fallback=os.path.join('output', '.http_cache')),
+            ttl=config.getfloat('Cache', 'ttl_hours', fallback=6) * 3600,
+            max_bytes=config.getint('Cache', 'max_mb', fallback=500) * 1024 * 1024,
+        )
+    engine = FetchEngine(
+        concurrency=int(scraper.get('concurrency', 8)),
+        max_per_host=int(scraper.get('max_per_host', 2)),
+        min_delay=float(scraper.get('min_delay', 1)),
+        max_delay=float(scraper.get('max_delay', 3)),
+        timeout=float(scraper.get('timeout', 10)),
+        cache=cache,
+        global_rpm=float(scraper['global_rpm']) if scraper.get('global_rpm') else None,
+        adaptive=adaptive,
+        max_retries=int(scraper.get('max_retries', 3)),
+    )
+    logging.info(f"Fetch engine ready: {engine.concurrency} workers, {engine.limiter.max_per_host} per host")
+    return engine
@@ -0,0 +1,146 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+
+# Lower-cases scheme/host, drops default ports, fragments and trailing slashes, sorts the query
+def canonical_url(url):
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower() or 'https'
+    host = (parts.hostname or '').lower()
+    if parts.port and (scheme, parts.port) not in (('http', 80), ('https', 443)):
+        host = f'{host}:{parts.port}'
+    path = parts.path.rstrip('/') or '/'
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((scheme, host, path, query, ''))
+
+
+# Stand-in for requests.Response when a page is served from the cache
+class CachedResponse:
+    def __init__(self, url, content, status_code=200):
+        self.url = url
+        self.content = content
+        self.status_code = status_code
+        self.from_cache = True
+
+    @property
+    def text(self):
+        return self.content.decode('utf-8', errors='replace')
+
+    def raise_for_status(self):
+        pass
+
+
+# On-disk response cache: bodies stored once by content hash, index in SQLite keyed by canonical URL
+class HttpCache:
+    def __init__(self, cache_dir=os.path.join('output', '.http_cache'), ttl=6 * 3600, max_bytes=500 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.join(cache_dir, 'bodies'), exist_ok=True)
+        self._db = sqlite3.connect(os.path.join(cache_dir, 'index.sqlite'), check_same_thread=False)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS entries (
+                url TEXT PRIMARY KEY,
+                body_hash TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                fetched_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )""")
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_entries_access ON entries (last_access)")
+        self._db.commit()
+
+    def _body_path(self, body_hash):
+        return os.path.join(self.cache_dir, 'bodies', body_hash[:2], body_hash)
+
+    def lookup(self, url):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT body_hash, etag, last_modified, fetched_at FROM entries WHERE url = ?",
+                (canonical_url(url),)).fetchone()
+        if not row or not os.path.exists(self._body_path(row[0])):
+            return None
+        return {'body_hash': row[0], 'etag': row[1], 'last_modified': row[2], 'fetched_at': row[3]}
+
+    def is_fresh(self, entry):
+        return time.time() - entry['fetched_at'] < self.ttl
+
+    def conditional_headers(self, entry):
+        headers = {}
+        if entry and entry['etag']:
+            headers['If-None-Match'] = entry['etag']
+        if entry and entry['last_modified']:
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def read(self, url, entry):
+        with open(self._body_path(entry['body_hash']), 'rb') as f:
+            content = f.read()
+        with self._lock:
+            self._db.execute("UPDATE entries SET last_access = ? WHERE url = ?", (time.time(), canonical_url(url)))
+            self._db.commit()
+        return CachedResponse(url, content)
+
+    # Called after a 304: the stored body is still current, restart its TTL
+    def refresh(self, url, entry):
+        with self._lock:
+            self._db.execute("UPDATE entries SET fetched_at = ? WHERE url = ?", (time.time(), canonical_url(url)))
+            self._db.commit()
+        return self.read(url, entry)
+
+    def store(self, url, response):
+        content = response.content
+        body_hash = hashlib.sha256(content).hexdigest()
+        path = self._body_path(body_hash)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f'{path}.{threading.get_ident()}.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (canonical_url(url), body_hash, len(content), response.headers.get('ETag'),
+                 response.headers.get('Last-Modified'), now, now))
+            self._db.commit()
+            self._evict()
+
+    # Drops least recently used entries until the cache fits in max_bytes
+    def _evict(self):
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self._db.execute("SELECT url, body_hash, size FROM entries ORDER BY last_access").fetchall()
+        for url, body_hash, size in rows:
+            if total <= self.max_bytes:
+                break
+            self._db.execute("DELETE FROM entries WHERE url = ?", (url,))
+            total -= size
+            shared = self._db.execute("SELECT 1 FROM entries WHERE body_hash = ? LIMIT 1", (body_hash,)).fetchone()
+            if not shared and os.path.exists(self._body_path(body_hash)):
+                os.remove(self._body_path(body_hash))
+        self._db.commit()
+
+    def record(self, outcome):
+        with self._lock:
+            setattr(self, outcome, getattr(self, outcome) + 1)
+
+    def report(self):
+        total = self.hits + self.revalidated + self.misses
+        logging.info(f"HTTP cache: {self.hits} hits, {self.revalidated} revalidated (304), "
+                     f"{self.misses} misses out of {total} requests")
+
+    def close(self):
+        self._db.close()
@@ -0,0 +1,161 @@
+import re
+
+# Lead attribute -> column name in lead files, the lead store and scraped records
+LEAD_FIELDS = {
+    'name': 'Name',
+    'phone': 'Phone',
+    'website': 'Website',
+    'google_stars': 'Google Stars',
+    'google_reviews': 'Google Reviews',
+    'tripadvisor_stars': 'TripAdvisor Stars',
+    'tripadvisor_reviews': 'TripAdvisor Reviews',
+    'wanderlog_rank': 'Wanderlog Ranking',
+    'wanderlog_list': 'Wanderlog List',
+    'about': 'About',
+    'latitude': 'Latitude',
+    'longitude': 'Longitude',
+    'hours': 'Hours',
+    'categories': 'Categories',
+    'link': 'Link',
+}
+FIELD_NAMES = {column: name for name, column in LEAD_FIELDS.items()}
+STAR_FIELDS = ('google_stars', 'tripadvisor_stars')
+COUNT_FIELDS = ('google_reviews', 'tripadvisor_reviews', 'wanderlog_rank')
+COORDINATE_FIELDS = ('latitude', 'longitude')
+# Place details only the embedded page state carries
+DETAIL_FIELDS = ('latitude', 'longitude', 'hours', 'categories')
+# The place fields prompts are built from, and so the only ones in the content hash. Ratings, review counts
+# and the Wanderlog rank move between scrapes without changing what the LLM is told.
+HASHED_FIELDS = ('name', 'phone', 'website', 'about')
+
+# Placeholders scrapers and spreadsheets use for "no value"
+MISSING = {'', 'n/a', 'nan', '<na>', 'nat', 'none', 'null'}
+_COUNT = re.compile(r'(\d[\d,]*(?:\.\d+)?)\s*([km]?)', re.I)
+
+
+def is_missing(value):
+    if value is None:
+        return True
+    if isinstance(value, float):
+        return value != value
+    return str(value).strip().lower() in MISSING
+
+
+def parse_stars(value):
+    if is_missing(value):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    match = re.search(r'\d+(?:[.,]\d+)?', str(value))
+    return float(match.group().replace(',', '.')) if match else None
+
+
+def parse_coordinate(value):
+    if is_missing(value):
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+# "1,234", "(356)", "1.2K" -> int
+def parse_count(value):
+    if is_missing(value):
+        return None
+    if isinstance(value, (int, float)):
+        return int(value)
+    match = _COUNT.search(str(value))
+    if not match:
+        return None
+    number = float(match.group(1).replace(',', ''))
+    return round(number * {'k': 1_000, 'm': 1_000_000}.get(match.group(2).lower(), 1))
+
+
+# "#3", "#4 on" -> 3, 4
+def parse_rank(value):
+    if is_missing(value):
+        return None
+    if isinstance(value, (int, float)):
+        return int(value)
+    match = re.search(r'\d+', str(value))
+    return int(match.group()) if match else None
+
+
+def _text(value):
+    return None if is_missing(value) else str(value)
+
+
+# One scraped place with its numbers parsed once: float stars, int review counts and rank, None when
+# missing. With __slots__ and no number strings it takes about a third less memory than the scraped dict.
+# get() and [] take column names, so a Lead goes wherever a scraped record does.
+class Lead:
+    __slots__ = tuple(LEAD_FIELDS)
+
+    def __init__(self, name=None, phone=None, website=None, google_stars=None, google_reviews=None,
+                 tripadvisor_stars=None, tripadvisor_reviews=None, wanderlog_rank=None, wanderlog_list=None,
+                 about=None, latitude=None, longitude=None, hours=None, categories=None, link=None):
+        self.name = name
+        self.phone = phone
+        self.website = website
+        self.google_stars = google_stars
+        self.google_reviews = google_reviews
+        self.tripadvisor_stars = tripadvisor_stars
+        self.tripadvisor_reviews = tripadvisor_reviews
+        self.wanderlog_rank = wanderlog_rank
+        self.wanderlog_list = wanderlog_list
+        self.about = about
+        self.latitude = latitude
+        self.longitude = longitude
+        self.hours = hours
+        self.categories = categories
+        self.link = link
+
+    # From a scraped record, store row or DataFrame row (column names, 'N/A' or NaN for missing)
+    @classmethod
+    def from_record(cls, record):
+        if isinstance(record, cls):
+            return record
+        get = record.get
+        return cls(
+            name=_text(get('Name')),
+            phone=_text(get('Phone')),
+            website=_text(get('Website')),
+            google_stars=parse_stars(get('Google Stars')),
+            google_reviews=parse_count(get('Google Reviews')),
+            tripadvisor_stars=parse_stars(get('TripAdvisor Stars')),
+            tripadvisor_reviews=parse_count(get('TripAdvisor Reviews')),
+            wanderlog_rank=parse_rank(get('Wanderlog Ranking')),
+            wanderlog_list=_text(get('Wanderlog List')),
+            about=_text(get('About')),
+            latitude=parse_coordinate(get('Latitude')),
+            longitude=parse_coordinate(get('Longitude')),
+            hours=_text(get('Hours')),
+            categories=_text(get('Categories')),
+            link=_text(get('Link')),
+        )
+
+    def values(self):
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def hashed_values(self):
+        return tuple(getattr(self, name) for name in HASHED_FIELDS)
+
+    def to_record(self):
+        return dict(zip(LEAD_FIELDS.values(), self.values()))
+
+    def get(self, column, default=None):
+        name = FIELD_NAMES.get(column)
+        return default if name is None else getattr(self, name)
+
+    def __getitem__(self, column):
+        if column not in FIELD_NAMES:
+            raise KeyError(column)
+        return getattr(self, FIELD_NAMES[column])
+
+    def __eq__(self, other):
+        return isinstance(other, Lead) and self.values() == other.values()
+
+    def __repr__(self):
+        return f"Lead({', '.join(f'{name}={value!r}' for name, value in zip(self.__slots__, self.values()))})"
+
@@ -0,0 +1,102 @@
+import logging
+import os
+
+import pandas as pd
+import pyarrow as pa
+from openpyxl import Workbook
+
+from lead import (COORDINATE_FIELDS, COUNT_FIELDS, LEAD_FIELDS, STAR_FIELDS, Lead, parse_coordinate, parse_count,
+                  parse_rank, parse_stars)
+
+# Parquet is the interchange format between stages; CSV and XLSX are for people
+PARQUET_EXTENSIONS = ('.parquet', '.pq')
+
+# Arrow types of the Lead columns: stars and coordinates are doubles, review counts and rank int64, missing values null
+LEAD_SCHEMA = pa.schema([
+    (column, pa.float64() if name in STAR_FIELDS + COORDINATE_FIELDS
+     else pa.int64() if name in COUNT_FIELDS else pa.string())
+    for name, column in LEAD_FIELDS.items()
+])
+_PARSERS = {'Google Stars': parse_stars, 'TripAdvisor Stars': parse_stars, 'Google Reviews': parse_count,
+            'TripAdvisor Reviews': parse_count, 'Wanderlog Ranking': parse_rank, 'Latitude': parse_coordinate,
+            'Longitude': parse_coordinate}
+
+
+# Leads (or scraped records) to an Arrow table, built column by column straight from the slots
+def leads_to_table(leads):
+    leads = [Lead.from_record(lead) for lead in leads]
+    arrays = [pa.array([getattr(lead, name) for lead in leads], type=field.type)
+              for name, field in zip(LEAD_FIELDS, LEAD_SCHEMA)]
+    return pa.Table.from_arrays(arrays, schema=LEAD_SCHEMA)
+
+
+# Arrow-backed DataFrame: the columns wrap the Arrow buffers instead of copying them into numpy/objects
+def leads_frame(leads):
+    return leads_to_table(leads).to_pandas(types_mapper=pd.ArrowDtype)
+
+
+# Lead files written before the typed columns hold stars, counts and rank as text ("1,234", "#3");
+# those columns are parsed to numbers on load
+def to_lead_dtypes(df):
+    for column, parse in _PARSERS.items():
+        if column in df and not pd.api.types.is_numeric_dtype(df[column]):
+            arrow_type = LEAD_SCHEMA.field(column).type
+            values = pa.array([parse(value) for value in df[column]], type=arrow_type)
+            df[column] = pd.Series(values, index=df.index, dtype=pd.ArrowDtype(arrow_type))
+    return df
+
+
+# Object columns become nullable boolean or string columns, so Parquet gets one schema for every file
+def to_typed_frame(data):
+    df = data.copy() if isinstance(data, pd.DataFrame) else pd.DataFrame(data)
+    for column in df.columns:
+        if df[column].dtype == object:
+            kind = pd.api.types.infer_dtype(df[column], skipna=True)
+            df[column] = df[column].astype('boolean' if kind == 'boolean' else 'string')
+    return df
+
+
+def load_leads(path):
+    extension = os.path.splitext(path)[1].lower()
+    if extension in PARQUET_EXTENSIONS:
+        df = pd.read_parquet(path)
+    elif extension == '.csv':
+        df = pd.read_csv(path, dtype_backend='numpy_nullable')
+    elif extension in ('.xlsx', '.xls'):
+        df = pd.read_excel(path)
+    else:
+        raise ValueError(f"Unsupported lead file type: {path}")
+    return to_lead_dtypes(df)
+
+
+def save_leads(df, path):
+    extension = os.path.splitext(path)[1].lower()
+    if extension in PARQUET_EXTENSIONS:
+        to_typed_frame(df).to_parquet(path, index=False)
+    elif extension == '.csv':
+        df.to_csv(path, index=False)
+    elif extension == '.xlsx':
+        export_xlsx(df, path)
+    else:
+        raise ValueError(f"Unsupported lead file type: {path}")
+
+
+def write_xlsx_rows(header, rows, path):
+    # Write-only mode streams rows to disk instead of building the whole sheet in memory
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    sheet.append(list(header))
+    count = 0
+    for row in rows:
+        sheet.append([None if value is None or value is pd.NA or value != value else value for value in row])
+        count += 1
+    workbook.save(path)
+    return count
+
+
+# Explicit export step: a lead file (or DataFrame) to XLSX
+def export_xlsx(source, path):
+    df = load_leads(source) if isinstance(source, str) else source
+    count = write_xlsx_rows(df.columns, df.itertuples(index=False, name=None), path)
+    logging.info(f"Exported {count} rows to {path}")
+    return path
@@ -0,0 +1,71 @@
+# Prompt templates shared by the per-lead and batched generators
+
+
+def _present(value):
+    return value is not None and value == value and str(value) not in ('', '<NA>')
+
+
+# Missing fields read 'N/A' in prompts, as they did when scraped records were all strings
+def field_text(row, column):
+    value = row.get(column)
+    return str(value) if _present(value) else 'N/A'
+
+
+# One sentence of what the site probe found, or '' when the lead was not probed
+def website_facts(row):
+    status = row.get('Site Status')
+    if not _present(status):
+        return ''
+    if status == 'social':
+        return "They have no website of their own, only a social media page."
+    if status != 'ok':
+        # Only a site found down is worth mentioning; a blocked or unclear probe says nothing about it
+        if row.get('Website Category') != 'broken':
+            return ''
+        return f"Their website could not be loaded ({str(status).replace('_', ' ')})."
+    facts = []
+    if _present(row.get('Site Response Ms')):
+        ms = float(row['Site Response Ms'])
+        facts.append(f"takes {ms / 1000:.1f}s to respond" if ms >= 1000 else f"responds in {ms:.0f} ms")
+    if _present(row.get('Site Bytes')):
+        kb = float(row['Site Bytes']) / 1024
+        facts.append(f"weighs {kb / 1024:.1f} MB" if kb >= 1024 else f"weighs {max(kb, 1):.0f} KB")
+    if str(row.get('Site HTTPS')) == 'False':
+        facts.append("is not served over HTTPS")
+    if str(row.get('Site Mobile')) == 'False':
+        facts.append("has no mobile viewport")
+    if _present(row.get('Site CMS')):
+        facts.append(f"is built with {row['Site CMS']}")
+    return f"Their website {', '.join(facts)}." if facts else ''
+
+
+def build_summary_prompt(row):
+    facts = website_facts(row)
+    return (f"Generate a summary for {field_text(row, 'Name')} with the following details: "
+            f"Phone: {field_text(row, 'Phone')}, Website: {field_text(row, 'Website')}, "
+            f"About: {field_text(row, 'About')}."
+            + (f" {facts}" if facts else ''))
+
+
+def build_email_prompt(row):
+    name = field_text(row, 'Name')
+    website = field_text(row, 'Website')
+    about = field_text(row, 'About')
+    facts = website_facts(row)
+    if row.get('Website Category') == 'broken':
+        return (f"Write an introductory email. Introduce me as Leo from Liistudios, a software agency based in East London. "
+                f"Let {name} know, tactfully, that their website ({website}) is currently not loading for visitors. {facts} "
+                f"Offer to get it back online and improve it, and make the email engaging and helpful rather than alarming.")
+    if website.endswith('.co.za'):
+        return (f"Write an introductory email. Introduce me as Leo from Liistudios, a software agency based in East London. "
+                f"Include a personalized approach to {name} and ask who is in charge of their webpage ({website}). "
+                f"Make the email engaging and encourage them to inquire about how we can help improve their business."
+                + (f" Use these findings about their site where relevant: {facts}" if facts else ''))
+    elif 'facebook' in website:
+        return (f"Write an introductory email. Introduce me as Leo from Liistudios, a software agency based in East London. "
+                f"Propose a solution to improve their online presence and suggest the benefits tailored to their business "
+                f"as described: {about}. Focus on making the email compelling and highlighting specific benefits.")
+    return (f"Write an introductory email. Introduce me as Leo from Liistudios, a software agency based in East London. "
+            f"Inquire if they would be interested in improving their online presence and optimizing their website ({website}). "
+            f"Make the email engaging and encourage them to inquire about how we can help improve their business."
+            + (f" Use these findings about their site where relevant: {facts}" if facts else ''))
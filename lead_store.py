@@ -0,0 +1,351 @@
+import csv
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from http_cache import canonical_url
+from lead import LEAD_FIELDS, Lead
+
+DEFAULT_STORE_PATH = os.path.join('output', 'leads.sqlite')
+
+# Scraped place fields, in the column order of the CSV/XLSX exports
+PLACE_FIELDS = list(LEAD_FIELDS.values())
+_PLACE_COLUMNS = [re.sub(r'\W+', '_', field.lower()) for field in PLACE_FIELDS]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS categories (
+    id INTEGER PRIMARY KEY,
+    url TEXT NOT NULL UNIQUE,
+    name TEXT,
+    source_url TEXT,
+    first_seen REAL NOT NULL,
+    last_seen REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_categories_source ON categories (source_url);
+
+CREATE TABLE IF NOT EXISTS listing_links (
+    id INTEGER PRIMARY KEY,
+    link TEXT NOT NULL UNIQUE,
+    place_id TEXT UNIQUE,
+    name TEXT,
+    category_url TEXT,
+    first_seen REAL NOT NULL,
+    last_seen REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_listing_links_category ON listing_links (category_url);
+
+CREATE TABLE IF NOT EXISTS places (
+    id INTEGER PRIMARY KEY,
+    place_id TEXT UNIQUE,
+    {place_columns},
+    content_hash TEXT,
+    scraped_at REAL NOT NULL,
+    changed_at REAL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_places_link ON places (link);
+
+CREATE TABLE IF NOT EXISTS generated_content (
+    link TEXT PRIMARY KEY,
+    summary TEXT,
+    email TEXT,
+    model TEXT,
+    input_hash TEXT,
+    generated_at REAL NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS site_probes (
+    url TEXT PRIMARY KEY,
+    status TEXT,
+    final_url TEXT,
+    https INTEGER,
+    redirects INTEGER,
+    response_ms REAL,
+    page_bytes INTEGER,
+    cms TEXT,
+    mobile INTEGER,
+    error TEXT,
+    probed_at REAL NOT NULL
+);
+""".format(place_columns=',\n    '.join(f'{column} TEXT' for column in _PLACE_COLUMNS))
+
+
+SITE_PROBE_FIELDS = ['url', 'status', 'final_url', 'https', 'redirects', 'response_ms', 'page_bytes', 'cms', 'mobile', 'error']
+
+# Bumped whenever content_hash changes what it covers
+HASH_VERSION = 2
+
+# Columns added after the first release, for stores created before them
+MIGRATIONS = [
+    ('places', 'content_hash', 'TEXT'),
+    ('places', 'changed_at', 'REAL'),
+    ('generated_content', 'input_hash', 'TEXT'),
+    ('places', 'latitude', 'TEXT'),
+    ('places', 'longitude', 'TEXT'),
+    ('places', 'hours', 'TEXT'),
+    ('places', 'categories', 'TEXT'),
+]
+
+
+# Hash of what the prompts are built from: equal hashes mean nothing worth regenerating changed. Hashed as
+# typed Lead values, so a scraped record, a store row and a lead file row of one place agree. A probed lead
+# row also hashes its Website Category (which picks the email), but not the raw probe numbers, which
+# differ on every probe.
+def content_hash(record):
+    fields = Lead.from_record(record).hashed_values()
+    category = record.get('Website Category')
+    if isinstance(category, str) and category:
+        fields += (category,)
+    return hashlib.sha1(json.dumps(fields, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+
+def place_id_from_link(link):
+    match = re.search(r'/place/details/(\d+)', link or '')
+    return match.group(1) if match else None
+
+
+# Local SQLite lead store: every stage upserts here, dedup is a unique-index lookup, CSV/XLSX are exports
+class LeadStore:
+    def __init__(self, path=DEFAULT_STORE_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(SCHEMA)
+        self._migrate()
+        self._rehash()
+
+    def _migrate(self):
+        for table, column, declaration in MIGRATIONS:
+            columns = {row[1] for row in self._db.execute(f"PRAGMA table_info({table})")}
+            if column not in columns:
+                self._db.execute(f"ALTER TABLE {table} ADD COLUMN {column} {declaration}")
+        self._db.commit()
+
+    # Stores from an older hash (user_version 0: raw strings, 1: every place field) are rehashed once,
+    # carrying the new hash over to generated text made from the unchanged fields so none of it looks stale
+    def _rehash(self):
+        if self._db.execute("PRAGMA user_version").fetchone()[0] >= HASH_VERSION:
+            return
+        columns = ', '.join(_PLACE_COLUMNS)
+        for row in self._db.execute(f"SELECT {columns}, content_hash FROM places").fetchall():
+            record = dict(zip(PLACE_FIELDS, row))
+            new_hash = content_hash(record)
+            self._db.execute("UPDATE places SET content_hash = ? WHERE link = ?", (new_hash, record['Link']))
+            self._db.execute("UPDATE generated_content SET input_hash = ? WHERE link = ? AND input_hash = ?",
+                             (new_hash, record['Link'], row[-1]))
+        self._db.execute(f"PRAGMA user_version = {HASH_VERSION}")
+        self._db.commit()
+
+    def _write(self, sql, rows):
+        with self._lock:
+            before = self._db.total_changes
+            self._db.executemany(sql, rows)
+            self._db.commit()
+            return self._db.total_changes - before
+
+    # Returns how many of the categories were not in the store yet
+    def upsert_categories(self, links, source_url=None):
+        now = time.time()
+        rows = [(canonical_url(link['href']), link['text'], source_url, now, now) for link in links]
+        added = self._write("""
+            INSERT INTO categories (url, name, source_url, first_seen, last_seen) VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(url) DO NOTHING""", rows)
+        self._write("UPDATE categories SET name = ?, last_seen = ? WHERE url = ?",
+                    [(name, seen, url) for url, name, _, _, seen in rows])
+        return added
+
+    def upsert_listing_links(self, restaurants, category_url=None):
+        now = time.time()
+        rows = [(canonical_url(r['Link']), place_id_from_link(r['Link']), r['Name'], category_url, now, now)
+                for r in restaurants]
+        # A place reached through a second link variant keeps its first row (place_id is unique too)
+        added = self._write("""
+            INSERT INTO listing_links (link, place_id, name, category_url, first_seen, last_seen)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT DO NOTHING""", rows)
+        self._write("UPDATE listing_links SET last_seen = ? WHERE link = ? OR place_id = ?",
+                    [(now, link, place_id) for link, place_id, *_ in rows])
+        return added
+
+    def upsert_places(self, records):
+        now = time.time()
+        columns = ', '.join(_PLACE_COLUMNS)
+        updates = ', '.join(f'{c} = excluded.{c}' for c in _PLACE_COLUMNS)
+        # changed_at only moves when the content hash does, so unchanged places skip downstream work
+        insert = f"""
+            INSERT INTO places (place_id, {columns}, content_hash, scraped_at, changed_at)
+            VALUES (?, {', '.join('?' * len(_PLACE_COLUMNS))}, ?, ?, ?)
+            ON CONFLICT({{target}}) DO UPDATE SET {updates}, scraped_at = excluded.scraped_at,
+                changed_at = CASE WHEN places.content_hash IS excluded.content_hash
+                                  THEN places.changed_at ELSE excluded.changed_at END,
+                content_hash = excluded.content_hash"""
+        by_place_id, by_link = [], []
+        for record in records:
+            values = [record.get(field) for field in PLACE_FIELDS]
+            values[PLACE_FIELDS.index('Link')] = canonical_url(record['Link'])
+            place_id = place_id_from_link(record['Link'])
+            (by_place_id if place_id else by_link).append((place_id, *values, content_hash(record), now, now))
+        # Wanderlog places dedupe on their numeric id, so slug or query variants of a link merge
+        return (self._write(insert.format(target='place_id'), by_place_id)
+                + self._write(insert.format(target='link'), by_link))
+
+    # input_hash is the content_hash of the place fields the text was generated from
+    def upsert_generated(self, link, summary, email, model=None, input_hash=None):
+        return self._write("""
+            INSERT INTO generated_content (link, summary, email, model, input_hash, generated_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT(link) DO UPDATE SET summary = excluded.summary, email = excluded.email,
+                model = excluded.model, input_hash = excluded.input_hash, generated_at = excluded.generated_at""",
+            [(canonical_url(link), summary, email, model, input_hash, time.time())])
+
+    # Stored summary/email per link, for the links whose content `model` generated from input_hashes[link]
+    def reusable_generated(self, input_hashes, model=None):
+        reusable = {}
+        with self._lock:
+            for link, input_hash in input_hashes.items():
+                row = self._db.execute(
+                    "SELECT summary, email FROM generated_content WHERE link = ? AND input_hash = ? AND model IS ?",
+                    (canonical_url(link), input_hash, model)).fetchone()
+                if row:
+                    reusable[link] = {'Summary': row[0], 'Email': row[1]}
+        return reusable
+
+    # Website probe results, keyed by the probed URL as given (not canonicalized: scheme matters here)
+    def upsert_site_probes(self, results):
+        columns = SITE_PROBE_FIELDS
+        now = time.time()
+        return self._write(f"""
+            INSERT OR REPLACE INTO site_probes ({', '.join(columns)}, probed_at)
+            VALUES ({', '.join('?' * len(columns))}, ?)""",
+            [(*[result.get(column) for column in columns], now) for result in results])
+
+    def site_probes(self, urls, max_age):
+        cutoff = time.time() - max_age
+        columns = SITE_PROBE_FIELDS
+        found = {}
+        with self._lock:
+            for url in dict.fromkeys(url for url in urls if url):
+                row = self._db.execute(f"SELECT {', '.join(columns)} FROM site_probes WHERE url = ? AND probed_at >= ?",
+                                       (url, cutoff)).fetchone()
+                if row:
+                    result = dict(zip(columns, row))
+                    for flag in ('https', 'mobile'):
+                        result[flag] = None if result[flag] is None else bool(result[flag])
+                    found[url] = result
+        return found
+
+    def has_place(self, link):
+        with self._lock:
+            return self._db.execute("SELECT 1 FROM places WHERE link = ? OR place_id = ?",
+                                    (canonical_url(link), place_id_from_link(link))).fetchone() is not None
+
+    # Place records (as scraped dicts) for the given links, matched by place id where the link has one
+    def place_records(self, links):
+        columns = ', '.join(f'{c} AS "{f}"' for c, f in zip(_PLACE_COLUMNS, PLACE_FIELDS))
+        records = []
+        with self._lock:
+            for link in links:
+                place_id = place_id_from_link(link)
+                if place_id:
+                    row = self._db.execute(f"SELECT {columns} FROM places WHERE place_id = ?", (place_id,))
+                else:
+                    row = self._db.execute(f"SELECT {columns} FROM places WHERE link = ?", (canonical_url(link),))
+                row = row.fetchone()
+                if row:
+                    records.append(dict(zip(PLACE_FIELDS, row)))
+        return records
+
+    # Incremental refresh: listing links first seen / no longer seen since a refresh started
+    def listing_changes(self, category_urls, since):
+        urls = [canonical_url(url) for url in category_urls]
+        marks = ', '.join('?' * len(urls))
+        with self._lock:
+            new = [row[0] for row in self._db.execute(
+                f"SELECT link FROM listing_links WHERE category_url IN ({marks}) AND first_seen >= ? ORDER BY id",
+                (*urls, since))]
+            removed = [row[0] for row in self._db.execute(
+                f"SELECT link FROM listing_links WHERE category_url IN ({marks}) AND last_seen < ? ORDER BY id",
+                (*urls, since))]
+        return new, removed
+
+    # Links with no stored place yet, or whose place was last scraped before `before`
+    def places_to_scrape(self, links, before):
+        stale = []
+        with self._lock:
+            for link in links:
+                place_id = place_id_from_link(link)
+                row = self._db.execute("SELECT scraped_at FROM places WHERE place_id = ? OR link = ?",
+                                       (place_id, canonical_url(link))).fetchone()
+                if row is None or row[0] < before:
+                    stale.append(link)
+        return stale
+
+    def changed_places(self, links, since):
+        changed = []
+        with self._lock:
+            for link in links:
+                row = self._db.execute("SELECT changed_at FROM places WHERE place_id = ? OR link = ?",
+                                       (place_id_from_link(link), canonical_url(link))).fetchone()
+                if row and (row[0] or 0) >= since:
+                    changed.append(link)
+        return changed
+
+    def query(self, sql, params=()):
+        with self._lock:
+            cursor = self._db.execute(sql, params)
+            header = [column[0] for column in cursor.description]
+            return header, cursor.fetchall()
+
+    # Export views
+    def categories(self, source_url=None):
+        sql = "SELECT name AS text, url AS href FROM categories"
+        if source_url:
+            return self.query(sql + " WHERE source_url = ? ORDER BY id", (source_url,))
+        return self.query(sql + " ORDER BY id")
+
+    def listing_links(self, category_url=None):
+        sql = "SELECT name AS Name, link AS Link FROM listing_links"
+        if category_url:
+            return self.query(sql + " WHERE category_url = ? ORDER BY id", (category_url,))
+        return self.query(sql + " ORDER BY id")
+
+    def leads(self):
+        columns = ', '.join(f'p.{c} AS "{f}"' for c, f in zip(_PLACE_COLUMNS, PLACE_FIELDS))
+        return self.query(f"""
+            SELECT {columns}, g.summary AS Summary, g.email AS Email
+            FROM places p LEFT JOIN generated_content g ON g.link = p.link
+            ORDER BY p.id""")
+
+    def export_csv(self, view, path):
+        header, rows = view
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(header)
+            writer.writerows(rows)
+        return len(rows)
+
+    def export_xlsx(self, view, path):
+        from lead_io import write_xlsx_rows
+        header, rows = view
+        return write_xlsx_rows(header, rows, path)
+
+    def close(self):
+        self._db.close()
+
+
+# Every stage writes into the local lead store; opened on first use
+_default_store = None
+_default_lock = threading.Lock()
+
+
+def get_lead_store():
+    global _default_store
+    with _default_lock:
+        if _default_store is None:
+            _default_store = LeadStore()
+    return _default_store
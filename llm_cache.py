@@ -0,0 +1,76 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+
+def cache_key(model_name, prompt, params=None):
+    payload = json.dumps({'model': model_name, 'prompt': prompt, 'params': params or {}}, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+# Persistent prompt -> response cache; old entries expire and the least recently used go first when full
+class LLMCache:
+    def __init__(self, path=os.path.join('output', 'llm_cache.sqlite'), max_entries=50_000,
+                 max_age_days=30, force_refresh=False):
+        self.max_entries = max_entries
+        self.max_age = max_age_days * 86400
+        self.force_refresh = force_refresh
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                response TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )""")
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_responses_access ON responses (last_access)")
+        self._db.commit()
+        self.evict()
+
+    def get(self, key):
+        if self.force_refresh:
+            self.misses += 1
+            return None
+        with self._lock:
+            row = self._db.execute(
+                "SELECT response FROM responses WHERE key = ? AND created_at > ?",
+                (key, time.time() - self.max_age)).fetchone()
+            if row:
+                self.hits += 1
+                self._db.execute("UPDATE responses SET last_access = ? WHERE key = ?", (time.time(), key))
+                self._db.commit()
+                return row[0]
+            self.misses += 1
+            return None
+
+    def put(self, key, model_name, response):
+        now = time.time()
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)",
+                             (key, model_name, response, now, now))
+            self._db.commit()
+
+    def evict(self):
+        with self._lock:
+            self._db.execute("DELETE FROM responses WHERE created_at <= ?", (time.time() - self.max_age,))
+            self._db.execute("""
+                DELETE FROM responses WHERE key IN (
+                    SELECT key FROM responses ORDER BY last_access DESC LIMIT -1 OFFSET ?
+                )""", (self.max_entries,))
+            self._db.commit()
+
+    def report(self):
+        logging.info(f"LLM cache: {self.hits} hits, {self.misses} misses")
+
+    def close(self):
+        self.evict()
+        self._db.close()
@@ -0,0 +1,107 @@
+import logging
+import random
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import google.generativeai as genai
+from google.api_core import exceptions as api_exceptions
+
+from metrics import metrics
+from rate_limit import TokenBucket
+
+# Errors worth retrying: quota/rate limits and transient server failures
+RETRYABLE_ERRORS = (
+    api_exceptions.ResourceExhausted,
+    api_exceptions.TooManyRequests,
+    api_exceptions.ServiceUnavailable,
+    api_exceptions.InternalServerError,
+    api_exceptions.DeadlineExceeded,
+)
+QUOTA_ERRORS = (api_exceptions.ResourceExhausted, api_exceptions.TooManyRequests)
+
+
+class RateLimiter:
+    def __init__(self, rpm=15, tpm=1_000_000):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+
+    def acquire(self, estimated_tokens):
+        self.requests.take(1)
+        self.tokens.take(estimated_tokens)
+
+    def settle(self, estimated_tokens, actual_tokens):
+        self.tokens.adjust(actual_tokens - estimated_tokens)
+
+    def pause(self, seconds):
+        self.requests.drain(seconds)
+
+
+def estimate_tokens(prompt, expected_output=400):
+    return len(prompt) // 4 + expected_output
+
+
+# Quota errors carry the server's suggested wait, e.g. "retry_delay { seconds: 21 }"
+def retry_after(error):
+    match = re.search(r'retry_delay\s*\{\s*seconds:\s*(\d+)', str(error)) or \
+        re.search(r'retry in ([\d.]+)\s*s', str(error), re.IGNORECASE)
+    return float(match.group(1)) if match else None
+
+
+def configure_gemini(api_key):
+    genai.configure(api_key=api_key)
+
+
+# Shared Gemini client: one model instance, rpm/tpm token buckets, backoff with jitter
+class LLMClient:
+    def __init__(self, model_name='gemini-1.5-flash', rpm=15, tpm=1_000_000, concurrency=4,
+                 max_retries=5, base_delay=2.0, max_delay=60.0, generation_config=None):
+        self.model_name = model_name
+        self.generation_config = generation_config or {}
+        self.model = genai.GenerativeModel(model_name, generation_config=self.generation_config or None)
+        self.limiter = RateLimiter(rpm, tpm)
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def _backoff(self, attempt, error):
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        server_delay = retry_after(error)
+        if server_delay is not None:
+            delay = max(delay, server_delay + random.uniform(0, 1))
+        if isinstance(error, QUOTA_ERRORS):
+            self.limiter.pause(delay)
+        return delay
+
+    def generate(self, prompt, max_retries=None, generation_config=None):
+        max_retries = self.max_retries if max_retries is None else max_retries
+        estimate = estimate_tokens(prompt)
+        attempt = 0
+        while True:
+            self.limiter.acquire(estimate)
+            try:
+                with metrics.timer('llm_request_seconds', model=self.model_name):
+                    response = self.model.generate_content(prompt, generation_config=generation_config)
+                metrics.inc('llm_requests_total', model=self.model_name)
+                usage = getattr(response, 'usage_metadata', None)
+                if usage and usage.total_token_count:
+                    self.limiter.settle(estimate, usage.total_token_count)
+                    metrics.inc('llm_tokens_total', usage.total_token_count, model=self.model_name)
+                else:
+                    metrics.inc('llm_tokens_estimated_total', estimate, model=self.model_name)
+                return response.text.strip()
+            except RETRYABLE_ERRORS as e:
+                metrics.inc('llm_retries_total', error=type(e).__name__)
+                attempt += 1
+                if attempt > max_retries:
+                    logging.error(f"Giving up after {max_retries} retries: {e}")
+                    raise
+                delay = self._backoff(attempt, e)
+                logging.warning(f"Gemini error ({type(e).__name__}), retry {attempt}/{max_retries} in {delay:.1f}s")
+                time.sleep(delay)
+
+    # Generate for many prompts concurrently; results keep the order of the prompts
+    def map(self, prompts, max_retries=None):
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            return list(pool.map(lambda p: self.generate(p, max_retries), prompts))
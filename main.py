@@ -1,84 +1,72 @@
 import requests
 from bs4 import BeautifulSoup
-from urllib.parse import urljoin, urlparse
 import json
 import os
-import csv
 import pandas as pd
 import logging
 import time
-from datetime import datetime
-import random
 import configparser
+import sys
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, FIRST_COMPLETED, wait
+from fetch_engine import create_fetch_engine
+from llm_cache import LLMCache, cache_key
+from lead_prompts import build_summary_prompt, build_email_prompt
+from batch_generation import generate_batched
+from checkpoint import CheckpointLog, checkpoint_path
+from lead_store import PLACE_FIELDS, content_hash, get_lead_store
+from crawl_frontier import CrawlFrontier, frontier_path
+from streaming import CsvSink, bounded_imap, drain, tee
+from campaign import CampaignScheduler, load_campaign
+from dedupe import dedupe_leads
+from lead import Lead
+from lead_io import export_xlsx, leads_frame, load_leads, save_leads
+from metrics import configure_metrics, metrics
+from scoring import DEFAULT_WEIGHTS, add_scores, website_classes
+from site_probe import SiteProber, probe_leads, website_url
+from work_queue import LeaseKeeper, RedisWorkQueue, SqliteWorkQueue, shard_order, worker_id
+from wanderlog import (CATEGORY_SELECTOR, extract_links, fetch_page, fetch_restaurant_list, parse_place_page_timed,
+                       parse_restaurant_page, record_place_parse, scrape_restaurant_page)
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+# Shared Gemini client and response cache, created by configure_api
+llm_client = None
+llm_cache = None
+email_batch_size = 0
+# Tiered email generator ([Email] mode = tiered or offline); None writes whole emails with the LLM
+email_generator = None
+
 # Combined functions from all apps
 
-def fetch_page(url):
-    try:
-        headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'}
-        response = requests.get(url, headers=headers, timeout=5)
-        return response.text
-    except requests.RequestException as e:
-        logging.error(f"Error fetching {url}: {e}")
-        return None
-
-def extract_links(html_content, base_url, selector):
-    soup = BeautifulSoup(html_content, 'html.parser')
-    links = []
-    for link in soup.select(selector):
-        href = link.get('href', '').strip()
-        text = link.get_text(strip=True)
-        if base_url and not urlparse(href).netloc:
-            href = urljoin(base_url, href)
-        links.append({'text': text, 'href': href})
-    return links
-
-def save_to_csv(data, filename):
+# Dedup happens on the store's unique url index; the CSV is an export of what this page listed
+@metrics.timed('save_seconds', function='save_to_csv')
+def save_to_csv(data, filename, source_url=None):
     os.makedirs('output', exist_ok=True)
     filepath = os.path.join('output', filename)
-    existing_data = []
-    if os.path.exists(filepath):
-        with open(filepath, 'r', newline='', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            existing_data = list(reader)
-    existing_set = {(row['text'], row['href']) for row in existing_data}
-    new_data = [row for row in data if (row['text'], row['href']) not in existing_set]
-    if new_data:
-        with open(filepath, 'a', newline='', encoding='utf-8') as f:
-            writer = csv.DictWriter(f, fieldnames=['text', 'href'])
-            if not existing_data:
-                writer.writeheader()
-            writer.writerows(new_data)
-        logging.info(f"New results added to {filepath}")
+    store = get_lead_store()
+    added = store.upsert_categories(data, source_url)
+    if added:
+        logging.info(f"{added} new results added to the lead store")
     else:
         logging.info("No new data to add.")
+    store.export_csv(store.categories(source_url), filepath)
+    logging.info(f"Exported to {filepath}")
 
-def scrape_website(url, selector, filename):
-    page_content = fetch_page(url)
+def scrape_website(url, selector, filename, engine=None):
+    page_content = fetch_page(url, engine)
     if page_content:
         links = extract_links(page_content, url, selector)
-        save_to_csv(links, filename)
+        save_to_csv(links, filename, url)
         return links
     return []
 
-def scrape_restaurants(url):
+@metrics.timed('stage_seconds', stage='scrape_restaurants')
+def scrape_restaurants(url, engine=None):
     try:
-        response = requests.get(url, timeout=5)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.text, 'html.parser')
-        restaurant_divs = soup.find_all('div', class_='d-flex mb-2 align-items-center')
-        restaurant_data = []
-        for div in restaurant_divs:
-            a_tag = div.find('a', class_='color-gray-900')
-            if a_tag:
-                name = a_tag.text.strip()
-                link = a_tag['href']
-                full_link = f'https://wanderlog.com{link}'
-                restaurant_data.append({'Name': name, 'Link': full_link})
-        return pd.DataFrame(restaurant_data)
+        return pd.DataFrame(fetch_restaurant_list(url, engine))
     except requests.RequestException as e:
         logging.error(f"Error fetching {url}: {e}")
         return pd.DataFrame()
@@ -93,33 +81,442 @@ def load_restaurant_links(csv_file):
         logging.error(f"Error loading CSV: {e}")
         raise
 
-def scrape_restaurant_page(url):
+# Original multi-pass BeautifulSoup extractor, kept as the reference for place_parser
+def parse_restaurant_page_soup(html, url):
+    soup = BeautifulSoup(html, 'html.parser')
+    name = soup.find('h1').get_text(strip=True) if soup.find('h1') else 'N/A'
+    google_stars, google_reviews = extract_ratings(soup, 0)
+    tripadvisor_stars, tripadvisor_reviews = extract_ratings(soup, 1)
+    wanderlog_ranking, wanderlog_list = extract_wanderlog_ranking(soup)
+    about_text = extract_about(soup)
+    address, phone, website = extract_contact_info(soup)
+    return {
+        'Name': name,
+        'Phone': phone,
+        'Website': website,
+        'Google Stars': google_stars,
+        'Google Reviews': google_reviews,
+        'TripAdvisor Stars': tripadvisor_stars,
+        'TripAdvisor Reviews': tripadvisor_reviews,
+        'Wanderlog Ranking': wanderlog_ranking,
+        'Wanderlog List': wanderlog_list,
+        'About': about_text,
+        'Link': url
+    }
+
+# Scrape place pages concurrently, returning Leads in the order of the input links
+# on_result(link, data, error) is called from the calling thread as each page finishes, with the scraped record
+def scrape_restaurant_pages(links, engine, on_result=None):
+    unique_links = list(dict.fromkeys(links))
+    results = {}
+
+    def scrape(link):
+        try:
+            return parse_restaurant_page(engine.get(link).text, link), None
+        except Exception as e:
+            logging.error(f"Failed to scrape {link}: {e}")
+            return None, e
+
+    for done, (link, (data, error)) in enumerate(engine.map(scrape, unique_links), 1):
+        logging.info(f"Scraped {done}/{len(unique_links)}: {link}")
+        if data:
+            results[link] = Lead.from_record(data)
+        if on_result:
+            on_result(link, data, error)
+    return [results[link] for link in unique_links if link in results]
+
+def parse_worker_count(config_path='config.ini'):
+    config = configparser.ConfigParser()
+    config.read(config_path)
+    return config.getint('Scraper', 'parse_workers', fallback=os.cpu_count() or 1)
+
+# Pipeline mode: fetch threads fill a bounded queue of raw HTML, a process pool parses it.
+# A full queue blocks the fetchers, so at most queue_size pages are held in memory.
+def scrape_restaurant_pages_pipelined(links, engine, parse_workers, queue_size=64, on_result=None, pool=None):
+    unique_links = list(dict.fromkeys(links))
+    raw_pages = queue.Queue(maxsize=queue_size)
+    done_marker = object()
+
+    def fetch(link):
+        try:
+            raw_pages.put((link, engine.get(link).text, None))
+        except Exception as e:
+            logging.error(f"Failed to scrape {link}: {e}")
+            raw_pages.put((link, None, e))
+
+    def produce():
+        for _ in engine.map(fetch, unique_links):
+            pass
+        raw_pages.put(done_marker)
+
+    producer = threading.Thread(target=produce, daemon=True)
+    producer.start()
+    results = {}
+    pending = {}
+
+    def collect(futures):
+        for future in futures:
+            link = pending.pop(future)
+            data, error = None, None
+            try:
+                data, extractor, elapsed = future.result()
+                results[link] = Lead.from_record(data)
+                record_place_parse(data, extractor, elapsed)
+            except Exception as e:
+                error = e
+                metrics.inc('parse_failures_total', page='place')
+                logging.error(f"Failed to parse {link}: {e}")
+            logging.info(f"Scraped {len(results)}/{len(unique_links)}: {link}")
+            if on_result:
+                on_result(link, data, error)
+
+    # A caller crawling batch after batch passes its own pool, so parser processes aren't restarted per batch
+    owned = pool is None
+    pool = pool or ProcessPoolExecutor(max_workers=parse_workers)
     try:
-        response = requests.get(url)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.text, 'html.parser')
-        name = soup.find('h1').get_text(strip=True) if soup.find('h1') else 'N/A'
-        google_stars, google_reviews = extract_ratings(soup, 0)
-        tripadvisor_stars, tripadvisor_reviews = extract_ratings(soup, 1)
-        wanderlog_ranking, wanderlog_list = extract_wanderlog_ranking(soup)
-        about_text = extract_about(soup)
-        address, phone, website = extract_contact_info(soup)
-        return {
-            'Name': name,
-            'Phone': phone,
-            'Website': website,
-            'Google Stars': google_stars,
-            'Google Reviews': google_reviews,
-            'TripAdvisor Stars': tripadvisor_stars,
-            'TripAdvisor Reviews': tripadvisor_reviews,
-            'Wanderlog Ranking': wanderlog_ranking,
-            'Wanderlog List': wanderlog_list,
-            'About': about_text,
-            'Link': url
-        }
-    except Exception as e:
-        logging.error(f"Failed to scrape {url}: {e}")
-        return None
+        while True:
+            item = raw_pages.get()
+            if item is done_marker:
+                break
+            link, html, error = item
+            if error:
+                if on_result:
+                    on_result(link, None, error)
+                continue
+            pending[pool.submit(parse_place_page_timed, html, link)] = link
+            # Keep only a few pages per parser in flight so the queue, not the pool, absorbs bursts
+            if len(pending) >= parse_workers * 2:
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                collect(finished)
+        collect(list(pending))
+    finally:
+        if owned:
+            pool.shutdown()
+    producer.join()
+    return [results[link] for link in unique_links if link in results]
+
+def crawl_place_pages(links, engine, on_result=None, config_path='config.ini', pool=None):
+    parse_workers = parse_worker_count(config_path)
+    if parse_workers > 0:
+        if pool is None:
+            logging.info(f"Pipeline mode: {engine.concurrency} fetch threads, {parse_workers} parser processes")
+        return scrape_restaurant_pages_pipelined(links, engine, parse_workers, on_result=on_result, pool=pool)
+    return scrape_restaurant_pages(links, engine, on_result)
+
+# Category -> list -> place crawl driven by a persistent frontier in output/<base_name>.
+# Every finished URL is recorded, so an interrupted crawl picks up where it stopped without re-fetching.
+def crawl_city(base_name, engine, seed_url=None, max_attempts=3):
+    output_dir = os.path.join('output', base_name)
+    frontier = CrawlFrontier(frontier_path(output_dir), max_attempts)
+    recovered = frontier.recover()
+    if recovered:
+        logging.info(f"Re-queued {recovered} URLs left in flight by the previous run")
+    if seed_url:
+        frontier.add([seed_url], 'seed')
+    store = get_lead_store()
+
+    # Failed URLs are claimed again until they succeed or reach max_attempts
+    while seeds := frontier.claim('seed'):
+        for url in seeds:
+            try:
+                categories = extract_links(engine.get(url).text, url, CATEGORY_SELECTOR)
+                save_to_csv(categories, f'{base_name}_categories.csv', url)
+                frontier.add([c['href'] for c in categories], 'listing', parent=url)
+                frontier.mark_done(url)
+            except Exception as e:
+                logging.error(f"Error fetching {url}: {e}")
+                metrics.inc('crawl_failures_total', kind='seed')
+                frontier.mark_failed(url, e)
+
+    def crawl_listing(url):
+        try:
+            restaurants = fetch_restaurant_list(url, engine)
+            frontier.add([r['Link'] for r in restaurants], 'place', parent=url)
+            frontier.mark_done(url)
+            return len(restaurants)
+        except Exception as e:
+            logging.error(f"Error fetching {url}: {e}")
+            metrics.inc('crawl_failures_total', kind='listing')
+            frontier.mark_failed(url, e)
+            return 0
+
+    while listings := frontier.claim('listing'):
+        for url, found in engine.map(crawl_listing, listings):
+            logging.info(f"Scraped category {url}: {found} places")
+
+    def record_place(link, data, error):
+        if data:
+            store.upsert_places([data])
+            frontier.mark_done(link)
+        else:
+            metrics.inc('crawl_failures_total', kind='place')
+            frontier.mark_failed(link, error)
+
+    while places := frontier.claim('place'):
+        crawl_place_pages(places, engine, record_place)
+
+    logging.info(f"Crawl state: {frontier.counts()}")
+    done = frontier.urls('place', 'done')
+    frontier.close()
+    return [Lead.from_record(record) for record in store.place_records(done)]
+
+# Streaming mode: every stage is a generator, so records flow one by one from the category pages
+# to the sinks. Memory stays flat however many cities are crawled and results hit disk immediately.
+def iter_category_links(seed_urls, engine):
+    for url in seed_urls:
+        html = fetch_page(url, engine)
+        if html:
+            categories = extract_links(html, url, CATEGORY_SELECTOR)
+            get_lead_store().upsert_categories(categories, url)
+            yield from categories
+
+def iter_listing_links(categories, engine):
+    seen = set()
+
+    def fetch_list(category):
+        try:
+            return fetch_restaurant_list(category['href'], engine)
+        except requests.RequestException as e:
+            logging.error(f"Error fetching {category['href']}: {e}")
+            return []
+
+    for category, restaurants in engine.imap(fetch_list, categories):
+        logging.info(f"Scraped category {category['text']}: {len(restaurants)} places")
+        for restaurant in restaurants:
+            if restaurant['Link'] not in seen:
+                seen.add(restaurant['Link'])
+                yield restaurant
+
+def iter_place_records(listing_links, engine):
+    for _, record in engine.imap(lambda restaurant: scrape_restaurant_page(restaurant['Link'], engine), listing_links):
+        if record:
+            yield record
+
+def iter_enriched_leads(records):
+    store = get_lead_store()
+    for record, (summary, email, source) in bounded_imap(generate_email, records, llm_client.concurrency):
+        store.upsert_generated(lead_key(record), summary, email, generated_by(source))
+        yield {**record, 'Summary': summary, 'Email': email}
+
+def stream_city(base_name, seed_urls, enrich=False):
+    output_dir = os.path.join('output', base_name)
+    engine = create_fetch_engine()
+    store = get_lead_store()
+    if enrich:
+        configure_api()
+    with CsvSink(os.path.join(output_dir, f'{base_name}.csv'), PLACE_FIELDS) as places_sink:
+        categories = iter_category_links(seed_urls, engine)
+        records = iter_place_records(iter_listing_links(categories, engine), engine)
+        records = tee(records, places_sink.write, lambda record: store.upsert_places([record]))
+        if enrich:
+            with CsvSink(os.path.join(output_dir, f'{base_name}_final.csv'), PLACE_FIELDS + ['Summary', 'Email']) as leads_sink:
+                count = drain(tee(iter_enriched_leads(records), leads_sink.write))
+        else:
+            count = drain(records)
+    engine.close()
+    logging.info(f"Streamed {count} leads into {output_dir}")
+    return count
+
+# Non-interactive multi-city run: every city's seed, list and place pages share one worker pool,
+# one global request budget and the per-host limits, with workers split by city priority
+def run_campaign(campaign_path):
+    settings, jobs = load_campaign(campaign_path)
+    logging.info(f"Campaign {campaign_path}: {len(jobs)} cities")
+    engine = create_fetch_engine(overrides=settings)
+    store = get_lead_store()
+    sinks = {job.name: CsvSink(os.path.join('output', job.name, f'{job.name}.csv'), PLACE_FIELDS) for job in jobs}
+    seen_links = set()
+    seen_lock = threading.Lock()
+
+    def handle(job, kind, url):
+        if kind == 'seed':
+            categories = extract_links(engine.get(url).text, url, CATEGORY_SELECTOR)
+            store.upsert_categories(categories, url)
+            return [('listing', category['href']) for category in categories]
+        if kind == 'listing':
+            restaurants = fetch_restaurant_list(url, engine)
+            # A place listed by several categories or cities is scraped once
+            with seen_lock:
+                new_links = [r['Link'] for r in restaurants if r['Link'] not in seen_links]
+                seen_links.update(new_links)
+            logging.info(f"[{job.name}] {url}: {len(new_links)} new places")
+            return [('place', link) for link in new_links]
+        record = parse_restaurant_page(engine.get(url).text, url)
+        store.upsert_places([record])
+        sinks[job.name].write(record)
+
+    started = time.monotonic()
+    CampaignScheduler(jobs, handle, workers=engine.concurrency).run()
+    for job in jobs:
+        sinks[job.name].close()
+        logging.info(f"[{job.name}] {sinks[job.name].count} places saved to {sinks[job.name].path}")
+    engine.close()
+    logging.info(f"Campaign finished in {time.monotonic() - started:.0f}s")
+
+# Weekly refresh of a crawled city: re-reads its list pages, scrapes only new places and places not
+# checked for [Refresh] recheck_days, and regenerates text only for leads whose place fields changed
+def refresh_city(base_name, config_path='config.ini'):
+    config = configparser.ConfigParser()
+    config.read(config_path)
+    # Just under a week, so a weekly refresh re-scrapes every place and sees changed phones, sites and ratings
+    recheck_days = config.getfloat('Refresh', 'recheck_days', fallback=6)
+    output_dir = os.path.join('output', base_name)
+    frontier = CrawlFrontier(frontier_path(output_dir))
+    listings = frontier.urls('listing')
+    frontier.close()
+    if not listings:
+        raise ValueError(f"No previous crawl of {base_name} to refresh; run a full crawl first")
+    started = time.time()
+    engine = create_fetch_engine(config_path)
+    store = get_lead_store()
+
+    def refresh_listing(url):
+        try:
+            return fetch_restaurant_list(url, engine)
+        except Exception as e:
+            logging.error(f"Error fetching {url}: {e}")
+            return None
+
+    current, failed = [], []
+    for url, restaurants in engine.map(refresh_listing, listings):
+        if restaurants is None:
+            failed.append(url)
+        else:
+            current += [r['Link'] for r in restaurants]
+    current = list(dict.fromkeys(current))
+    # A list page that failed to load says nothing about which of its places were removed
+    new, removed = store.listing_changes([url for url in listings if url not in failed], started)
+    to_scrape = store.places_to_scrape(current, started - recheck_days * 86400)
+    logging.info(f"Refresh {base_name}: {len(current)} listed, {len(new)} new, {len(removed)} removed, "
+                 f"{len(to_scrape)} place pages to scrape")
+
+    def record_place(link, data, error):
+        if data:
+            store.upsert_places([data])
+
+    crawl_place_pages(to_scrape, engine, record_place, config_path)
+    engine.close()
+    changed = store.changed_places(current, started)
+    logging.info(f"{len(changed)} places new or changed since the last run")
+
+    df = leads_frame(store.place_records(current))
+    save_leads(df, os.path.join(output_dir, f'{base_name}.parquet'))
+    df.to_csv(os.path.join(output_dir, f'{base_name}.csv'), index=False)
+    pd.DataFrame({'Link': removed}).to_csv(os.path.join(output_dir, f'{base_name}_removed.csv'), index=False)
+
+    configure_api()
+    output_file = os.path.join(output_dir, f"{base_name}_final.parquet")
+    # A fresh checkpoint: unchanged leads come back from the store, changed ones are regenerated
+    process_excel(os.path.join(output_dir, f"{base_name}.parquet"), output_file, resume=False)
+    export_xlsx(output_file, os.path.join(output_dir, f"{base_name}_final.xlsx"))
+    logging.info("Refresh finished successfully.")
+
+# Shared work queue for worker mode: [WorkQueue] backend = sqlite (one machine) or redis (several)
+def open_work_queue(config_path='config.ini'):
+    config = configparser.ConfigParser()
+    config.read(config_path)
+    settings = {
+        'shards': config.getint('WorkQueue', 'shards', fallback=16),
+        'lease_seconds': config.getfloat('WorkQueue', 'lease_seconds', fallback=120),
+        'max_attempts': config.getint('WorkQueue', 'max_attempts', fallback=3),
+    }
+    if config.get('WorkQueue', 'backend', fallback='sqlite') == 'redis':
+        return RedisWorkQueue(config.get('WorkQueue', 'url', fallback='redis://127.0.0.1:6379/0'),
+                              config.get('WorkQueue', 'name', fallback='leadgen'), **settings)
+    return SqliteWorkQueue(config.get('WorkQueue', 'path', fallback=os.path.join('output', 'work_queue.sqlite')),
+                           **settings)
+
+# Fills the queue with place URLs: place links go in directly, list pages are fetched for theirs,
+# and CSV files contribute their Link (places) or href (list pages) column
+def enqueue(sources):
+    work_queue = open_work_queue()
+    engine = create_fetch_engine()
+    places, lists = [], []
+    for source in sources:
+        if source.endswith('.csv'):
+            rows = pd.read_csv(source)
+            places += rows['Link'].dropna().tolist() if 'Link' in rows else []
+            lists += rows['href'].dropna().tolist() if 'href' in rows else []
+        elif '/place/' in source:
+            places.append(source)
+        else:
+            lists.append(source)
+    for url, restaurants in engine.map(lambda url: fetch_restaurant_list(url, engine), lists):
+        places += [r['Link'] for r in restaurants]
+    engine.close()
+    added = work_queue.put(places)
+    logging.info(f"Queued {added} new place URLs ({len(places) - added} already queued): {work_queue.counts()}")
+    work_queue.close()
+
+# Worker mode: lease place URLs from the shared queue, scrape them, keep leases alive while working,
+# and report every result back so another worker re-issues nothing that finished
+def run_worker(position=None, config_path='config.ini', idle_poll=5.0):
+    config = configparser.ConfigParser()
+    config.read(config_path)
+    batch = config.getint('WorkQueue', 'batch', fallback=16)
+    work_queue = open_work_queue(config_path)
+    engine = create_fetch_engine(config_path)
+    store = get_lead_store()
+    me = worker_id()
+    shards = shard_order(work_queue.shards, position)
+    logging.info(f"Worker {me} started (shards {shards[:4]}...)")
+    # One parser pool for the worker's whole run, not one per leased batch
+    parse_workers = parse_worker_count(config_path)
+    pool = ProcessPoolExecutor(max_workers=parse_workers) if parse_workers > 0 else None
+    if pool:
+        logging.info(f"Pipeline mode: {engine.concurrency} fetch threads, {parse_workers} parser processes")
+    scraped = 0
+    with LeaseKeeper(work_queue, me, work_queue.lease_seconds / 3) as keeper:
+        def record_place(link, data, error):
+            keeper.discard(link)
+            if data:
+                store.upsert_places([data])
+            # A lease that expired meanwhile may belong to another worker now; the queue ignores the report
+            reported = work_queue.complete(me, link, data) if data else work_queue.fail(me, link, error)
+            if not reported:
+                logging.warning(f"Lease on {link} expired before it finished; result not reported")
+
+        while True:
+            urls = work_queue.lease(me, batch, shards)
+            if not urls:
+                counts = work_queue.counts()
+                if not counts['pending'] and not counts['leased']:
+                    break
+                # Other workers hold the remaining leases; wait in case one of them dies
+                time.sleep(idle_poll)
+                continue
+            keeper.add(urls)
+            scraped += len(crawl_place_pages(urls, engine, record_place, config_path, pool))
+    if pool:
+        pool.shutdown()
+    engine.close()
+    logging.info(f"Worker {me} finished: {scraped} places scraped, queue {work_queue.counts()}")
+    work_queue.close()
+
+# Merges every worker's results (from any machine) into the lead store and the base_name outputs
+def collect_results(base_name):
+    work_queue = open_work_queue()
+    records = [record for _, record in work_queue.results()]
+    work_queue.close()
+    output_dir = os.path.join('output', base_name)
+    os.makedirs(output_dir, exist_ok=True)
+    save_results(records, output_dir, base_name)
+    logging.info(f"Collected {len(records)} places into {output_dir}")
+
+# Continue an interrupted crawl and the stages after it
+def resume_crawl(base_name):
+    logging.info(f"Resuming crawl {base_name}...")
+    output_dir = os.path.join('output', base_name)
+    engine = create_fetch_engine()
+    detailed_data = crawl_city(base_name, engine)
+    engine.close()
+    save_results(detailed_data, output_dir, base_name)
+    configure_api()
+    input_file = os.path.join(output_dir, f"{base_name}.parquet")
+    output_file = os.path.join(output_dir, f"{base_name}_final.parquet")
+    process_excel(input_file, output_file)
+    export_xlsx(output_file, os.path.join(output_dir, f"{base_name}_final.xlsx"))
+    logging.info("Resumed crawl finished successfully.")
 
 def extract_ratings(soup, index):
     rating_divs = soup.find_all('div', class_='d-flex flex-wrap align-items-center')
@@ -156,19 +553,25 @@ def extract_contact_info(soup):
     website = website_div.find_next('a')['href'] if website_div else 'N/A'
     return address, phone, website
 
+@metrics.timed('save_seconds', function='save_results')
 def save_results(data, output_dir, base_name):
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     csv_file = f'{base_name}.csv'
-    xlsx_file = f'{base_name}.xlsx'
+    parquet_file = f'{base_name}.parquet'
     try:
-        df = pd.DataFrame(data)
+        leads = [Lead.from_record(record) for record in data]
+        get_lead_store().upsert_places(leads)
+        df = leads_frame(leads)
+        # Parquet feeds the next stage; XLSX is only written by an explicit export
+        save_leads(df, os.path.join(output_dir, parquet_file))
         df.to_csv(os.path.join(output_dir, csv_file), index=False)
-        df.to_excel(os.path.join(output_dir, xlsx_file), index=False)
-        logging.info(f"Data saved to {csv_file} and {xlsx_file}")
+        logging.info(f"Data saved to {parquet_file} and {csv_file}")
     except Exception as e:
         logging.error(f"Error saving results: {e}")
 
 def configure_api(config_path='config.ini'):
+    global llm_client, llm_cache, email_batch_size, email_generator
+    # The Gemini SDK takes most of a second to import, so only the stages that generate text load it
+    from llm_client import QUOTA_ERRORS, LLMClient, configure_gemini
     logging.info("Configuring API...")
     config = configparser.ConfigParser()
     config.read(config_path)
@@ -182,60 +585,202 @@ def configure_api(config_path='config.ini'):
         if not api_key or len(api_key) < 20:
             raise ValueError("Invalid API key entered.")
         logging.info("API key entered manually.")
-    genai.configure(api_key=api_key)
-    logging.info("API configured successfully.")
+    configure_gemini(api_key)
+    # Limits default to the free tier of gemini-1.5-flash; raise them to match your quota
+    llm_client = LLMClient(
+        model_name=config.get('GoogleGeminiAPI', 'model', fallback='gemini-1.5-flash'),
+        rpm=config.getint('GoogleGeminiAPI', 'rpm', fallback=15),
+        tpm=config.getint('GoogleGeminiAPI', 'tpm', fallback=1_000_000),
+        concurrency=config.getint('GoogleGeminiAPI', 'concurrency', fallback=4),
+    )
+    email_batch_size = config.getint('GoogleGeminiAPI', 'batch_size', fallback=0)
+    # tiered: template emails around a short LLM paragraph; offline: templates only; full: whole emails by the LLM
+    email_mode = config.get('Email', 'mode', fallback='tiered')
+    if email_mode not in ('tiered', 'offline', 'full'):
+        raise ValueError(f"Unknown [Email] mode: {email_mode}")
+    email_generator = None
+    if email_mode != 'full':
+        from email_templates import TieredEmailGenerator, load_templates
+        email_generator = TieredEmailGenerator(generate_with_retries,
+                                               load_templates(config.get('Email', 'templates', fallback='') or None),
+                                               QUOTA_ERRORS, offline=email_mode == 'offline')
+    if config.getboolean('LLMCache', 'enabled', fallback=True):
+        llm_cache = LLMCache(
+            path=config.get('LLMCache', 'path', fallback=os.path.join('output', 'llm_cache.sqlite')),
+            max_entries=config.getint('LLMCache', 'max_entries', fallback=50_000),
+            max_age_days=config.getfloat('LLMCache', 'max_age_days', fallback=30),
+            force_refresh=config.getboolean('LLMCache', 'force_refresh', fallback=False),
+        )
+    logging.info(f"API configured successfully ({llm_client.limiter.requests.capacity:.0f} requests/min).")
 
-def generate_ai_response(prompt):
-    logging.info(f"Generating AI response for prompt: {prompt}")
-    model = genai.GenerativeModel("gemini-1.5-flash")
-    response = model.generate_content(prompt)
+@metrics.timed('stage_seconds', stage='generate_ai_response')
+def generate_ai_response(prompt, max_retries=None, generation_config=None):
+    logging.info(f"Generating AI response ({len(prompt)} characters)")
+    logging.debug(f"Prompt: {prompt}")
+    response = llm_client.generate(prompt, max_retries, generation_config)
     logging.info("AI response generated.")
     return response
 
-def process_excel(file_path, output_path):
-    logging.info(f"Loading Excel file from {file_path}...")
-    data = pd.read_excel(file_path)
-    logging.info("Excel file loaded successfully.")
-    data['Email'] = ''
-    for idx, row in data.iterrows():
-        logging.info(f"Processing row {idx + 1}...")
-        name = row['Name']
-        phone = row['Phone']
-        website = row['Website']
-        about = row['About']
-        summary_prompt = f"Generate a summary for {name} with the following details: Phone: {phone}, Website: {website}, About: {about}."
-        summary = generate_with_retries(summary_prompt)
-        data.at[idx, 'Summary'] = summary
-        logging.info(f"Summary for {name}: {summary}")
-        if website.endswith('.co.za'):
-            email_prompt = (f"Write an introductory email. Introduce me as Leo from Liistudios, a software agency based in East London. "
-                            f"Include a personalized approach to {name} and ask who is in charge of their webpage ({website}). "
-                            f"Make the email engaging and encourage them to inquire about how we can help improve their business.")
-        elif 'facebook' in website:
-            email_prompt = (f"Write an introductory email. Introduce me as Leo from Liistudios, a software agency based in East London. "
-                            f"Propose a solution to improve their online presence and suggest the benefits tailored to their business "
-                            f"as described: {about}. Focus on making the email compelling and highlighting specific benefits.")
+def generate_lead(row):
+    return generate_with_retries(build_summary_prompt(row)), generate_with_retries(build_email_prompt(row))
+
+# (summary, email, source) in the configured [Email] mode; source is 'offline' for template-only emails
+def generate_email(row):
+    if email_generator:
+        return email_generator(row)
+    return (*generate_lead(row), 'llm')
+
+# Model label stored with generated text, so text from another mode (or offline) is never reused as is
+def generated_by(source='llm'):
+    if source == 'offline':
+        return 'offline'
+    return f"{llm_client.model_name}/tiered" if email_generator else llm_client.model_name
+
+def lead_key(row):
+    link = row.get('Link')
+    return link if isinstance(link, str) and link else str(row['Name'])
+
+# Yields (row, (summary, email, source)) as leads finish; the client's rate limiter keeps us inside the API quota
+def generate_leads(rows, batch_size):
+    if batch_size > 1 and email_generator:
+        # Tiered requests are already one short call per lead; batching applies to whole LLM emails only
+        logging.warning(f"batch_size = {batch_size} is ignored in tiered/offline email mode; "
+                        f"set [Email] mode = full to generate in batches")
+    with ThreadPoolExecutor(max_workers=llm_client.concurrency) as pool:
+        if batch_size > 1 and not email_generator:
+            # Batch mode: batch_size leads per JSON request, unparseable leads fall back to generate_lead
+            logging.info(f"Generating {len(rows)} leads in batches of {batch_size} with {llm_client.concurrency} workers...")
+            for row, (summary, email) in generate_batched(rows, batch_size, generate_with_retries, generate_lead, pool.map):
+                yield row, (summary, email, 'llm')
         else:
-            email_prompt = (f"Write an introductory email. Introduce me as Leo from Liistudios, a software agency based in East London. "
-                            f"Inquire if they would be interested in improving their online presence and optimizing their website ({website}). "
-                            f"Make the email engaging and encourage them to inquire about how we can help improve their business.")
-        email = generate_with_retries(email_prompt)
-        data.at[idx, 'Email'] = email
-        logging.info(f"Email for {name}: {email}")
-    data.to_excel(output_path, index=False)
+            logging.info(f"Generating {len(rows)} leads with {llm_client.concurrency} workers...")
+            yield from zip(rows, pool.map(generate_email, rows))
+
+# Writes the input rows plus checkpointed Summary/Email columns; run at the end or on demand
+@metrics.timed('save_seconds', function='export_enriched')
+def export_enriched(data, checkpoint, output_path):
+    keys = [lead_key(row) for row in data.to_dict('records')]
+    data['Summary'] = [checkpoint.records.get(key, {}).get('Summary', '') for key in keys]
+    data['Email'] = [checkpoint.records.get(key, {}).get('Email', '') for key in keys]
+    save_leads(data, output_path)
     logging.info(f"Output saved to {output_path}")
 
-def generate_with_retries(prompt, max_retries=3):
-    retries = 0
-    while retries < max_retries:
-        try:
-            return generate_ai_response(prompt)
-        except Exception as e:
-            logging.error(f"Error generating response: {e}")
-            retries += 1
-            if retries >= max_retries:
-                logging.error("Max retries reached. Exiting.")
-                raise
+# Website probe stage: reachability, HTTPS, redirects, speed, weight and CMS of each lead's site,
+# added as Site* columns. Results are kept in the lead store for [SiteProbe] max_age_days.
+def probe_websites(data, config_path='config.ini'):
+    config = configparser.ConfigParser()
+    config.read(config_path)
+    if not config.getboolean('SiteProbe', 'enabled', fallback=True) or 'Website' not in data:
+        return data
+    store = get_lead_store()
+    known = store.site_probes([website_url(value) for value in data['Website']],
+                              config.getfloat('SiteProbe', 'max_age_days', fallback=14) * 86400)
+    prober = SiteProber(
+        concurrency=config.getint('SiteProbe', 'concurrency', fallback=64),
+        timeout=config.getfloat('SiteProbe', 'timeout', fallback=8),
+        max_bytes=config.getint('SiteProbe', 'max_kb', fallback=256) * 1024,
+        method=config.get('SiteProbe', 'method', fallback='get'),
+        control_url=config.get('SiteProbe', 'control_url', fallback='https://www.google.com/generate_204') or None,
+    )
+    try:
+        results = probe_leads(data, prober, known, config.getfloat('SiteProbe', 'max_failure_ratio', fallback=0.5))
+    finally:
+        prober.close()
+    # Unverified results say nothing about the site; the next run probes it again
+    store.upsert_site_probes([result for url, result in results.items()
+                              if url not in known and result['status'] != 'unverified'])
+    return data
+
+# Lead scoring settings: [Scoring] enabled, min_score (leads below it are not generated), max_leads (a per-run
+# budget, 0 for none) and weight_<signal> for each of DEFAULT_WEIGHTS
+def scoring_settings(config_path='config.ini'):
+    config = configparser.ConfigParser()
+    config.read(config_path)
+    return {
+        'enabled': config.getboolean('Scoring', 'enabled', fallback=True),
+        'min_score': config.getfloat('Scoring', 'min_score', fallback=0),
+        'max_leads': config.getint('Scoring', 'max_leads', fallback=0),
+        'weights': {name: config.getfloat('Scoring', f'weight_{name}', fallback=weight)
+                    for name, weight in DEFAULT_WEIGHTS.items()},
+    }
+
+# Finished leads go to an append-only checkpoint, so a rerun resumes where the last one stopped.
+# Leads are generated best score first, so whatever the quota leaves undone is the least promising.
+# Input and output may be .parquet, .csv or .xlsx, picked by file extension.
+def process_excel(file_path, output_path, batch_size=None, resume=True, config_path='config.ini'):
+    logging.info(f"Loading leads from {file_path}...")
+    data = load_leads(file_path)
+    logging.info(f"Loaded {len(data)} leads.")
+    # The same business listed under several categories or names is only emailed once
+    data = dedupe_leads(data)
+    data = probe_websites(data, config_path)
+    scoring = scoring_settings(config_path)
+    ranked = data
+    if scoring['enabled']:
+        data = add_scores(data, scoring['weights'])
+        ranked = data.sort_values('Lead Score', ascending=False, kind='stable')
+    checkpoint = CheckpointLog(checkpoint_path(output_path))
+    if not resume:
+        checkpoint.reset()
+    if email_generator and 'Website Class' not in data:
+        data['Website Class'] = website_classes(data)
+        ranked = data
+    # Template-only emails from a run that ran out of quota are done again once the LLM is available
+    rows = [row for row in ranked.to_dict('records')
+            if lead_key(row) not in checkpoint or checkpoint.records[lead_key(row)].get('Source') == 'offline']
+    if len(rows) < len(data):
+        logging.info(f"Resuming: {len(data) - len(rows)} leads already done, {len(rows)} to go")
+    # Leads whose place fields are unchanged since their last generation reuse the stored text
+    input_hashes = {lead_key(row): content_hash(row) for row in rows}
+    reusable = get_lead_store().reusable_generated(input_hashes, generated_by())
+    for key, generated in reusable.items():
+        checkpoint.append(key, generated)
+    if reusable:
+        rows = [row for row in rows if lead_key(row) not in reusable]
+        logging.info(f"{len(reusable)} unchanged leads reuse their stored summary and email, {len(rows)} to generate")
+    if scoring['enabled']:
+        rows = apply_cutoff(rows, scoring['min_score'], scoring['max_leads'])
+    batch_size = email_batch_size if batch_size is None else batch_size
+    try:
+        for row, (summary, email, source) in generate_leads(rows, batch_size):
+            checkpoint.append(lead_key(row), {'Summary': summary, 'Email': email,
+                                              **({'Source': source} if source == 'offline' else {})})
+            get_lead_store().upsert_generated(lead_key(row), summary, email, generated_by(source),
+                                              input_hashes[lead_key(row)])
+            logging.info(f"Email for {row['Name']}: {email}")
+    finally:
+        checkpoint.close()
+        export_enriched(data, checkpoint, output_path)
+        if llm_cache:
+            llm_cache.report()
+
+def apply_cutoff(rows, min_score=0, max_leads=0):
+    kept = [row for row in rows if row['Lead Score'] >= min_score]
+    if max_leads:
+        kept = kept[:max_leads]
+    if len(kept) < len(rows):
+        cut = f"score {kept[-1]['Lead Score']:.1f}" if kept else "none"
+        logging.info(f"Cutoff: generating the top {len(kept)} of {len(rows)} leads (lowest kept: {cut}); "
+                     f"the rest are left for a later run")
+    return kept
+
+def generate_with_retries(prompt, max_retries=3, generation_config=None):
+    params = {**llm_client.generation_config, **(generation_config or {})}
+    key = cache_key(llm_client.model_name, prompt, params) if llm_cache else None
+    if key:
+        cached = llm_cache.get(key)
+        metrics.inc('llm_cache_total', result='miss' if cached is None else 'hit')
+        if cached is not None:
+            return cached
+    try:
+        response = generate_ai_response(prompt, max_retries, generation_config)
+    except Exception as e:
+        logging.error(f"Error generating response: {e}")
+        logging.error("Max retries reached. Exiting.")
+        raise
+    if key:
+        llm_cache.put(key, llm_client.model_name, response)
+    return response
 
 # Main function to execute the combined application
 def main_combined():
@@ -243,16 +788,16 @@ def main_combined():
     base_name = input("Please enter the base name for output files: ")
     output_dir = os.path.join('output', base_name)
     os.makedirs(output_dir, exist_ok=True)
+    engine = create_fetch_engine()
     
     # Example usage of scrape_website
     target_url = input("Please enter the URL to scrape: ")
-    selector = '.row.mt-n2.mx-n1 .col-6.col-sm-4.col-md-4.col-lg-4.col-xl-4.mt-2.px-1 a'
-    scrape_website(target_url, selector, f'{base_name}_links.csv')
+    scrape_website(target_url, CATEGORY_SELECTOR, f'{base_name}_links.csv', engine)
     
     # Example usage of scrape_restaurants
     default_url = 'https://wanderlog.com/list/geoCategory/205480/where-to-eat-best-restaurants-in-east-london'
     url = input(f"Enter Wanderlog URL (press Enter to use default - {default_url}): ") or default_url
-    restaurant_df = scrape_restaurants(url)
+    restaurant_df = scrape_restaurants(url, engine)
     print(restaurant_df.head())
     
     # Save the initial restaurant links to CSV
@@ -261,68 +806,79 @@ def main_combined():
     
     # Load the saved CSV and scrape each restaurant link
     restaurants = load_restaurant_links(output_csv)
-    detailed_data = []
-    processed_links = set()
-    for index, row in restaurants.iterrows():
-        logging.info(f"Scraping {index + 1}/{len(restaurants)}: {row['Link']}")
-        if row['Link'] not in processed_links:
-            data = scrape_restaurant_page(row['Link'])
-            if data:
-                detailed_data.append(data)
-                processed_links.add(row['Link'])
-            time.sleep(random.uniform(1, 3))
+    detailed_data = crawl_place_pages(restaurants['Link'].tolist(), engine)
+    engine.close()
     save_results(detailed_data, output_dir, base_name)
 
     # Example usage of AI response generation
     configure_api()
-    input_file = os.path.join(output_dir, f"{base_name}.xlsx")
-    output_file = os.path.join(output_dir, f"{base_name}_final.xlsx")
+    input_file = os.path.join(output_dir, f"{base_name}.parquet")
+    output_file = os.path.join(output_dir, f"{base_name}_final.parquet")
     process_excel(input_file, output_file)
+    export_xlsx(output_file, os.path.join(output_dir, f"{base_name}_final.xlsx"))
     logging.info("Combined application finished successfully.")
 
 if __name__ == "__main__":
+    configure_metrics()
+    # python main.py resume <base_name> continues an interrupted crawl
+    if len(sys.argv) > 2 and sys.argv[1] == 'resume':
+        resume_crawl(sys.argv[2])
+        sys.exit()
+    # python main.py refresh <base_name> re-crawls a city incrementally
+    if len(sys.argv) > 2 and sys.argv[1] == 'refresh':
+        refresh_city(sys.argv[2])
+        sys.exit()
+    # python main.py probe <leads file> [<output file>] adds the website probe columns to a lead file
+    if len(sys.argv) > 2 and sys.argv[1] == 'probe':
+        source = sys.argv[2]
+        target = sys.argv[3] if len(sys.argv) > 3 else os.path.splitext(source)[0] + '_probed.parquet'
+        save_leads(probe_websites(load_leads(source)), target)
+        logging.info(f"Probed leads saved to {target}")
+        sys.exit()
+    # Worker mode: python main.py enqueue <list or place URL | CSV>..., then python main.py worker [i/n]
+    # on each machine, then python main.py collect <base_name>
+    if len(sys.argv) > 2 and sys.argv[1] == 'enqueue':
+        enqueue(sys.argv[2:])
+        sys.exit()
+    if len(sys.argv) > 1 and sys.argv[1] == 'worker':
+        run_worker(sys.argv[2] if len(sys.argv) > 2 else None)
+        sys.exit()
+    if len(sys.argv) > 2 and sys.argv[1] == 'collect':
+        collect_results(sys.argv[2])
+        sys.exit()
+    # python main.py campaign <campaign.ini> crawls every configured city concurrently
+    if len(sys.argv) > 2 and sys.argv[1] == 'campaign':
+        run_campaign(sys.argv[2])
+        sys.exit()
+    # python main.py stream <base_name> <seed_url>... [--enrich] runs the streaming pipeline
+    if len(sys.argv) > 3 and sys.argv[1] == 'stream':
+        seeds = [arg for arg in sys.argv[3:] if arg != '--enrich']
+        stream_city(sys.argv[2], seeds, enrich='--enrich' in sys.argv)
+        sys.exit()
+    # python main.py export <leads.parquet> [<leads.xlsx>] writes a spreadsheet copy of a lead file
+    if len(sys.argv) > 2 and sys.argv[1] == 'export':
+        source = sys.argv[2]
+        export_xlsx(source, sys.argv[3] if len(sys.argv) > 3 else os.path.splitext(source)[0] + '.xlsx')
+        sys.exit()
     main_combined()
     # Ask for the base name for output files
     base_name = input("Please enter the base name for output files: ")
     output_dir = os.path.join('output', base_name)
     os.makedirs(output_dir, exist_ok=True)
+    engine = create_fetch_engine()
     
     # Ask for the URL to scrape categories
     target_url = input("Please enter the URL to scrape categories: ")
-    category_selector = '.row.mt-n2.mx-n1 .col-6.col-sm-4.col-md-4.col-lg-4.col-xl-4.mt-2.px-1 a'
-    categories = scrape_website(target_url, category_selector, f'{base_name}_categories.csv')
-    
-    all_restaurant_data = []
-    for category in categories:
-        logging.info(f"Scraping category: {category['text']} - {category['href']}")
-        restaurant_df = scrape_restaurants(category['href'])
-        all_restaurant_data.append(restaurant_df)
-        time.sleep(random.uniform(1, 3))
     
-    # Combine all restaurant data into one DataFrame
-    combined_restaurant_df = pd.concat(all_restaurant_data, ignore_index=True)
-    
-    # Save the combined restaurant links to CSV
-    output_csv = f'{base_name}_all_restaurants.csv'
-    combined_restaurant_df.to_csv(os.path.join(output_dir, output_csv), index=False)
-    
-    # Load the saved CSV and scrape each restaurant link
-    restaurants = load_restaurant_links(output_csv)
-    detailed_data = []
-    processed_links = set()
-    for index, row in restaurants.iterrows():
-        logging.info(f"Scraping {index + 1}/{len(restaurants)}: {row['Link']}")
-        if row['Link'] not in processed_links:
-            data = scrape_restaurant_page(row['Link'])
-            if data:
-                detailed_data.append(data)
-                processed_links.add(row['Link'])
-            time.sleep(random.uniform(1, 3))
+    # Crawl categories, their restaurant lists and every place page
+    detailed_data = crawl_city(base_name, engine, target_url)
+    engine.close()
     save_results(detailed_data, output_dir, base_name)
 
     # Example usage of AI response generation
     configure_api()
-    input_file = os.path.join(output_dir, f"{base_name}.xlsx")
-    output_file = os.path.join(output_dir, f"{base_name}_final.xlsx")
+    input_file = os.path.join(output_dir, f"{base_name}.parquet")
+    output_file = os.path.join(output_dir, f"{base_name}_final.parquet")
     process_excel(input_file, output_file)
-    logging.info("Combined application finished successfully.")
\ No newline at end of file
+    export_xlsx(output_file, os.path.join(output_dir, f"{base_name}_final.xlsx"))
+    logging.info("Combined application finished successfully.")
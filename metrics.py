@@ -0,0 +1,229 @@
+import atexit
+import configparser
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Latency histogram bucket bounds in seconds (Prometheus-style cumulative "le" buckets)
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Where each stage's time goes, for the end-of-run attribution (histogram name -> category)
+STAGE_CATEGORIES = {
+    'http_request_seconds': 'network',
+    'parse_seconds': 'parsing',
+    'llm_request_seconds': 'llm',
+    'save_seconds': 'storage',
+}
+
+
+def _label_key(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{k}="{v}"' for k, v in pairs) + '}'
+
+
+class Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    # Quantile estimated by linear interpolation inside the bucket that holds it
+    def quantile(self, q):
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        lower = 0.0
+        for i, bound in enumerate(self.buckets):
+            if seen + self.counts[i] >= rank:
+                return lower + (bound - lower) * (rank - seen) / self.counts[i]
+            seen += self.counts[i]
+            lower = bound
+        return self.max
+
+    def to_dict(self):
+        return {'count': self.count, 'sum': round(self.sum, 6), 'max': round(self.max, 6),
+                'p50': round(self.quantile(0.5), 6), 'p95': round(self.quantile(0.95), 6)}
+
+
+# Process-wide registry: counters, latency histograms and (optionally) trace spans
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.tracing = False
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.counters = {}
+            self.histograms = {}
+            self.spans = []
+            self.started = time.time()
+
+    def inc(self, name, value=1, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            if key not in self.histograms:
+                self.histograms[key] = Histogram()
+            self.histograms[key].observe(value)
+
+    # Times the block into a histogram, and records it as a span when tracing is on
+    @contextmanager
+    def timer(self, name, **labels):
+        stack = self._span_stack()
+        span = {'name': name, 'labels': labels, 'parent': stack[-1]['id'] if stack else None} if self.tracing else None
+        if span:
+            span['id'] = f'{threading.get_ident():x}-{id(span):x}'
+            stack.append(span)
+        start = time.perf_counter()
+        started_at = time.time()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.observe(name, elapsed, **labels)
+            if span:
+                stack.pop()
+                span.update(start=started_at, duration=elapsed, thread=threading.current_thread().name)
+                with self._lock:
+                    self.spans.append(span)
+
+    def timed(self, name, **labels):
+        def decorate(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.timer(name, **labels):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorate
+
+    def _span_stack(self):
+        if not hasattr(self._local, 'spans'):
+            self._local.spans = []
+        return self._local.spans
+
+    def counter(self, name, **labels):
+        return self.counters.get((name, _label_key(labels)), 0)
+
+    def total(self, name):
+        return sum(value for (counter, _), value in self.counters.items() if counter == name)
+
+    # Seconds spent per category (network, parsing, llm, storage), summed over worker threads
+    def attribution(self):
+        totals = {}
+        for (name, _), histogram in self.histograms.items():
+            category = STAGE_CATEGORIES.get(name)
+            if category:
+                totals[category] = totals.get(category, 0.0) + histogram.sum
+        return totals
+
+    def to_json(self):
+        with self._lock:
+            return {
+                'started': self.started,
+                'elapsed_seconds': round(time.time() - self.started, 3),
+                'counters': [{'name': name, 'labels': dict(key), 'value': value}
+                             for (name, key), value in sorted(self.counters.items())],
+                'histograms': [{'name': name, 'labels': dict(key), **histogram.to_dict()}
+                               for (name, key), histogram in sorted(self.histograms.items())],
+                'attribution_seconds': {k: round(v, 3) for k, v in self.attribution().items()},
+            }
+
+    def prometheus(self, prefix='leadgen_'):
+        lines = []
+        with self._lock:
+            for name in sorted({name for name, _ in self.counters}):
+                lines.append(f'# TYPE {prefix}{name} counter')
+                for (counter, key), value in sorted(self.counters.items()):
+                    if counter == name:
+                        lines.append(f'{prefix}{name}{_format_labels(key)} {value}')
+            for name in sorted({name for name, _ in self.histograms}):
+                lines.append(f'# TYPE {prefix}{name} histogram')
+                for (histogram_name, key), histogram in sorted(self.histograms.items()):
+                    if histogram_name != name:
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(histogram.buckets, histogram.counts):
+                        cumulative += count
+                        lines.append(f'{prefix}{name}_bucket{_format_labels(key, [("le", bound)])} {cumulative}')
+                    lines.append(f'{prefix}{name}_bucket{_format_labels(key, [("le", "+Inf")])} {histogram.count}')
+                    lines.append(f'{prefix}{name}_sum{_format_labels(key)} {histogram.sum:.6f}')
+                    lines.append(f'{prefix}{name}_count{_format_labels(key)} {histogram.count}')
+        return '\n'.join(lines) + '\n'
+
+    def summary(self):
+        data = self.to_json()
+        lines = [f"Run metrics ({data['elapsed_seconds']:.1f}s):"]
+        for counter in data['counters']:
+            labels = ' '.join(f'{k}={v}' for k, v in counter['labels'].items())
+            lines.append(f"  {counter['name']:<28} {labels:<32} {counter['value']:>12,}")
+        for histogram in data['histograms']:
+            labels = ' '.join(f'{k}={v}' for k, v in histogram['labels'].items())
+            lines.append(f"  {histogram['name']:<28} {labels:<32} n={histogram['count']:<7} "
+                         f"p50={histogram['p50'] * 1000:.1f}ms p95={histogram['p95'] * 1000:.1f}ms "
+                         f"total={histogram['sum']:.2f}s")
+        attribution = data['attribution_seconds']
+        if attribution:
+            busy = sum(attribution.values()) or 1
+            lines.append("  Time by stage: " + ', '.join(
+                f"{category} {seconds:.1f}s ({seconds / busy:.0%})"
+                for category, seconds in sorted(attribution.items(), key=lambda item: -item[1])))
+        return '\n'.join(lines)
+
+    # End-of-run export: summary to the log, metrics.json, metrics.prom and trace.jsonl (when tracing)
+    def export(self, output_dir):
+        os.makedirs(output_dir, exist_ok=True)
+        logging.info(self.summary())
+        with open(os.path.join(output_dir, 'metrics.json'), 'w', encoding='utf-8') as f:
+            json.dump(self.to_json(), f, indent=2)
+        with open(os.path.join(output_dir, 'metrics.prom'), 'w', encoding='utf-8') as f:
+            f.write(self.prometheus())
+        if self.tracing:
+            with self._lock:
+                spans = list(self.spans)
+            with open(os.path.join(output_dir, 'trace.jsonl'), 'w', encoding='utf-8') as f:
+                for span in spans:
+                    f.write(json.dumps(span, default=str) + '\n')
+        logging.info(f"Metrics written to {output_dir}")
+
+
+metrics = Metrics()
+
+
+# Metrics are exported when the process exits: a summary in the log plus metrics.json and metrics.prom
+# in [Metrics] dir; trace = true also records spans to trace.jsonl
+def configure_metrics(config_path='config.ini'):
+    config = configparser.ConfigParser()
+    config.read(config_path)
+    metrics.tracing = config.getboolean('Metrics', 'trace', fallback=False)
+    if config.getboolean('Metrics', 'enabled', fallback=True):
+        atexit.register(metrics.export, config.get('Metrics', 'dir', fallback=os.path.join('output', 'metrics')))
@@ -0,0 +1,99 @@
+import lxml.html
+
+# Only these tags carry place fields; iterating just them skips scripts, svgs and layout noise
+_FIELD_TAGS = ('h1', 'div', 'a')
+
+RATING_CLASS = 'd-flex flex-wrap align-items-center'
+RANKING_CLASS = 'd-flex flex-row align-items-center flex-wrap'
+
+
+def _text(el):
+    # Same as BeautifulSoup's get_text(strip=True)
+    return ''.join(t.strip() for t in el.itertext())
+
+
+def _has_class(el, name):
+    return name in (el.get('class') or '').split()
+
+
+def _first(container, tag, match):
+    for el in container.iter(tag):
+        if match(el):
+            return el
+    return None
+
+
+def _rating(div):
+    stars = _first(div, 'span', lambda el: _has_class(el, 'font-weight-bold'))
+    reviews = _first(div, 'span', lambda el: el.get('class') == 'ml-1 text-muted')
+    return (
+        _text(stars) if stars is not None else 'N/A',
+        _text(reviews).strip('()') if reviews is not None else 'N/A'
+    )
+
+
+# Extract every place field in a single document-order walk over an lxml tree
+def parse_place_page(html, url):
+    root = lxml.html.fromstring(html)
+    name = None
+    ratings = []
+    ranking = None
+    about = None
+    contact = None
+    website = None
+    want_about = want_website = False
+
+    for el in root.iter(*_FIELD_TAGS):
+        tag = el.tag
+        if tag == 'a':
+            if want_website:
+                website = el.get('href', 'N/A')
+                want_website = False
+            continue
+        if tag == 'h1':
+            if name is None:
+                name = _text(el)
+            continue
+        # Everything below is a div
+        if want_about:
+            about = _text(el)
+            want_about = False
+        cls = el.get('class') or ''
+        if cls == RATING_CLASS and len(ratings) < 2:
+            ratings.append(_rating(el))
+        elif cls == RANKING_CLASS and ranking is None:
+            ranking = el
+        tokens = cls.split()
+        if about is None and not want_about and 'mt-5' in tokens:
+            want_about = True
+        if contact is None and 'mt-3' in tokens:
+            contact = el
+        if website is None and not want_website and len(el) == 0 and el.text == 'Website':
+            want_website = True
+
+    ratings += [('N/A', 'N/A')] * (2 - len(ratings))
+    wanderlog_ranking, wanderlog_list = 'N/A', 'N/A'
+    if ranking is not None:
+        tag = _first(ranking, 'a', lambda el: _has_class(el, 'text-muted'))
+        if tag is not None:
+            rank = _first(tag, 'span', lambda el: _has_class(el, 'font-weight-bold'))
+            wanderlog_ranking = _text(rank) if rank is not None else 'N/A'
+            wanderlog_list = _text(tag)
+    phone = 'N/A'
+    if contact is not None:
+        phone_tag = _first(contact, 'a', lambda el: _has_class(el, 'text-nowrap'))
+        phone = _text(phone_tag) if phone_tag is not None else 'N/A'
+
+    return {
+        'Name': name if name is not None else 'N/A',
+        'Phone': phone,
+        'Website': website or 'N/A',
+        'Google Stars': ratings[0][0],
+        'Google Reviews': ratings[0][1],
+        'TripAdvisor Stars': ratings[1][0],
+        'TripAdvisor Reviews': ratings[1][1],
+        'Wanderlog Ranking': wanderlog_ranking,
+        'Wanderlog List': wanderlog_list,
+        'About': about if about is not None else 'N/A',
+        'Link': url
+    }
@@ -0,0 +1,91 @@
+import threading
+import time
+
+
+# Refills continuously at rate_per_minute; take() blocks until enough capacity is available.
+# burst caps how much unused capacity can pile up (defaults to a full minute's worth).
+class TokenBucket:
+    def __init__(self, rate_per_minute, burst=None):
+        self.capacity = float(burst or rate_per_minute)
+        self.rate = rate_per_minute / 60.0
+        self.available = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.available = min(self.capacity, self.available + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def take(self, amount=1):
+        amount = min(amount, self.capacity)
+        while True:
+            with self.lock:
+                self._refill()
+                if self.available >= amount:
+                    self.available -= amount
+                    return
+                wait = (amount - self.available) / self.rate
+            time.sleep(wait)
+
+    # Settle the difference once the real cost is known; may go negative to slow later callers
+    def adjust(self, amount):
+        with self.lock:
+            self._refill()
+            self.available -= amount
+
+    # After a quota error nobody should send until the server's retry delay has passed
+    def drain(self, seconds):
+        with self.lock:
+            self._refill()
+            self.available = min(self.available, -seconds * self.rate)
+
+
+# Additive-increase / multiplicative-decrease request rate (requests per second) for one host.
+# Until the first slow-down the rate grows by `increase` per response (doubling roughly every
+# 1.4s at 0.5); after that healthy responses add about `increase` requests/s per second. 429/503,
+# timeouts or latency well above the host's usual level cut it by `decrease`, at most once per
+# interval so a burst of in-flight failures counts as one signal.
+class AimdRate:
+    def __init__(self, start_rate=0.5, min_rate=0.1, max_rate=5.0, increase=0.5, decrease=0.5, slow_factor=2.0):
+        self.rate = start_rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.decrease = decrease
+        self.slow_factor = slow_factor
+        self.latency = None
+        self.baseline = None
+        self.cuts = 0
+        self.slow_start = True
+        self._last_cut = 0.0
+        self._lock = threading.Lock()
+
+    def interval(self):
+        return 1.0 / self.rate
+
+    def _cut(self):
+        now = time.monotonic()
+        if now - self._last_cut < max(1.0, self.interval()):
+            return
+        self.rate = max(self.min_rate, self.rate * self.decrease)
+        self.slow_start = False
+        self._last_cut = now
+        self.cuts += 1
+
+    def on_success(self, latency):
+        with self._lock:
+            self.latency = latency if self.latency is None else 0.8 * self.latency + 0.2 * latency
+            # The baseline follows the fast average down at once and up only slowly
+            self.baseline = self.latency if self.baseline is None else min(
+                self.latency, self.baseline + 0.01 * (self.latency - self.baseline))
+            # Sub-100ms wobble on a fast host is noise, not the server struggling
+            if self.latency > self.baseline * self.slow_factor and self.latency - self.baseline > 0.1:
+                self._cut()
+            else:
+                step = self.increase if self.slow_start else self.increase / self.rate
+                self.rate = min(self.max_rate, self.rate + step)
+
+    def on_throttle(self):
+        with self._lock:
+            self._cut()
@@ -0,0 +1,88 @@
+import logging
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from site_probe import SOCIAL_HOSTS
+
+# How much a lead stands to gain from a web agency, by the state of its website: no site at all or
+# only a social page first, sites the probe found broken or outdated next, working sites last
+WEBSITE_NEED = {
+    'none': 1.0,
+    'social': 0.9,
+    'broken': 0.9,
+    'outdated': 0.7,
+    'co.za': 0.5,
+    'other': 0.4,
+    'modern': 0.2,
+}
+
+# Share of the score each signal carries; [Scoring] weight_<name> overrides them
+DEFAULT_WEIGHTS = {'reviews': 0.35, 'stars': 0.2, 'rank': 0.15, 'website': 0.3}
+
+# Review counts are scored on a log scale that tops out here, so one very famous place doesn't flatten the rest
+REVIEWS_CAP = 5000
+# Wanderlog ranks past this one score nothing
+RANK_DEPTH = 50
+
+
+def _numbers(df, column):
+    if column not in df:
+        return np.full(len(df), np.nan)
+    return pd.to_numeric(df[column], errors='coerce').to_numpy(dtype='float64', na_value=np.nan)
+
+
+# Social hosts and their subdomains (m.facebook.com), matched against the host of the Website column
+_SOCIAL = '(?:^|\\.)(?:' + '|'.join(host.replace('.', '\\.') for host in SOCIAL_HOSTS) + ')$'
+
+
+# none / social / co.za / other from the Website column, refined by the site probe's category when present.
+# An 'unknown' probe (blocked, rate limited) keeps the class from the URL, so its lead gets the neutral email.
+# String work runs in Arrow compute kernels rather than per Python string.
+def website_classes(df):
+    website = df['Website'] if 'Website' in df else pd.Series(pd.NA, index=df.index)
+    url = website.astype(pd.ArrowDtype(pa.string())).str.strip().str.lower()
+    host = url.str.replace(r'^[a-z][a-z0-9+.-]*://', '', regex=True).str.replace(r'[/:?#].*$', '', regex=True)
+    missing = (url.isna() | url.isin(['', 'n/a', 'nan', 'none'])).to_numpy(dtype=bool)
+    social = host.str.contains(_SOCIAL, regex=True).to_numpy(dtype=bool, na_value=False)
+    local = host.str.endswith('.co.za').to_numpy(dtype=bool, na_value=False)
+    classes = np.select([missing, social, local], ['none', 'social', 'co.za'], default='other')
+    if 'Website Category' in df:
+        probed = df['Website Category'].astype('string').fillna('').to_numpy(dtype=object)
+        refine = np.isin(probed, ['social', 'broken', 'outdated', 'modern'])
+        classes = np.where(refine, probed, classes)
+    return pd.Series(classes, index=df.index, name='Website Class')
+
+
+# Priority of every lead from 0 to 100, computed over whole columns. A missing rating or rank scores 0 for
+# that signal, so a lead is never ranked up for what wasn't scraped.
+def score_leads(df, weights=None):
+    weights = {**DEFAULT_WEIGHTS, **(weights or {})}
+    reviews = np.nansum([_numbers(df, 'Google Reviews'), _numbers(df, 'TripAdvisor Reviews')], axis=0)
+    review_score = np.clip(np.log1p(reviews) / np.log1p(REVIEWS_CAP), 0, 1)
+
+    stars = np.vstack([_numbers(df, 'Google Stars'), _numbers(df, 'TripAdvisor Stars')])
+    rated = ~np.isnan(stars)
+    star_score = np.divide(np.where(rated, stars, 0).sum(axis=0), rated.sum(axis=0) * 5.0,
+                           out=np.zeros(len(df)), where=rated.any(axis=0))
+
+    rank = _numbers(df, 'Wanderlog Ranking')
+    rank_score = np.nan_to_num(np.clip(1 - (rank - 1) / RANK_DEPTH, 0, 1))
+
+    classes = website_classes(df)
+    website_score = classes.map(WEBSITE_NEED).to_numpy(dtype='float64')
+
+    total = sum(weights.values()) or 1.0
+    score = (weights['reviews'] * review_score + weights['stars'] * star_score
+             + weights['rank'] * rank_score + weights['website'] * website_score) / total
+    return pd.Series(np.round(score * 100, 1), index=df.index, name='Lead Score'), classes
+
+
+# Adds Lead Score and Website Class columns
+def add_scores(df, weights=None):
+    df['Lead Score'], df['Website Class'] = score_leads(df, weights)
+    if len(df):
+        logging.info(f"Scored {len(df)} leads: median {df['Lead Score'].median():.1f}, "
+                     f"top {df['Lead Score'].max():.1f}")
+    return df
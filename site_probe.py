@@ -0,0 +1,336 @@
+import logging
+import re
+import socket
+import threading
+import time
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import ConnectTimeoutError, NameResolutionError, NewConnectionError
+from urllib3.util import connection
+
+from fetch_engine import DEFAULT_HEADERS
+from metrics import metrics
+from streaming import bounded_imap
+
+# Profile pages, not sites of their own: recorded without a request
+SOCIAL_HOSTS = ('facebook.com', 'instagram.com', 'twitter.com', 'x.com', 'tiktok.com', 'linktr.ee', 'wa.me')
+
+# (CMS / builder, regex over the first bytes of the page and the response headers)
+FINGERPRINTS = [
+    ('WordPress', re.compile(r'wp-content|wp-includes|wp-json', re.I)),
+    ('Wix', re.compile(r'static\.wixstatic\.com|x-wix-request-id|wix\.com', re.I)),
+    ('Squarespace', re.compile(r'static1\.squarespace\.com|squarespace', re.I)),
+    ('Shopify', re.compile(r'cdn\.shopify\.com|x-shopid', re.I)),
+    ('Joomla', re.compile(r'/media/jui/|joomla', re.I)),
+    ('Drupal', re.compile(r'drupal-settings-json|/sites/default/files|x-drupal', re.I)),
+    ('Webflow', re.compile(r'webflow\.js|data-wf-site', re.I)),
+    ('GoDaddy', re.compile(r'img1\.wsimg\.com|godaddy', re.I)),
+    ('Weebly', re.compile(r'weebly\.com|editmysite\.com', re.I)),
+]
+GENERATOR = re.compile(rb'<meta[^>]+name=["\']generator["\'][^>]+content=["\']([^"\']{1,80})', re.I)
+VIEWPORT = re.compile(rb'<meta[^>]+name=["\']viewport', re.I)
+
+# Probe result columns added to the lead table
+PROBE_COLUMNS = {
+    'status': 'Site Status',
+    'final_url': 'Site Final URL',
+    'https': 'Site HTTPS',
+    'redirects': 'Site Redirects',
+    'response_ms': 'Site Response Ms',
+    'page_bytes': 'Site Bytes',
+    'cms': 'Site CMS',
+    'mobile': 'Site Mobile',
+}
+
+
+# Website column value -> URL to probe, or None. Some older exports hold a street address in that column.
+def website_url(value):
+    if not isinstance(value, str):
+        return None
+    value = value.strip()
+    if not value or value.upper() == 'N/A' or ' ' in value or ',' in value:
+        return None
+    if not re.match(r'^https?://', value, re.I):
+        if not re.match(r'^[\w-]+(\.[\w-]+)+(/|$)', value):
+            return None
+        value = 'http://' + value
+    return value
+
+
+def is_social(url):
+    host = urlparse(url).netloc.lower()
+    return any(host == social or host.endswith('.' + social) for social in SOCIAL_HOSTS)
+
+
+# Caches successful getaddrinfo answers for ttl seconds; most hosts of a lead list are looked up once even
+# though every redirect and retry resolves again. Failures are not cached: a lookup that failed once (a
+# resolver hiccup, the network briefly down) is tried again on the next request.
+class DnsCache:
+    def __init__(self, ttl=300):
+        self.ttl = ttl
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    # Distinct addresses of host, in resolver order; raises socket.gaierror when it doesn't resolve
+    def resolve(self, host, port=None):
+        now = time.monotonic()
+        with self._lock:
+            cached = self._cache.get(host)
+        if cached and now - cached[0] < self.ttl:
+            metrics.inc('dns_lookups_total', cache='hit')
+            return cached[1]
+        metrics.inc('dns_lookups_total', cache='miss')
+        answers = socket.getaddrinfo(host, port, 0, socket.SOCK_STREAM)
+        addresses = list(dict.fromkeys(answer[4][0] for answer in answers))
+        with self._lock:
+            self._cache[host] = (now, addresses)
+        return addresses
+
+
+# urllib3 connection that resolves its host through a DnsCache and connects to the address it got. The
+# hostname is kept for the Host header, SNI and certificate checks.
+class _CachedDnsConnection:
+    dns = None
+
+    def _new_conn(self):
+        try:
+            addresses = self.dns.resolve(self.host, self.port)
+        except socket.gaierror as e:
+            raise NameResolutionError(self.host, self, e) from e
+        error = None
+        for address in addresses:
+            try:
+                return connection.create_connection((address, self.port), self.timeout,
+                                                    source_address=self.source_address,
+                                                    socket_options=self.socket_options)
+            except socket.timeout as e:
+                error = ConnectTimeoutError(self, f"Connection to {self.host} timed out. (connect timeout={self.timeout})")
+                error.__cause__ = e
+            except OSError as e:
+                error = NewConnectionError(self, f"Failed to establish a new connection: {e}")
+                error.__cause__ = e
+        raise error or NewConnectionError(self, f"No addresses for {self.host}")
+
+
+# Session adapter whose connection pools resolve through the given DnsCache, so the cache applies to this
+# session only rather than to every socket in the process
+class CachedDnsAdapter(HTTPAdapter):
+    def __init__(self, dns, **kwargs):
+        self.dns = dns
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        pools = {}
+        for scheme, pool in self.poolmanager.pool_classes_by_scheme.items():
+            conn = type(f'CachedDns{pool.ConnectionCls.__name__}', (_CachedDnsConnection, pool.ConnectionCls), {'dns': self.dns})
+            pools[scheme] = type(f'CachedDns{pool.__name__}', (pool,), {'ConnectionCls': conn})
+        self.poolmanager.pool_classes_by_scheme = pools
+
+
+# Probe status for a failed lookup: 'nxdomain' when the name doesn't exist, 'dns_error' for anything
+# that may clear up on its own (EAI_AGAIN, resolver unreachable)
+def dns_status(error):
+    missing = {socket.EAI_NONAME, getattr(socket, 'EAI_NODATA', socket.EAI_NONAME)}
+    return 'nxdomain' if error.errno in missing else 'dns_error'
+
+
+# Probe status for a requests ConnectionError, from the socket error at the bottom of it
+def connection_status(error):
+    for _ in range(8):
+        if isinstance(error, socket.gaierror):
+            return dns_status(error)
+        if isinstance(error, ConnectionRefusedError):
+            return 'refused'
+        if error is None:
+            break
+        inner = getattr(error, 'reason', None) or error.__cause__
+        if inner is None and error.args and isinstance(error.args[0], BaseException):
+            inner = error.args[0]
+        error = inner
+    return 'connection_error'
+
+
+def fingerprint(head, headers):
+    text = head.decode('utf-8', 'ignore') + '\n' + '\n'.join(f'{k}: {v}' for k, v in headers.items())
+    generator = GENERATOR.search(head)
+    for name, pattern in FINGERPRINTS:
+        if pattern.search(text):
+            return name
+    return generator.group(1).decode('utf-8', 'ignore').strip() if generator else None
+
+
+# Probes lead websites concurrently: one pooled session, short timeouts, at most max_bytes read per site.
+# control_url is a site that is always up; when it can't be reached, failures say more about our network
+# than about the leads' sites.
+class SiteProber:
+    def __init__(self, concurrency=64, timeout=8.0, max_bytes=256 * 1024, method='get', dns_ttl=300,
+                 control_url=None):
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.max_bytes = max_bytes
+        self.method = method
+        self.control_url = control_url
+        self.dns = DnsCache(dns_ttl)
+        self.session = requests.Session()
+        self.session.headers.update(DEFAULT_HEADERS)
+        self.session.max_redirects = 5
+        # Many hosts with one or two requests each: lots of small pools, no urllib3-level retries
+        adapter = CachedDnsAdapter(self.dns, pool_connections=concurrency * 2, pool_maxsize=4, max_retries=0)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def probe(self, url):
+        result = {'url': url, 'status': None, 'final_url': None, 'https': None, 'redirects': None,
+                  'response_ms': None, 'page_bytes': None, 'cms': None, 'mobile': None, 'error': None}
+        if is_social(url):
+            result['status'] = 'social'
+            return result
+        start = time.perf_counter()
+        try:
+            # Resolved up front so a name that doesn't exist is told apart from a flaky resolver
+            self.dns.resolve(urlparse(url).hostname)
+            with metrics.timer('site_probe_seconds'):
+                response, head = None, b''
+                if self.method == 'head':
+                    response = self.session.head(url, timeout=self.timeout, allow_redirects=True)
+                # Many servers refuse HEAD (405, 501) or answer it differently; ask again with GET
+                if response is None or not response.ok:
+                    response = self.session.get(url, timeout=self.timeout, stream=True, allow_redirects=True)
+                    head = self._read_capped(response)
+            result['response_ms'] = round((time.perf_counter() - start) * 1000)
+        except socket.gaierror as e:
+            result.update(status=dns_status(e), error=f'{type(e).__name__}: {str(e)[:200]}')
+            return result
+        except requests.exceptions.SSLError as e:
+            result.update(status='ssl_error', error=str(e)[:200])
+            return result
+        except requests.exceptions.ConnectTimeout as e:
+            result.update(status='connect_timeout', error=str(e)[:200])
+            return result
+        except requests.exceptions.ReadTimeout as e:
+            result.update(status='timeout', error=str(e)[:200])
+            return result
+        except requests.exceptions.ConnectionError as e:
+            # Refused connections, and lookups of redirect targets
+            result.update(status=connection_status(e), error=f'{type(e).__name__}: {str(e)[:200]}')
+            return result
+        except requests.RequestException as e:
+            result.update(status='error', error=f'{type(e).__name__}: {str(e)[:200]}')
+            return result
+        finally:
+            metrics.inc('site_probes_total')
+        length = response.headers.get('Content-Length')
+        result.update(
+            status='ok' if response.ok else f'http_{response.status_code}',
+            final_url=response.url,
+            https=response.url.lower().startswith('https://'),
+            redirects=len(response.history),
+            # Content-Length when the server sends it, else what was read (a lower bound once capped)
+            page_bytes=int(length) if length and length.isdigit() else len(head),
+            cms=fingerprint(head, response.headers),
+            mobile=bool(VIEWPORT.search(head)) if head else None,
+        )
+        metrics.inc('site_probe_bytes_total', len(head))
+        return result
+
+    def _read_capped(self, response):
+        chunks, size = [], 0
+        try:
+            for chunk in response.iter_content(chunk_size=16384):
+                chunks.append(chunk)
+                size += len(chunk)
+                if size >= self.max_bytes:
+                    break
+        finally:
+            response.close()
+        return b''.join(chunks)[:self.max_bytes]
+
+    # Yields (url, result) as probes finish; each distinct URL is probed once
+    def probe_all(self, urls):
+        yield from bounded_imap(self.probe, list(dict.fromkeys(urls)), self.concurrency)
+
+    # True when the control site answers at all (any status), or when there is no control site
+    def network_ok(self):
+        if not self.control_url:
+            return True
+        try:
+            self.session.head(self.control_url, timeout=self.timeout, allow_redirects=False).close()
+            return True
+        except requests.RequestException as e:
+            logging.warning(f"Control site {self.control_url} unreachable: {e}")
+            return False
+
+    def close(self):
+        self.session.close()
+
+
+# Probes that got no HTTP answer; when most of a batch ends like this, the problem is likely on our side
+NETWORK_FAILURES = ('nxdomain', 'dns_error', 'refused', 'connect_timeout', 'connection_error', 'timeout')
+
+
+# Statuses that mean the site really is down for visitors: its name doesn't exist, its server refuses
+# connections, or it answers 404/410/5xx
+def is_broken(status):
+    if status in ('nxdomain', 'refused', 'http_404', 'http_410'):
+        return True
+    return bool(re.fullmatch(r'http_5\d\d', status or ''))
+
+
+# Coarse website category for prompts and scoring. A site is only 'broken' when is_broken says so; bot
+# blocks and the like (401/403/405/429, TLS errors, timeouts, DNS hiccups, unverified batches) are
+# 'unknown', which gets the neutral email rather than a claim that the site is down.
+def website_category(result):
+    if not result or result.get('status') is None:
+        return 'none'
+    status = result['status']
+    if status == 'social':
+        return 'social'
+    if is_broken(status):
+        return 'broken'
+    if status != 'ok':
+        return 'unknown'
+    slow = (result.get('response_ms') or 0) > 3000 or (result.get('page_bytes') or 0) > 5 * 1024 * 1024
+    if not result.get('https') or result.get('mobile') is False or slow:
+        return 'outdated'
+    return 'modern'
+
+
+# Marks the batch's network failures 'unverified' (category 'unknown') when the control site was down or
+# more than max_failure_ratio of at least min_batch probes got no HTTP answer: an outage on our side must
+# not tell every lead that their site is down. Returns whether the batch was marked.
+def distrust_failures(results, network_ok, max_failure_ratio=0.5, min_batch=10):
+    failed = [result for result in results if result['status'] in NETWORK_FAILURES]
+    if network_ok and (len(results) < min_batch or len(failed) <= max_failure_ratio * len(results)):
+        return False
+    logging.warning(f"{len(failed)}/{len(results)} probes got no answer"
+                    f"{'' if network_ok else ' and the control site is down'}; not marking any site as broken")
+    for result in failed:
+        result.update(status='unverified', error=f"{result['status']}: {result['error']}"[:250])
+    return True
+
+
+# Adds the Site* columns (and Website Category) to a lead DataFrame, probing each distinct website once
+def probe_leads(data, prober, known=None, max_failure_ratio=0.5):
+    known = dict(known or {})
+    urls = {index: website_url(value) for index, value in data['Website'].items()} if 'Website' in data else {}
+    pending = [url for url in dict.fromkeys(urls.values()) if url and url not in known]
+    network_ok = prober.network_ok() if pending else True
+    started = time.monotonic()
+    probed = []
+    for done, (url, result) in enumerate(prober.probe_all(pending), 1):
+        known[url] = result
+        probed.append(result)
+        if done % 100 == 0:
+            logging.info(f"Probed {done}/{len(pending)} websites")
+    if pending:
+        elapsed = time.monotonic() - started
+        logging.info(f"Probed {len(pending)} websites in {elapsed:.1f}s ({len(pending) / max(elapsed, 1e-9):.0f}/s)")
+        distrust_failures(probed, network_ok, max_failure_ratio)
+    results = [known.get(urls.get(index)) if urls.get(index) else None for index in data.index]
+    for key, column in PROBE_COLUMNS.items():
+        data[column] = [result.get(key) if result else None for result in results]
+    data['Website Category'] = [website_category(result) for result in results]
+    return known
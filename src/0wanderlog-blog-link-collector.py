@@ -3,7 +3,11 @@ from bs4 import BeautifulSoup
 from urllib.parse import urljoin, urlparse
 import json
 import os
-import csv
+import sys
+
+# Shared helpers live at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from lead_store import LeadStore
 
 def fetch_page(url):
     try:
@@ -34,41 +38,30 @@ def extract_links(html_content, base_url, selector):
     
     return links
 
-def save_to_csv(data):
+def save_to_csv(data, source_url=None):
     filename = input("Please enter the filename to save the results (with .csv extension): ")
     os.makedirs('output', exist_ok=True)
     filepath = os.path.join('output', filename)
     
-    # Read existing data
-    existing_data = []
-    if os.path.exists(filepath):
-        with open(filepath, 'r', newline='', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            existing_data = list(reader)
-    
-    # Convert existing data to a set of tuples for easy comparison
-    existing_set = {(row['text'], row['href']) for row in existing_data}
-    
-    # Filter out duplicates
-    new_data = [row for row in data if (row['text'], row['href']) not in existing_set]
-    
-    # Append new data to the existing data
-    if new_data:
-        with open(filepath, 'a', newline='', encoding='utf-8') as f:
-            writer = csv.DictWriter(f, fieldnames=['text', 'href'])
-            if not existing_data:
-                writer.writeheader()
-            writer.writerows(new_data)
-        print(f"New results added to {filepath}")
+    # Duplicates are filtered by the lead store's unique index instead of re-reading the CSV
+    store = LeadStore()
+    added = store.upsert_categories(data, source_url)
+    if added:
+        print(f"{added} new results added to the lead store")
     else:
         print("No new data to add.")
+    
+    # The CSV is an export of everything found on this page
+    store.export_csv(store.categories(source_url), filepath)
+    store.close()
+    print(f"Exported to {filepath}")
 
 def scrape_website(url, selector):
     page_content = fetch_page(url)
     
     if page_content:
         links = extract_links(page_content, url, selector)
-        save_to_csv(links)
+        save_to_csv(links, url)
         return links
     return []
 
@@ -6,6 +6,21 @@ import time
 from datetime import datetime
 import os
 import random
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urlparse
+from requests.adapters import HTTPAdapter
+
+# Fetch settings: worker count and the politeness delay between requests to one host
+MAX_WORKERS = 4
+MIN_DELAY, MAX_DELAY = 1, 3
+
+# One pooled keep-alive session shared by all workers
+session = requests.Session()
+session.mount('https://', HTTPAdapter(pool_connections=MAX_WORKERS, pool_maxsize=MAX_WORKERS))
+# Earliest start of the next request per host, shared by all workers
+_host_lock = threading.Lock()
+_next_start = {}
 
 # Setup logging
 logging.basicConfig(
@@ -28,7 +43,7 @@ def load_restaurant_links(csv_file):
 # Scrape restaurant data
 def scrape_restaurant_page(url):
     try:
-        response = requests.get(url)
+        response = session.get(url, timeout=10)
         response.raise_for_status()
         soup = BeautifulSoup(response.text, 'html.parser')
 
@@ -43,7 +58,7 @@ def scrape_restaurant_page(url):
         return {
             'Name': name,
             'Phone': phone,
-            'Website': address,
+            'Website': website,
             'Google Stars': google_stars,
             'Google Reviews': google_reviews,
             'TripAdvisor Stars': tripadvisor_stars,
@@ -51,7 +66,6 @@ def scrape_restaurant_page(url):
             'Wanderlog Ranking': wanderlog_ranking,
             'Wanderlog List': wanderlog_list,
             'About': about_text,
-            # 'Website': website,
             'Link': url
         }
     except Exception as e:
@@ -94,6 +108,18 @@ def extract_contact_info(soup):
     website = website_div.find_next('a')['href'] if website_div else 'N/A'
     return address, phone, website
 
+# Requests to one host start at least a random MIN_DELAY-MAX_DELAY apart, however many workers run,
+# so the workers only overlap the waiting for responses and never raise the request rate
+def polite_scrape(url):
+    host = urlparse(url).netloc
+    with _host_lock:
+        now = time.monotonic()
+        start = max(now, _next_start.get(host, 0.0))
+        _next_start[host] = start + random.uniform(MIN_DELAY, MAX_DELAY)
+    if start > now:
+        time.sleep(start - now)
+    return scrape_restaurant_page(url)
+
 # Save data
 def save_results(data):
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -114,17 +140,19 @@ def main():
     logging.info("Starting scraper...")
     input_file = input("Enter the CSV file name (e.g., wanderlog_restaurants.csv): ")
     restaurants = load_restaurant_links(input_file)
-    detailed_data = []
+    links = list(dict.fromkeys(restaurants['Link']))  # Avoid duplicate scraping
+    results = {}
 
-    for index, row in restaurants.iterrows():
-        logging.info(f"Scraping {index + 1}/{len(restaurants)}: {row['Link']}")
-        if row['Link'] not in [d['Link'] for d in detailed_data]:  # Avoid duplicate scraping
-            data = scrape_restaurant_page(row['Link'])
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as pool:
+        futures = {pool.submit(polite_scrape, link): link for link in links}
+        for done, future in enumerate(as_completed(futures), 1):
+            link = futures[future]
+            logging.info(f"Scraped {done}/{len(links)}: {link}")
+            data = future.result()
             if data:
-                detailed_data.append(data)
-            # Add a random delay between 1 and 3 seconds
-            time.sleep(random.uniform(1, 3))
+                results[link] = data
 
+    detailed_data = [results[link] for link in links if link in results]
     save_results(detailed_data)
     logging.info("Scraper finished successfully.")
 
@@ -1,11 +1,22 @@
-import pandas as pd
 import configparser
 import os
+import sys
 import google.generativeai as genai
-import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Shared helpers live at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from llm_client import LLMClient
+from llm_cache import LLMCache, cache_key
+from checkpoint import CheckpointLog, checkpoint_path
+from lead_io import load_leads, save_leads
+
+llm_client = None
+llm_cache = None
 
 # Load API configuration
 def configure_api(config_path='config.ini'):
+    global llm_client, llm_cache
     print("Configuring API...")
     config = configparser.ConfigParser()
     config.read(config_path)
@@ -16,79 +27,115 @@ def configure_api(config_path='config.ini'):
         api_key = input("Enter your Google Gemini API key: ")
         print("API key entered manually.")
     genai.configure(api_key=api_key)
+    # One model instance; requests/tokens per minute should match your API quota
+    llm_client = LLMClient(
+        model_name=config.get('GoogleGeminiAPI', 'model', fallback='gemini-1.5-flash'),
+        rpm=config.getint('GoogleGeminiAPI', 'rpm', fallback=15),
+        tpm=config.getint('GoogleGeminiAPI', 'tpm', fallback=1_000_000),
+        concurrency=config.getint('GoogleGeminiAPI', 'concurrency', fallback=4),
+    )
+    # Responses are cached so reruns over the same leads skip the API
+    if config.getboolean('LLMCache', 'enabled', fallback=True):
+        llm_cache = LLMCache(
+            path=config.get('LLMCache', 'path', fallback=os.path.join('output', 'llm_cache.sqlite')),
+            max_entries=config.getint('LLMCache', 'max_entries', fallback=50_000),
+            max_age_days=config.getfloat('LLMCache', 'max_age_days', fallback=30),
+            force_refresh=config.getboolean('LLMCache', 'force_refresh', fallback=False),
+        )
     print("API configured successfully.")
 
-# Generate AI response for a specific prompt with rate limiting
-def generate_ai_response(prompt):
+# Generate AI response for a specific prompt; rate limiting and backoff happen in the client
+def generate_ai_response(prompt, max_retries=None):
     print(f"Generating AI response for prompt: {prompt}")
-    model = genai.GenerativeModel("gemini-1.5-flash")
-    response = model.generate_content(prompt)
+    response = llm_client.generate(prompt, max_retries)
     print("AI response generated.")
-    time.sleep(1)  # Rate limiting to avoid overloading the API
-    return response.text.strip()
-
-# Process the Excel file and generate emails
-def process_excel(file_path, output_path='output.xlsx'):
-    print(f"Loading Excel file from {file_path}...")
-    data = pd.read_excel(file_path)
-    print("Excel file loaded successfully.")
-
-    # Columns for output
-    data['Summary'] = ''
-    data['Email'] = ''
-
-    for idx, row in data.iterrows():
-        print(f"Processing row {idx + 1}...")
-        # Extract data
-        name = row['Name']
-        phone = row['Phone']
-        website = row['Website']
-        about = row['About']
-
-        # Step 1: Generate a company summary
-        summary_prompt = f"Write a brief, professional company summary for a business named {name}. Description: {about}"
-        summary = generate_with_retries(summary_prompt)
-        data.at[idx, 'Summary'] = summary
-        print(f"Summary for {name}: {summary}")
-
-        # Step 2: Generate an introductory email
-        if website.endswith('.co.za'):
-            email_prompt = (f"Write an introductory email. Introduce me as Leo from Liistudios, a software agency based in East London. "
-                            f"Include a personalized approach to {name} and ask who is in charge of their webpage ({website}). "
-                            f"Make the email engaging and encourage them to inquire about how we can help improve their business.")
-        elif 'facebook' in website:
-            email_prompt = (f"Write an introductory email. Introduce me as Leo from Liistudios, a software agency based in East London. "
-                            f"Propose a solution to improve their online presence and suggest the benefits tailored to their business "
-                            f"as described: {about}. Focus on making the email compelling and highlighting specific benefits.")
-        else:
-            email_prompt = (f"Write an introductory email. Introduce me as Leo from Liistudios, a software agency based in East London. "
-                            f"Inquire if they would be interested in improving their online presence and optimizing their website ({website}). "
-                            f"Tailor it to {name} and include insights based on: {about}. Make it engaging and professional.")
-
-        email = generate_with_retries(email_prompt)
-        data.at[idx, 'Email'] = email
-        print(f"Email for {name}: {email}")
-
-        # Save the enriched data back to a new Excel file after each row
-        data.to_excel(output_path, index=False)
-        print(f"Progress saved to {output_path}")
-
-        # Increase rate limit after processing each business
-        time.sleep(5)  # Adjust the sleep time as needed (5 to 10 seconds)
-
+    return response
+
+# Build both prompts for one lead and generate the summary and email
+def generate_row(row):
+    # Extract data
+    name = row['Name']
+    website = str(row['Website'])
+    about = row['About']
+
+    # Step 1: Generate a company summary
+    summary_prompt = f"Write a brief, professional company summary for a business named {name}. Description: {about}"
+    summary = generate_with_retries(summary_prompt)
+
+    # Step 2: Generate an introductory email
+    if website.endswith('.co.za'):
+        email_prompt = (f"Write an introductory email. Introduce me as Leo from Liistudios, a software agency based in East London. "
+                        f"Include a personalized approach to {name} and ask who is in charge of their webpage ({website}). "
+                        f"Make the email engaging and encourage them to inquire about how we can help improve their business.")
+    elif 'facebook' in website:
+        email_prompt = (f"Write an introductory email. Introduce me as Leo from Liistudios, a software agency based in East London. "
+                        f"Propose a solution to improve their online presence and suggest the benefits tailored to their business "
+                        f"as described: {about}. Focus on making the email compelling and highlighting specific benefits.")
+    else:
+        email_prompt = (f"Write an introductory email. Introduce me as Leo from Liistudios, a software agency based in East London. "
+                        f"Inquire if they would be interested in improving their online presence and optimizing their website ({website}). "
+                        f"Tailor it to {name} and include insights based on: {about}. Make it engaging and professional.")
+
+    email = generate_with_retries(email_prompt)
+    return summary, email
+
+# Leads are keyed by their Wanderlog link, falling back to the name
+def lead_key(row):
+    link = row.get('Link')
+    return link if isinstance(link, str) and link else str(row['Name'])
+
+# Write the spreadsheet once from the checkpoint (also usable on demand after a crash)
+def export_results(data, checkpoint, output_path):
+    keys = [lead_key(row) for row in data.to_dict('records')]
+    data['Summary'] = [checkpoint.records.get(key, {}).get('Summary', '') for key in keys]
+    data['Email'] = [checkpoint.records.get(key, {}).get('Email', '') for key in keys]
+    save_leads(data, output_path)
     print(f"Output saved to {output_path}")
 
+# Process the lead file (.parquet, .csv or .xlsx) and generate emails
+def process_excel(file_path, output_path='output.xlsx', resume=True):
+    print(f"Loading leads from {file_path}...")
+    data = load_leads(file_path)
+    print("Lead file loaded successfully.")
+
+    # Each finished lead is appended to the checkpoint; leads already in it are skipped
+    checkpoint = CheckpointLog(checkpoint_path(output_path))
+    if not resume:
+        checkpoint.reset()
+    rows = [(idx, row) for idx, row in zip(data.index, data.to_dict('records')) if lead_key(row) not in checkpoint]
+    print(f"{len(data) - len(rows)} leads already done, {len(rows)} to process")
+
+    # Rows are generated concurrently; results arrive in file order
+    try:
+        with ThreadPoolExecutor(max_workers=llm_client.concurrency) as pool:
+            for (idx, row), (summary, email) in zip(rows, pool.map(generate_row, [row for _, row in rows])):
+                print(f"Processing row {idx + 1}...")
+                name = row['Name']
+                print(f"Summary for {name}: {summary}")
+                print(f"Email for {name}: {email}")
+                checkpoint.append(lead_key(row), {'Summary': summary, 'Email': email})
+    finally:
+        checkpoint.close()
+        export_results(data, checkpoint, output_path)
+    if llm_cache:
+        print(f"Cache: {llm_cache.hits} hits, {llm_cache.misses} misses")
+
 def generate_with_retries(prompt, max_retries=3):
-    retries = 0
-    while retries < max_retries:
-        try:
-            return generate_ai_response(prompt)
-        except Exception as e:
-            print(f"Error generating response: {e}")
-            retries += 1
-            if retries >= max_retries:
-                print("Max retries reached. Exiting.")
-                raise
+    # Check the cache before spending quota
+    key = cache_key(llm_client.model_name, prompt, llm_client.generation_config) if llm_cache else None
+    if key:
+        cached = llm_cache.get(key)
+        if cached is not None:
+            return cached
+    try:
+        response = generate_ai_response(prompt, max_retries)
+    except Exception as e:
+        print(f"Error generating response: {e}")
+        print("Max retries reached. Exiting.")
+        raise
+    if key:
+        llm_cache.put(key, llm_client.model_name, response)
+    return response
 
 # Main function
 def main():
@@ -1,6 +1,11 @@
 import os
+import sys
 import pandas as pd
 
+# Shared helpers live at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from dedupe import dedupe_leads
+
 def remove_duplicates_and_fill_empty_blocks(file_path):
     if file_path.endswith('.csv'):
         df = pd.read_csv(file_path)
@@ -9,8 +14,12 @@ def remove_duplicates_and_fill_empty_blocks(file_path):
     else:
         return
 
-    # Remove duplicates
-    df.drop_duplicates(inplace=True)
+    # Remove duplicates: lead files go through entity resolution (phone/website/place id/fuzzy name),
+    # anything else only loses exact duplicate rows
+    if {'Name', 'Link'}.issubset(df.columns):
+        df = dedupe_leads(df)
+    else:
+        df.drop_duplicates(inplace=True)
 
     # Fill empty blocks
     # df.fillna(method='ffill', inplace=True)
@@ -0,0 +1,64 @@
+import csv
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, as_completed, wait
+
+
+# Like pool.map, but pulls items lazily and keeps at most `window` calls in flight; yields (item, result)
+def bounded_imap(func, items, workers, window=None):
+    window = window or workers * 2
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {}
+        for item in items:
+            futures[pool.submit(func, item)] = item
+            if len(futures) >= window:
+                finished, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    yield futures.pop(future), future.result()
+        for future in as_completed(list(futures)):
+            yield futures.pop(future), future.result()
+
+
+# Writes one row per record and flushes, so results are on disk as soon as they are produced. The file is
+# truncated when the sink opens: every run writes the complete output, so rerunning a city replaces its rows
+# instead of repeating them.
+class CsvSink:
+    def __init__(self, path, fieldnames):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.path = path
+        self.count = 0
+        self._lock = threading.Lock()
+        self._file = open(path, 'w', newline='', encoding='utf-8')
+        self._writer = csv.DictWriter(self._file, fieldnames=fieldnames, extrasaction='ignore')
+        self._writer.writeheader()
+        self._file.flush()
+
+    def write(self, record):
+        with self._lock:
+            self._writer.writerow(record)
+            self._file.flush()
+            self.count += 1
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# Passes records through while writing each one to the given sinks
+def tee(records, *sinks):
+    for record in records:
+        for sink in sinks:
+            sink(record)
+        yield record
+
+
+def drain(records):
+    count = 0
+    for count, _ in enumerate(records, 1):
+        pass
+    return count
@@ -0,0 +1,137 @@
+# Wanderlog page fetching and parsing: city, list and place pages. Kept free of pandas and the
+# Gemini SDK so crawl-only commands start quickly.
+import logging
+import time
+from urllib.parse import urljoin, urlparse
+
+import requests
+from bs4 import BeautifulSoup
+
+from embedded_json import parse_list_state, parse_place_state
+from lead_store import get_lead_store
+from metrics import metrics
+from place_parser import parse_place_page
+
+CATEGORY_SELECTOR = '.row.mt-n2.mx-n1 .col-6.col-sm-4.col-md-4.col-lg-4.col-xl-4.mt-2.px-1 a'
+
+
+@metrics.timed('stage_seconds', stage='fetch_page')
+def fetch_page(url, engine=None):
+    try:
+        if engine:
+            return engine.get(url).text
+        headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'}
+        with metrics.timer('http_request_seconds', host=urlparse(url).netloc):
+            response = requests.get(url, headers=headers, timeout=5)
+        metrics.inc('bytes_downloaded_total', len(response.content))
+        return response.text
+    except requests.RequestException as e:
+        logging.error(f"Error fetching {url}: {e}")
+        return None
+
+
+def extract_links(html_content, base_url, selector):
+    soup = BeautifulSoup(html_content, 'html.parser')
+    links = []
+    for link in soup.select(selector):
+        href = link.get('href', '').strip()
+        text = link.get_text(strip=True)
+        if base_url and not urlparse(href).netloc:
+            href = urljoin(base_url, href)
+        links.append({'text': text, 'href': href})
+    return links
+
+
+# Raises on fetch errors so callers can record the failure
+def fetch_restaurant_list(url, engine=None):
+    if engine:
+        response = engine.get(url)
+    else:
+        with metrics.timer('http_request_seconds', host=urlparse(url).netloc):
+            response = requests.get(url, timeout=5)
+        metrics.inc('bytes_downloaded_total', len(response.content))
+        response.raise_for_status()
+    with metrics.timer('parse_seconds', page='list'):
+        restaurant_data = parse_restaurant_list(response.text, url)
+    if not restaurant_data:
+        metrics.inc('parse_failures_total', page='list')
+    metrics.inc('places_found_total', len(restaurant_data))
+    get_lead_store().upsert_listing_links(restaurant_data, url)
+    return restaurant_data
+
+
+# Place links are relative; they resolve against the list page they were found on.
+# The page's embedded JSON state is read first; the markup is only parsed when it has none.
+def parse_restaurant_list(html, base_url='https://wanderlog.com'):
+    restaurant_data = parse_list_state(html, base_url)
+    if restaurant_data is not None:
+        return restaurant_data
+    metrics.inc('parse_fallbacks_total', page='list')
+    soup = BeautifulSoup(html, 'html.parser')
+    restaurant_divs = soup.find_all('div', class_='d-flex mb-2 align-items-center')
+    restaurant_data = []
+    for div in restaurant_divs:
+        a_tag = div.find('a', class_='color-gray-900')
+        if a_tag:
+            name = a_tag.text.strip()
+            link = a_tag['href']
+            full_link = urljoin(base_url, link)
+            restaurant_data.append({'Name': name, 'Link': full_link})
+    return restaurant_data
+
+
+@metrics.timed('stage_seconds', stage='scrape_restaurant_page')
+def scrape_restaurant_page(url, engine=None):
+    try:
+        if engine:
+            response = engine.get(url)
+        else:
+            with metrics.timer('http_request_seconds', host=urlparse(url).netloc):
+                response = requests.get(url, timeout=10)
+            metrics.inc('bytes_downloaded_total', len(response.content))
+            response.raise_for_status()
+        return parse_restaurant_page(response.text, url)
+    except Exception as e:
+        logging.error(f"Failed to scrape {url}: {e}")
+        return None
+
+
+def parse_restaurant_page(html, url):
+    record, extractor, elapsed = parse_place_page_timed(html, url)
+    record_place_parse(record, extractor, elapsed)
+    return record
+
+
+# (record, extractor): the embedded JSON state (more fields, no DOM tree) when the page has it,
+# else the lxml extractor
+def extract_place(html, url):
+    record = parse_place_state(html, url)
+    if record is not None:
+        return record, 'embedded_json'
+    return parse_place_page(html, url), 'dom'
+
+
+def parse_place(html, url):
+    return extract_place(html, url)[0]
+
+
+# A place page without a name means the page layout no longer matches the extractor
+def count_parse_failure(record):
+    if record.get('Name', 'N/A') == 'N/A':
+        metrics.inc('parse_failures_total', page='place')
+
+
+# Parse time by extractor, DOM fallbacks and failures; recorded in the parent process, since metrics
+# counted in a parser process never reach the run's registry
+def record_place_parse(record, extractor, elapsed):
+    metrics.observe('parse_seconds', elapsed, page='place', extractor=extractor)
+    if extractor == 'dom':
+        metrics.inc('parse_fallbacks_total', page='place')
+    count_parse_failure(record)
+
+
+# Parser-process entry point for the pipeline: returns what record_place_parse needs alongside the record
+def parse_place_page_timed(html, url):
+    start = time.perf_counter()
+    record, extractor = extract_place(html, url)
+    return record, extractor, time.perf_counter() - start
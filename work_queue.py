@@ -0,0 +1,360 @@
+import hashlib
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from urllib.parse import urlparse
+
+from http_cache import canonical_url
+
+PENDING = 'pending'
+LEASED = 'leased'
+DONE = 'done'
+FAILED = 'failed'
+
+
+def shard_of(url, shards):
+    return int(hashlib.sha1(canonical_url(url).encode('utf-8')).hexdigest()[:8], 16) % shards
+
+
+def worker_id():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+# Shards a worker takes first: "2/4" is worker 2 of 4, preferring shards 2, 6, 10, ... It then
+# steals from the other shards, so no worker idles while work is left anywhere.
+def shard_order(shards, position=None):
+    if not position:
+        return list(range(shards))
+    index, total = (int(part) for part in position.split('/'))
+    own = [shard for shard in range(shards) if shard % total == index]
+    return own + [shard for shard in range(shards) if shard % total != index]
+
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS work_queue (
+    url TEXT PRIMARY KEY,
+    shard INTEGER NOT NULL,
+    state TEXT NOT NULL,
+    worker TEXT,
+    lease_until REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    result TEXT,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_work_queue_shard_state ON work_queue (shard, state);
+CREATE INDEX IF NOT EXISTS idx_work_queue_lease ON work_queue (state, lease_until);
+"""
+
+
+# Single-box backend: one SQLite file shared by every worker process; SQLite's file lock
+# (BEGIN IMMEDIATE) makes leasing atomic across processes
+class SqliteWorkQueue:
+    def __init__(self, path, shards=16, lease_seconds=120, max_attempts=3):
+        self.path = path
+        self.shards = shards
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(SQLITE_SCHEMA)
+
+    def _transaction(self, work):
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                result = work(self._db)
+                self._db.execute("COMMIT")
+                return result
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+
+    def put(self, urls):
+        now = time.time()
+        rows = [(canonical_url(url), shard_of(url, self.shards), PENDING, now) for url in urls]
+
+        def insert(db):
+            before = db.total_changes
+            db.executemany("INSERT OR IGNORE INTO work_queue (url, shard, state, updated_at) VALUES (?, ?, ?, ?)", rows)
+            return db.total_changes - before
+        return self._transaction(insert)
+
+    # Leases up to `count` URLs, taking shards in `shards` order; expired leases are re-issued first
+    def lease(self, worker, count=16, shards=None):
+        now = time.time()
+
+        def take(db):
+            db.execute("UPDATE work_queue SET state = ?, worker = NULL, lease_until = NULL, updated_at = ? "
+                       "WHERE state = ? AND lease_until < ?", (PENDING, now, LEASED, now))
+            urls = []
+            for shard in shards or range(self.shards):
+                rows = db.execute("SELECT url FROM work_queue WHERE shard = ? AND state = ? LIMIT ?",
+                                  (shard, PENDING, count - len(urls))).fetchall()
+                urls += [row[0] for row in rows]
+                if len(urls) >= count:
+                    break
+            db.executemany("UPDATE work_queue SET state = ?, worker = ?, lease_until = ?, updated_at = ? WHERE url = ?",
+                           [(LEASED, worker, now + self.lease_seconds, now, url) for url in urls])
+            return urls
+        return self._transaction(take)
+
+    def heartbeat(self, worker, urls):
+        until = time.time() + self.lease_seconds
+        return self._transaction(lambda db: db.executemany(
+            "UPDATE work_queue SET lease_until = ? WHERE url = ? AND state = ? AND worker = ?",
+            [(until, canonical_url(url), LEASED, worker) for url in urls]).rowcount)
+
+    # Like fail, only applies while `worker` still holds the lease; returns whether it did. A worker whose lease
+    # expired must not overwrite what the URL's next worker reported.
+    def complete(self, worker, url, result=None):
+        return self._transaction(lambda db: db.execute(
+            "UPDATE work_queue SET state = ?, result = ?, lease_until = NULL, last_error = NULL, updated_at = ? "
+            "WHERE url = ? AND state = ? AND worker = ?",
+            (DONE, json.dumps(result) if result is not None else None, time.time(), canonical_url(url),
+             LEASED, worker)).rowcount > 0)
+
+    # A failed URL goes back to pending until it has failed max_attempts times
+    def fail(self, worker, url, error):
+        return self._transaction(lambda db: db.execute(
+            "UPDATE work_queue SET attempts = attempts + 1, last_error = ?, lease_until = NULL, worker = NULL, "
+            "state = CASE WHEN attempts + 1 >= ? THEN ? ELSE ? END, updated_at = ? "
+            "WHERE url = ? AND state = ? AND worker = ?",
+            (str(error)[:500], self.max_attempts, FAILED, PENDING, time.time(), canonical_url(url),
+             LEASED, worker)).rowcount > 0)
+
+    def results(self):
+        with self._lock:
+            rows = self._db.execute("SELECT url, result FROM work_queue WHERE state = ? AND result IS NOT NULL",
+                                    (DONE,)).fetchall()
+        return [(url, json.loads(result)) for url, result in rows]
+
+    def counts(self):
+        with self._lock:
+            rows = self._db.execute("SELECT state, COUNT(*) FROM work_queue GROUP BY state").fetchall()
+        counts = {PENDING: 0, LEASED: 0, DONE: 0, FAILED: 0}
+        counts.update(dict(rows))
+        return counts
+
+    def close(self):
+        self._db.close()
+
+
+class RespError(Exception):
+    pass
+
+
+# Minimal client for the Redis protocol (RESP2): one connection, one command at a time
+class RespClient:
+    def __init__(self, host='127.0.0.1', port=6379, db=0, password=None, timeout=30):
+        self._lock = threading.Lock()
+        self._sock = socket.create_connection((host, port), timeout=timeout)
+        self._file = self._sock.makefile('rb')
+        if password:
+            self.execute('AUTH', password)
+        if db:
+            self.execute('SELECT', db)
+
+    @classmethod
+    def from_url(cls, url):
+        parsed = urlparse(url)
+        db = int(parsed.path.strip('/') or 0)
+        return cls(parsed.hostname or '127.0.0.1', parsed.port or 6379, db, parsed.password)
+
+    def execute(self, *args):
+        parts = [f'*{len(args)}\r\n'.encode()]
+        for arg in args:
+            data = arg if isinstance(arg, bytes) else str(arg).encode('utf-8')
+            parts.append(b'$%d\r\n%s\r\n' % (len(data), data))
+        with self._lock:
+            self._sock.sendall(b''.join(parts))
+            return self._read()
+
+    def _read(self):
+        line = self._file.readline()
+        if not line:
+            raise ConnectionError("Connection closed by the server")
+        kind, body = line[:1], line[1:-2]
+        if kind == b'+':
+            return body.decode('utf-8')
+        if kind == b'-':
+            raise RespError(body.decode('utf-8'))
+        if kind == b':':
+            return int(body)
+        if kind == b'$':
+            size = int(body)
+            if size < 0:
+                return None
+            data = self._file.read(size + 2)[:-2]
+            return data.decode('utf-8')
+        if kind == b'*':
+            size = int(body)
+            return None if size < 0 else [self._read() for _ in range(size)]
+        raise RespError(f"Unexpected reply: {line!r}")
+
+    def close(self):
+        self._file.close()
+        self._sock.close()
+
+
+# Multi-machine backend on any Redis-protocol server. Keys under "<name>:":
+#   pending:<shard> list, leases zset (url -> lease expiry), owner/attempts/results hashes,
+#   seen/done/failed sets
+class RedisWorkQueue:
+    def __init__(self, url='redis://127.0.0.1:6379/0', name='leadgen', shards=16, lease_seconds=120, max_attempts=3):
+        self.redis = RespClient.from_url(url)
+        self.name = name
+        self.shards = shards
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+
+    def _key(self, *parts):
+        return ':'.join([self.name, *map(str, parts)])
+
+    def put(self, urls):
+        added = 0
+        for url in urls:
+            url = canonical_url(url)
+            if self.redis.execute('SADD', self._key('seen'), url):
+                self.redis.execute('LPUSH', self._key('pending', shard_of(url, self.shards)), url)
+                added += 1
+        return added
+
+    # Expired leases go back to their shard; ZREM decides which worker re-queues each one
+    def _requeue_expired(self):
+        for url in self.redis.execute('ZRANGEBYSCORE', self._key('leases'), '-inf', time.time()):
+            if self.redis.execute('ZREM', self._key('leases'), url):
+                self.redis.execute('HDEL', self._key('owner'), url)
+                self.redis.execute('LPUSH', self._key('pending', shard_of(url, self.shards)), url)
+
+    # URLs a worker popped but died before leasing sit in its claimed list; once the worker has been silent
+    # for a lease period they go back to their shard (or are just dropped from the list when the lease was
+    # written, since the lease expiry covers those). Racing recoverers can queue a URL twice, never lose it.
+    def _recover_claimed(self):
+        flat = self.redis.execute('HGETALL', self._key('workers')) or []
+        silent_since = time.time() - self.lease_seconds
+        for worker, seen in zip(flat[::2], flat[1::2]):
+            if float(seen) >= silent_since:
+                continue
+            claimed = self._key('claimed', worker)
+            for url in self.redis.execute('LRANGE', claimed, 0, -1) or []:
+                if self.redis.execute('ZSCORE', self._key('leases'), url) is None:
+                    self.redis.execute('LPUSH', self._key('pending', shard_of(url, self.shards)), url)
+                self.redis.execute('LREM', claimed, 1, url)
+            self.redis.execute('HDEL', self._key('workers'), worker)
+
+    def lease(self, worker, count=16, shards=None):
+        self._requeue_expired()
+        self._recover_claimed()
+        self.redis.execute('HSET', self._key('workers'), worker, time.time())
+        claimed = self._key('claimed', worker)
+        until = time.time() + self.lease_seconds
+        urls = []
+        for shard in shards or range(self.shards):
+            while len(urls) < count:
+                # The pop and the record of who took the URL are one atomic step, so a worker dying
+                # before its lease is written can't lose the URL
+                url = self.redis.execute('RPOPLPUSH', self._key('pending', shard), claimed)
+                if url is None:
+                    break
+                self.redis.execute('ZADD', self._key('leases'), until, url)
+                self.redis.execute('HSET', self._key('owner'), url, worker)
+                self.redis.execute('LREM', claimed, 1, url)
+                urls.append(url)
+            if len(urls) >= count:
+                break
+        return urls
+
+    def heartbeat(self, worker, urls):
+        self.redis.execute('HSET', self._key('workers'), worker, time.time())
+        until = time.time() + self.lease_seconds
+        extended = 0
+        for url in urls:
+            url = canonical_url(url)
+            if self.redis.execute('HGET', self._key('owner'), url) == worker:
+                # XX: only leases that still exist; a completed URL must not be revived
+                extended += self.redis.execute('ZADD', self._key('leases'), 'XX', 'CH', until, url)
+        return extended
+
+    # Removes the lease if `worker` still holds it; false when it expired or passed to another worker
+    def _release(self, worker, url):
+        if self.redis.execute('HGET', self._key('owner'), url) != worker:
+            return False
+        if not self.redis.execute('ZREM', self._key('leases'), url):
+            return False
+        self.redis.execute('HDEL', self._key('owner'), url)
+        return True
+
+    def complete(self, worker, url, result=None):
+        url = canonical_url(url)
+        if not self._release(worker, url):
+            return False
+        if result is not None:
+            self.redis.execute('HSET', self._key('results'), url, json.dumps(result))
+        self.redis.execute('SADD', self._key('done'), url)
+        return True
+
+    def fail(self, worker, url, error):
+        url = canonical_url(url)
+        if not self._release(worker, url):
+            return False
+        if self.redis.execute('HINCRBY', self._key('attempts'), url, 1) >= self.max_attempts:
+            self.redis.execute('SADD', self._key('failed'), url)
+        else:
+            self.redis.execute('LPUSH', self._key('pending', shard_of(url, self.shards)), url)
+        return True
+
+    def results(self):
+        flat = self.redis.execute('HGETALL', self._key('results')) or []
+        return [(flat[i], json.loads(flat[i + 1])) for i in range(0, len(flat), 2)]
+
+    def counts(self):
+        return {
+            PENDING: sum(self.redis.execute('LLEN', self._key('pending', shard)) for shard in range(self.shards)),
+            LEASED: self.redis.execute('ZCARD', self._key('leases')),
+            DONE: self.redis.execute('SCARD', self._key('done')),
+            FAILED: self.redis.execute('SCARD', self._key('failed')),
+        }
+
+    def close(self):
+        self.redis.close()
+
+
+# Keeps the leases of in-flight URLs alive while a worker processes them
+class LeaseKeeper:
+    def __init__(self, queue, worker, interval):
+        self.queue = queue
+        self.worker = worker
+        self.interval = interval
+        self.in_flight = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def add(self, urls):
+        with self._lock:
+            self.in_flight.update(canonical_url(url) for url in urls)
+
+    def discard(self, url):
+        with self._lock:
+            self.in_flight.discard(canonical_url(url))
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            with self._lock:
+                urls = list(self.in_flight)
+            if urls:
+                self.queue.heartbeat(self.worker, urls)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()